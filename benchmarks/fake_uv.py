@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+"""Offline stand-in for `uv`, used by the benchmarks.
+
+Supported commands::
+
+    uv venv --python PY DIR
+    uv pip install --python PY [OPTIONS] PACKAGE ...
+
+`pip install` writes an empty module and its dist-info into the site-packages
+of the target venv, without any resolution or network access. It refuses to
+touch an interpreter that is not inside a virtual environment.
+"""
+
+from __future__ import annotations
+
+import re
+import shutil
+import sys
+from pathlib import Path
+
+VERSION = "{}.{}".format(*sys.version_info)
+OPTIONS_WITH_VALUE = {"--python", "--find-links", "-f", "--index-url", "-i"}
+
+
+def site_packages(venv: Path) -> Path:
+    return venv / "lib" / f"python{VERSION}" / "site-packages"
+
+
+def write_package(site: Path, requirement: str) -> None:
+    dist = re.match(r"[A-Za-z0-9][A-Za-z0-9._-]*", requirement).group()  # type:ignore
+    module = re.sub(r"[-.]+", "_", dist)
+    site.joinpath(module).mkdir(exist_ok=True)
+    site.joinpath(module, "__init__.py").write_text("")
+    dist_info = site / f"{module}-0.0.0.dist-info"
+    dist_info.mkdir(exist_ok=True)
+    dist_info.joinpath("METADATA").write_text(
+        f"Metadata-Version: 2.1\nName: {dist}\nVersion: 0.0.0\n"
+    )
+    dist_info.joinpath("RECORD").write_text(
+        f"{module}/__init__.py,,\n{dist_info.name}/METADATA,,\n"
+        f"{dist_info.name}/RECORD,,\n"
+    )
+
+
+def remove_package(site: Path, requirement: str) -> None:
+    """Undo `write_package`, like `pip uninstall`"""
+    dist = re.match(r"[A-Za-z0-9][A-Za-z0-9._-]*", requirement).group()  # type:ignore
+    module = re.sub(r"[-.]+", "_", dist)
+    for name in (module, f"{module}-0.0.0.dist-info"):
+        shutil.rmtree(site / name, ignore_errors=True)
+
+
+def venv(args: list[str]) -> int:
+    target = Path(args[-1]).absolute()
+    site_packages(target).mkdir(parents=True, exist_ok=True)
+    target.joinpath("pyvenv.cfg").write_text(
+        f"home = {Path(sys.executable).parent}\n"
+        "include-system-site-packages = false\n"
+        "version_info = {}.{}.{}\n".format(*sys.version_info)
+    )
+    bin_dir = target / "bin"
+    bin_dir.mkdir(exist_ok=True)
+    if not (python := bin_dir / "python").exists():
+        python.symlink_to(sys.executable)
+    return 0
+
+
+def pip_install(args: list[str]) -> int:
+    venv_dir = Path(args[args.index("--python") + 1]).absolute().parent.parent
+    if not venv_dir.joinpath("pyvenv.cfg").exists():
+        print(f"fake uv: {venv_dir} is not a virtual environment", file=sys.stderr)
+        return 1
+    packages: list[str] = []
+    skip = False
+    for arg in args[2:]:
+        if skip:
+            skip = False
+        elif arg in OPTIONS_WITH_VALUE:
+            skip = True
+        elif not arg.startswith("-"):
+            packages.append(arg)
+    site = site_packages(venv_dir)
+    for package in packages:
+        write_package(site, package)
+    return 0
+
+
+def main(args: list[str]) -> int:
+    if args[:1] == ["venv"]:
+        return venv(args)
+    if args[:2] == ["pip", "install"]:
+        return pip_install(args)
+    print(f"fake uv: unsupported command {args}", file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+"""
+Benchmarks of ensure_import, run offline by a fake `uv` (see fake_uv.py).
+
+Usage::
+    python benchmarks/run.py                     # print json to stdout
+    python benchmarks/run.py -o v0.6.5.json      # save results
+    python benchmarks/run.py --compare v0.6.5.json  # compare with old results
+    python benchmarks/run.py --quick             # smaller sizes, fewer rounds
+
+Cases:
+- import: cold `import ensure_import` in a new interpreter
+- load_venv/show: synthetic venvs with 10/100/1000 packages
+- install: `install_and_extend_sys_path` with cold and warm caches, the
+  package is uninstalled before the warm run, so both of them install it
+- retry_loop: `while _ei := EnsureImport(): with _ei:` with N missing modules
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shlex
+import shutil
+import statistics
+import subprocess  # nosec
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from datetime import datetime, timezone
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).parent.absolute()
+ROOT = BENCH_DIR.parent
+if (_root := ROOT.as_posix()) not in sys.path:
+    sys.path.insert(0, _root)
+
+from benchmarks.fake_uv import (  # noqa: E402
+    remove_package,
+    site_packages,
+    write_package,
+)
+from benchmarks.fake_uv import venv as fake_venv  # noqa: E402
+from ensure_import import EnsureImport, __version__  # noqa: E402
+
+FORMAT = 1
+
+
+def summarize(name: str, samples: list[float], **params) -> dict:
+    return {
+        "name": name,
+        "params": params,
+        "unit": "s",
+        "runs": len(samples),
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+    }
+
+
+def timeit(
+    fn: Callable[[], object], rounds: int, setup: Callable[[], object] | None = None
+) -> list[float]:
+    samples = []
+    for _ in range(rounds):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+@contextlib.contextmanager
+def sandbox() -> Iterator[Path]:
+    """Temp dir with the fake uv in PATH and an isolated user cache dir"""
+    env = {k: os.environ.get(k) for k in ("PATH", "XDG_CACHE_HOME")}
+    sys_path, cwd = sys.path[:], Path.cwd()
+    is_venv = EnsureImport.__dict__["is_venv"]
+    with tempfile.TemporaryDirectory(prefix="ensure_import_bench_") as tmp:
+        root = Path(tmp)
+        bin_dir = root / "bin"
+        bin_dir.mkdir()
+        uv = bin_dir / "uv"
+        uv.write_text(
+            f"#!/bin/sh\nexec {shlex.quote(sys.executable)} "
+            f'{shlex.quote(str(BENCH_DIR / "fake_uv.py"))} "$@"\n'
+        )
+        uv.chmod(0o755)
+        os.environ["PATH"] = f"{bin_dir}{os.pathsep}{env['PATH'] or ''}"
+        os.environ["XDG_CACHE_HOME"] = str(root / "cache")
+        # Always take the path that creates/uses a project venv
+        EnsureImport.is_venv = staticmethod(lambda: False)  # type:ignore[method-assign]
+        try:
+            yield root
+        finally:
+            EnsureImport.is_venv = is_venv  # type:ignore[method-assign]
+            EnsureImport.reset()
+            os.chdir(cwd)
+            sys.path[:] = sys_path
+            for k, v in env.items():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
+
+
+def make_venv(path: Path, packages: int) -> Path:
+    fake_venv([str(path)])
+    site = site_packages(path)
+    for i in range(packages):
+        write_package(site, f"bench_pkg_{i}")
+    return path
+
+
+def bench_import(rounds: int) -> list[dict]:
+    samples: list[float] = []
+    cumulative: list[float] = []
+    cmd = [sys.executable, "-X", "importtime", "-c", "import ensure_import"]
+    for _ in range(rounds):
+        start = time.perf_counter()
+        r = subprocess.run(  # nosec
+            cmd, capture_output=True, encoding="utf-8", cwd=ROOT
+        )
+        samples.append(time.perf_counter() - start)
+        line = r.stderr.strip().splitlines()[-1]
+        cumulative.append(int(line.split("|")[1]) / 1e6)
+    return [
+        summarize("import.process", samples),
+        summarize("import.cumulative", cumulative),
+    ]
+
+
+def bench_load_venv(sizes: list[int], rounds: int) -> list[dict]:
+    results = []
+    for size in sizes:
+        with sandbox() as root:
+            venv = make_venv(root / ".venv", size)
+            os.chdir(root)
+            origin = sys.path[:]
+
+            def restore(origin: list[str] = origin) -> None:
+                sys.path[:] = origin
+                EnsureImport.reset()
+
+            results.append(
+                summarize(
+                    "load_venv.cold",
+                    timeit(
+                        lambda venv=venv: EnsureImport.load_venv(str(venv)),
+                        rounds,
+                        restore,
+                    ),
+                    packages=size,
+                )
+            )
+            results.append(
+                summarize(
+                    "load_venv.warm",
+                    timeit(lambda venv=venv: EnsureImport.load_venv(str(venv)), rounds),
+                    packages=size,
+                )
+            )
+            results.append(
+                summarize("show", timeit(EnsureImport.show, rounds), packages=size)
+            )
+    return results
+
+
+def bench_install(rounds: int) -> list[dict]:
+    cold: list[float] = []
+    warm: list[float] = []
+    for i in range(rounds):
+        with sandbox() as root:
+            workdir = root / "project"
+            workdir.mkdir()
+            package = f"bench_install_{i}"
+            for samples in (cold, warm):
+                if samples is warm:
+                    # Keep the venv and the caches, but not the package
+                    remove_package(site_packages(workdir / "venv"), package)
+                EnsureImport.reset()
+                origin = sys.path[:]
+                _ei = EnsureImport(_workdir=workdir, _installer="uv")
+                start = time.perf_counter()
+                rc = _ei.install_and_extend_sys_path(package)
+                samples.append(time.perf_counter() - start)
+                sys.path[:] = origin
+                assert rc == 0, rc
+    return [
+        summarize("install.cold_cache", cold),
+        summarize("install.warm_cache", warm),
+    ]
+
+
+LOOP_SCRIPT = """
+import sys
+sys.path.insert(0, {root!r})
+from ensure_import import EnsureImport
+EnsureImport.is_venv = staticmethod(lambda: False)
+while _ei := EnsureImport(_installer="uv", _prescan={prescan}):
+    with _ei:
+{imports}
+"""
+
+
+def bench_retry_loop(counts: list[int], rounds: int) -> list[dict]:
+    results = []
+    for n in counts:
+        for prescan in (False, True):
+            samples = []
+            for _ in range(rounds):
+                with sandbox() as root:
+                    script = root / "main.py"
+                    imports = "".join(
+                        f"        import bench_missing_{i}\n" for i in range(n)
+                    )
+                    script.write_text(
+                        LOOP_SCRIPT.format(
+                            root=ROOT.as_posix(), prescan=prescan, imports=imports
+                        )
+                    )
+                    start = time.perf_counter()
+                    subprocess.run(  # nosec
+                        [sys.executable, script.name], cwd=root, check=True
+                    )
+                    samples.append(time.perf_counter() - start)
+            results.append(summarize("retry_loop", samples, missing=n, prescan=prescan))
+    return results
+
+
+def compare(old: dict, new: dict) -> str:
+    def key(r: dict) -> str:
+        return r["name"] + json.dumps(r["params"], sort_keys=True)
+
+    before = {key(r): r for r in old["results"]}
+    lines = [f"{'case':<55} {'old':>10} {'new':>10} {'ratio':>7}"]
+    for r in new["results"]:
+        if (o := before.get(key(r))) is None:
+            continue
+        params = ",".join(f"{k}={v}" for k, v in r["params"].items())
+        name = f"{r['name']}({params})" if params else r["name"]
+        ratio = r["median"] / o["median"] if o["median"] else float("inf")
+        lines.append(
+            f"{name:<55} {o['median']:>10.5f} {r['median']:>10.5f} {ratio:>7.2f}"
+        )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-o", "--output", help="file to write json results")
+    parser.add_argument("--compare", help="json results of a previous run")
+    parser.add_argument("--quick", action="store_true", help="small sizes, 1 round")
+    args = parser.parse_args()
+    if shutil.which("sh") is None:
+        parser.error("The fake uv needs a posix shell")
+    rounds = 1 if args.quick else 5
+    sizes = [10, 100] if args.quick else [10, 100, 1000]
+    counts = [1, 3] if args.quick else [1, 4, 8]
+    results = [
+        *bench_import(rounds),
+        *bench_load_venv(sizes, rounds),
+        *bench_install(rounds),
+        *bench_retry_loop(counts, 1 if args.quick else 3),
+    ]
+    report = {
+        "format": FORMAT,
+        "ensure_import": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "results": results,
+    }
+    content = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(content + "\n", encoding="utf-8")
+    else:
+        print(content)
+    if args.compare:
+        old = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        print(compare(old, report), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,63 @@
 from __future__ import annotations
 
-import contextlib
-import functools
-import importlib
-import json
-import logging
-import math
-import os
-import pkgutil
-import platform
-import random
-import re
-import shlex
-import shutil
-import site
-import subprocess  # nosec
+import _thread
 import sys
-import time
-from collections.abc import Sequence
+from collections.abc import (
+    AsyncIterator,
+    Callable,
+    Generator,
+    Iterable,
+    Iterator,
+    Sequence,
+)
 from contextlib import AbstractContextManager
-from datetime import datetime, timedelta
 from functools import cached_property
 from pathlib import Path
-from typing import TYPE_CHECKING, Final
+from typing import TYPE_CHECKING, Any, Final, TypeVar
+
+from ._stats import Stats
 
 if TYPE_CHECKING:
+    import contextlib
+    import functools
+    import json
+    import logging
+    import math
+    import os
+    import platform
+    import random
+    import re
+    import shlex
+    import shutil
+    import subprocess  # nosec
+    import time
+    from concurrent.futures import Future
+    from datetime import datetime, timedelta
+    from types import ModuleType
+
+    from ._cache import ResolutionCache
+    from ._filelock import FileLock
+    from ._hook import InstallHook
+    from ._installers import Installer
+    from ._inventory import ModuleInfo
+    from ._lock import Lockfile
+    from ._probe import ModuleStatus
+    from ._project import Project
+    from ._template import Template, TemplateStore
+    from ._venv import VenvStamp
+    from ._wheelhouse import Wheelhouse
+
     if sys.version_info > (3, 11):
         from typing import Self
     else:
         from typing_extensions import Self
 
 __version__ = "0.6.5"
-logger = logging.getLogger(__name__)
 
 PathLike = str | Path
+T = TypeVar("T")
+# Generator of (effect, argument) that returns T, see `EnsureImport._install_steps`
+Steps = Generator[tuple[str, Any], Any, T]
 
 __all__ = (
     "__version__",
@@ -56,6 +80,60 @@ __all__ = (
     "timedelta",
 )
 
+# Names re-exported by `__all__` (and `logger`) are resolved on first access,
+# so that `import ensure_import` does not pay for modules it may never use.
+# Value is `(module, attribute)`, an empty attribute means the module itself.
+_LAZY_ATTRS: dict[str, tuple[str, str]] = {
+    "contextlib": ("contextlib", ""),
+    "datetime": ("datetime", "datetime"),
+    "functools": ("functools", ""),
+    "json": ("json", ""),
+    "math": ("math", ""),
+    "os": ("os", ""),
+    "platform": ("platform", ""),
+    "random": ("random", ""),
+    "re": ("re", ""),
+    "shlex": ("shlex", ""),
+    "shutil": ("shutil", ""),
+    "subprocess": ("subprocess", ""),
+    "time": ("time", ""),
+    "timedelta": ("datetime", "timedelta"),
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name == "logger":
+        value: Any = _get_logger()
+    elif (target := _LAZY_ATTRS.get(name)) is not None:
+        import importlib
+
+        module_name, attr = target
+        value = importlib.import_module(module_name)
+        if attr:
+            value = getattr(value, attr)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *_LAZY_ATTRS, "logger"})
+
+
+def _get_logger() -> logging.Logger:
+    import logging
+
+    return logging.getLogger(__name__)
+
+
+class _RetryState(_thread._local):  # threading.local, without importing threading
+    """Retry counters of one thread, the instances are shared between threads"""
+
+    tried = 0
+    trying = True
+    success = True
+
 
 class EnsureImport(AbstractContextManager):
     """Auto install modules if import error.
@@ -84,6 +162,9 @@ class EnsureImport(AbstractContextManager):
     retry = RETRY
     inited = False
     instances: dict[str, EnsureImport] = {}
+    #: timing of phases, see `ensure_import._stats.Stats`
+    stats = Stats()
+    _instances_lock = _thread.RLock()
 
     @staticmethod
     def load_venv(*paths: str, verbose: bool = False) -> list[Path]:
@@ -91,16 +172,22 @@ class EnsureImport(AbstractContextManager):
             sys.path.append(".")
         if not paths:
             paths = (".venv", "venv")
-        for name in paths:
-            if ps := list(Path(name).rglob("site-packages")):
-                for p in ps:
-                    site.addsitedir(p.as_posix())
-                    if verbose:
-                        print(
-                            f"Add {p} to sitedir, you can run `EnsureImport.show(verbose=True)` to see available modules"
-                        )
-                return ps
-        return []
+        from ._venv import find_site_packages
+
+        with EnsureImport.stats.span("load_venv", paths=paths) as args:
+            for name in paths:
+                if ps := find_site_packages(Path(name)):
+                    import site
+
+                    for p in ps:
+                        site.addsitedir(p.as_posix())
+                        if verbose:
+                            print(
+                                f"Add {p} to sitedir, you can run `EnsureImport.show(verbose=True)` to see available modules"
+                            )
+                    args["found"] = [p.as_posix() for p in ps]
+                    return ps
+            return []
 
     @classmethod
     def activate(cls, path=".venv", verbose: bool = False) -> None:
@@ -108,11 +195,14 @@ class EnsureImport(AbstractContextManager):
 
     @classmethod
     def show(cls, verbose: bool = False, pretty: bool = False) -> list[str] | None:
+        from ._inventory import Inventory
+
         imported = list(__all__)
         all_ms = {i.split(".")[0] for i in sys.modules}
+        inventory = Inventory()
         for site_packages in cls.load_venv(".venv"):
-            module_infos = pkgutil.iter_modules([str(site_packages)])
-            all_ms |= {name for _finder, name, _ispkg in module_infos}
+            all_ms.update(inventory.modules(site_packages))
+        inventory.save()
         third_parts = all_ms - set(sys.stdlib_module_names) - {"sitecustomize"}
         importable = [
             i
@@ -136,15 +226,86 @@ class EnsureImport(AbstractContextManager):
             return None
         return public
 
+    @classmethod
+    def install_hook(cls, *args, **kwargs) -> InstallHook:
+        """Install missing modules on import, without re-running any code
+
+        Usage::
+            >>> EnsureImport.install_hook(modules="numpy PyYAML", cv2="opencv-python")
+            >>> import numpy  # installed by pip if not found, then imported
+            >>> import yaml, cv2
+            >>> from dotenv import load_dotenv  # in `EnsureImport.mapping`
+            >>> import ujson  # not allowed, raise ModuleNotFoundError if missing
+
+        Arguments are the same as `EnsureImport(...)`. Only the modules of the
+        mappings and of the `modules` packages are installed, other imports
+        fail as usual.
+        """
+        from ._hook import install
+
+        return install(cls(*args, **kwargs))
+
+    @classmethod
+    def lazy(cls, name: str, *args, **kwargs) -> ModuleType:
+        """Stand-in of module `name`, imported (installed if missing) on first use
+
+        Usage::
+            >>> pd = EnsureImport.lazy("pandas")  # Nothing is imported yet
+            >>> pd.DataFrame()  # Now it is, and `pd` is rebound to pandas
+
+        The first attribute access loads the module, other threads wait for
+        it. Then the real module replaces the stand-in in `sys.modules` and in
+        the globals of the caller. Arguments other than `name` are the same as
+        `EnsureImport(...)`, whose mapping and installer are used.
+        """
+        from ._lazy import LazyModule
+
+        namespace = sys._getframe(1).f_globals
+        return LazyModule.create(name, cls(*args, **kwargs), namespace)
+
+    @staticmethod
+    def uninstall_hook() -> None:
+        from ._hook import uninstall
+
+        uninstall()
+
+    @classmethod
+    def iter_available(cls, *paths: PathLike) -> Iterator[ModuleInfo]:
+        """Yield (module, distribution, version) of the importable modules
+
+        Default to the site-packages of `.venv` and the ones in sys.path.
+        Directories are indexed and cached, an unchanged one is not scanned.
+
+        Usage::
+            >>> for name, dist, version in EnsureImport.iter_available():
+            ...     print(name, dist, version)
+        """
+        from ._inventory import Inventory, site_directories
+
+        if paths:
+            directories = [Path(p) for p in paths]
+        else:
+            directories = [*cls.load_venv(".venv"), *site_directories()]
+        inventory = Inventory()
+        try:
+            yield from inventory.iter_available(directories)
+        finally:
+            inventory.save()
+
     @classmethod
     def reset(cls) -> None:
-        cls.inited = False
-        cls.instances.clear()
+        with cls._instances_lock:
+            cls.inited = False
+            cls.instances.clear()
+        if (venv := sys.modules.get(f"{__name__}._venv")) is not None:
+            venv.clear_cache()
 
     def __new__(cls, *args, **kwargs):
-        if (key := f"*{args}, **{kwargs}") in cls.instances:
-            return cls.instances[key]
-        self = cls.instances[key] = super().__new__(cls)
+        key = f"*{args}, **{kwargs}"
+        with cls._instances_lock:
+            if key in cls.instances:
+                return cls.instances[key]
+            self = cls.instances[key] = super().__new__(cls)
         return self
 
     def __init__(
@@ -157,6 +318,13 @@ class EnsureImport(AbstractContextManager):
         _debug=False,
         _venv_dir: str | None = None,
         modules: Sequence[str] | str | None = None,
+        _prescan: bool = False,
+        _installer: str | Installer | None = None,
+        _wheelhouse: PathLike | Wheelhouse | None = None,
+        _background: bool = False,
+        _lock: bool | None = None,
+        _templates: bool | PathLike | TemplateStore | None = None,
+        _compile: bool | int | None = None,
         **kwargs,
     ) -> None:
         """
@@ -165,31 +333,64 @@ class EnsureImport(AbstractContextManager):
         :param _install: install by pip if module not found
         :param _no_venv: do not use `python -m venv venv` to create virtual environment
         :param _exit: whether call sys.exit when install error
+        :param _prescan: parse the imports of the guarded block at the first
+            ImportError, and install all the missing ones by one pip call
+        :param _installer: backend to create venv and install packages, one of
+            'uv'/'pip'/'poetry'/'pdm', default to the fastest available one
+        :param _wheelhouse: install offline from this directory of wheels,
+            default to env `ENSURE_IMPORT_WHEELHOUSE`, see `prefetch`
+        :param _background: install `modules` in a background thread, importing
+            one of them waits until its install finished
+        :param _lock: record installed versions to `ensure_import.lock` next to
+            the venv, and install the recorded ones without resolving, default
+            False. Hashes are recorded by `pip install --report` (pip>=22.2)
+        :param _templates: clone new venv from a provisioned one of the template
+            store (True or its directory), default to env `ENSURE_IMPORT_TEMPLATES`
+        :param _compile: compile the newly installed packages to bytecode right
+            after installing, by this many processes (True: one per cpu), rather
+            than at their first import, default True
         :param kwargs: package name mapping,  example: doten='python-dotenv'
         """
-        if self.inited:
-            return
-        self._success = True
-        self._mapping = kwargs
-        self._trying = True
-        self._tried = 0
-        self._py_path = sys.executable
-        self.inited = True
-        self._debug = _debug
-        self._venv_dir = _venv_dir
-        self._modules = (
-            (modules.split() if isinstance(modules, str) else list(modules))
-            if modules
-            else []
-        )
-        self._set_params(
-            _sys_path,
-            _workdir,
-            _install,
-            _no_venv,
-            _exit,
-            _venv_dir,
-        )
+        with self._instances_lock:
+            if self.inited:
+                return
+            self._state = _RetryState()
+            self._mapping = kwargs
+            self._py_path = sys.executable
+            self._debug = _debug
+            self._prescan = _prescan
+            if _installer is None:
+                _installer = getattr(self, "INSTALLER", None)
+            self._installer = _installer
+            if _wheelhouse is None:
+                _wheelhouse = getattr(self, "WHEELHOUSE", None)
+            self._wheelhouse = _wheelhouse
+            self._background = _background
+            if _lock is None:
+                _lock = getattr(self, "LOCK", False)
+            self._lock = _lock
+            if _templates is None:
+                _templates = getattr(self, "TEMPLATES", None)
+            self._templates = _templates
+            if _compile is None:
+                _compile = getattr(self, "COMPILE", True)
+            self._compile = _compile
+            self._futures: list[Future[int]] = []
+            self._venv_dir = _venv_dir
+            self._modules = (
+                (modules.split() if isinstance(modules, str) else list(modules))
+                if modules
+                else []
+            )
+            self._set_params(
+                _sys_path,
+                _workdir,
+                _install,
+                _no_venv,
+                _exit,
+                _venv_dir,
+            )
+            self.inited = True
 
     def _set_params(
         self,
@@ -217,6 +418,30 @@ class EnsureImport(AbstractContextManager):
             _venv_dir = getattr(self, "VENV_DIR", "venv")
         self._venv_dir = _venv_dir
 
+    @property
+    def _tried(self) -> int:
+        return self._state.tried
+
+    @_tried.setter
+    def _tried(self, value: int) -> None:
+        self._state.tried = value
+
+    @property
+    def _trying(self) -> bool:
+        return self._state.trying
+
+    @_trying.setter
+    def _trying(self, value: bool) -> None:
+        self._state.trying = value
+
+    @property
+    def _success(self) -> bool:
+        return self._state.success
+
+    @_success.setter
+    def _success(self, value: bool) -> None:
+        self._state.success = value
+
     @property
     def trying(self) -> bool:
         if self._tried < self.RETRY and self._trying:
@@ -272,7 +497,10 @@ class EnsureImport(AbstractContextManager):
         if self._modules:
             if (p := self._sys_path) is not None:
                 self.extend_paths(p)
-            self._exec(*self._modules)
+            if self._background:
+                self.install_in_background(*self._modules)
+            else:
+                self._exec(*self._modules)
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
@@ -281,30 +509,223 @@ class EnsureImport(AbstractContextManager):
             if (p := self._sys_path) is None:
                 if self._tried < self.RETRY:
                     self._success = False
-                    self.run(exc_value)
+                    with self.stats.span(
+                        "exit", error=str(exc_value), tried=self._tried
+                    ):
+                        self.run(exc_value)
+                    return True
+            else:
+                if self._tried <= 2:
+                    if not self.extend_paths(p) and self._debug:
+                        _get_logger().warning(f"{p} already in sys.path")
+                    return True
+        else:
+            self._trying = False
+            self._success = True
+
+    async def __aenter__(self) -> Self:
+        if self._modules:
+            if (p := self._sys_path) is not None:
+                self.extend_paths(p)
+            await self._aexec(*self._modules)
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if isinstance(exc_value, ImportError):
+            self._tried += 1
+            if (p := self._sys_path) is None:
+                if self._tried < self.RETRY:
+                    self._success = False
+                    with self.stats.span(
+                        "exit", error=str(exc_value), tried=self._tried
+                    ):
+                        await self.arun(exc_value)
                     return True
             else:
                 if self._tried <= 2:
                     if not self.extend_paths(p) and self._debug:
-                        logger.warning(f"{p} already in sys.path")
+                        _get_logger().warning(f"{p} already in sys.path")
                     return True
         else:
             self._trying = False
             self._success = True
 
+    async def __aiter__(self) -> AsyncIterator[Self]:
+        """Async version of `while _ei := EnsureImport()`
+
+        Usage::
+            >>> async for _ei in EnsureImport():
+            ...     async with _ei:
+            ...         import httpx
+        """
+        while self.trying:
+            yield self
+
     def run(self, e) -> None:
+        with self.stats.span("run", error=str(e)) as args:
+            args["packages"] = packages = self._packages_for(e)
+            self._exec(*packages)
+
+    async def arun(self, e) -> None:
+        import asyncio
+
+        with self.stats.span("run", error=str(e)) as args:
+            # Resolving may scan site-packages, keep it off the event loop
+            packages = await asyncio.to_thread(self._packages_for, e)
+            args["packages"] = packages
+            await self._aexec(*packages)
+
+    def _packages_for(self, e: ImportError) -> list[str]:
+        """Packages to be installed to fix the ImportError, re-raise if none"""
+        import re
+
         modules = re.findall(r"'([a-zA-Z][0-9a-zA-Z_]+)'", str(e))
         if not modules or "--no-install" in sys.argv:
             raise e
-        package_mapping = dict(self.mapping, **self._mapping)
-        ms = (package_mapping.get(i, i) for i in modules)
-        self._exec(*ms)  # pyright: ignore[reportArgumentType]
+        if self._prescan:
+            from ._scan import scan_traceback
+
+            scanned = scan_traceback(e.__traceback__)
+            modules = list(dict.fromkeys([*modules, *self.missing_modules(scanned)]))
+        return self.resolve_packages(modules)
+
+    def resolve_packages(self, modules: Sequence[str]) -> list[str]:
+        """Module names -> package names to be installed.
+
+        Lookup order: `_mapping` of this instance, `EnsureImport.mapping`,
+        metadata of the distributions installed in the target environment,
+        then the bundled index of well-known names (e.g.: cv2 -> opencv-python,
+        yaml -> PyYAML).
+        """
+        from ._index import resolve_distributions
+
+        overrides = dict(self.mapping, **self._mapping)
+        return resolve_distributions(modules, overrides, self._target_path())
+
+    def iter_packages(self, modules: Iterable[str]) -> Iterator[tuple[str, str]]:
+        """Streaming `resolve_packages`: (module, package) as modules come in"""
+        from ._index import iter_distributions
+
+        overrides = dict(self.mapping, **self._mapping)
+        return iter_distributions(modules, overrides, self._target_path())
+
+    def _target_env(self) -> Path | None:
+        """The env that packages are installed into, None for the current one
+
+        Same order as `_locate_env` but nothing is created or run, it is None
+        also when the venv is not created yet.
+        """
+        from ._venv import is_venv_dir
+
+        if self._no_venv or self.is_venv():
+            return None
+        envs = [self.workdir / (self._venv_dir or "venv"), self.workdir / ".venv"]
+        if (found := self.resolution_cache.get("project")) is None:
+            from ._project import detect
+
+            project_env = detect(self.workdir).env
+        else:
+            project_env = found["env"] and Path(found["env"])
+        if project_env and is_venv_dir(project_env):
+            envs.insert(0, project_env)
+        return next((env for env in envs if env.is_dir()), None)
+
+    def _target_path(self) -> list[str] | None:
+        """site-packages of `_target_env`, None means sys.path"""
+        from ._venv import find_site_packages
+
+        if (env := self._target_env()) is None:
+            return None
+        return [p.as_posix() for p in find_site_packages(env)] or None
+
+    def _target_python(self) -> Path:
+        """Interpreter of `_target_env`, a new venv is created by current one"""
+        from ._venv import venv_python
+
+        if (env := self._target_env()) is None or not (py := venv_python(env)).exists():
+            return Path(sys.executable)
+        return py
+
+    def scan(
+        self, *paths: PathLike, jobs: int | None = None
+    ) -> Iterator[tuple[str, str]]:
+        """Third-party imports of the sources -> (module, package), as found
+
+        Files are parsed by a process pool and the imports of each file are
+        cached by its path, mtime and size, so a re-scan only parses the
+        changed files. Modules are resolved the same way as `run` does.
+
+        Usage::
+            >>> ei = EnsureImport()
+            >>> packages = [p for _, p in ei.scan("src/", jobs=8)]
+            >>> ei.install_and_extend_sys_path(*packages)
+        """
+        from ._scan import iter_modules
+
+        def unique() -> Iterator[str]:
+            seen: set[str] = set()
+            for module, _ in iter_modules(paths, jobs):
+                if module not in seen:
+                    seen.add(module)
+                    yield module
+
+        return self.iter_packages(unique())
+
+    def install_in_background(self, *packages: str) -> Future[int]:
+        """Start installing packages in a worker thread, return its future
+
+        Until it is done, importing any of the packages in other threads
+        waits for it; imports of other modules go on without waiting.
+        """
+        from ._background import get_gate, submit
+
+        future = submit(self._background_exec, packages)
+        get_gate().add(self._import_names(packages), future)
+        self._futures.append(future)
+        return future
+
+    def _background_exec(self, packages: Sequence[str]) -> int:
+        try:
+            rc = self.install_and_extend_sys_path(*packages)
+        except Exception:
+            _get_logger().exception(f"Failed to install {packages} in background")
+            raise
+        if rc:
+            self.log_error(f"install {' '.join(packages)} in background")
+        return rc
+
+    def _import_names(self, packages: Sequence[str]) -> set[str]:
+        """Guess module names of packages: 'python-dotenv' -> {'dotenv', ...}"""
+        from ._index import bundled_index
+        from ._probe import normalize, requirement_name
+
+        mapping = {**bundled_index(), **self.mapping, **self._mapping}
+        names: set[str] = set()
+        for package in packages:
+            dist = normalize(name := requirement_name(package))
+            names.add(name.replace("-", "_"))
+            names.update(k for k, v in mapping.items() if normalize(v) == dist)
+        return names
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Block until background installs are done, return whether all ok"""
+        from concurrent.futures import wait
+
+        done, not_done = wait(self._futures, timeout)
+        return not not_done and all(
+            f.exception() is None and f.result() == 0 for f in done
+        )
 
     def _exec(self, *modules: str) -> None:
         rc = self.install_and_extend_sys_path(*modules)
         if rc and self._exit:
             sys.exit(rc)
 
+    async def _aexec(self, *modules: str) -> None:
+        rc = await self.ainstall_and_extend_sys_path(*modules)
+        if rc and self._exit:
+            sys.exit(rc)
+
     @staticmethod
     def is_venv() -> bool:
         """Whether in a virtual environment(also work for poetry)"""
@@ -314,40 +735,47 @@ class EnsureImport(AbstractContextManager):
 
     @staticmethod
     def run_and_echo(cmd: str) -> int:
-        logger.info(f"--> Executing shell command:\n {cmd}")
+        import shlex
+        import subprocess  # nosec
+
+        _get_logger().info(f"--> Executing shell command:\n {cmd}")
         return subprocess.call(shlex.split(cmd))  # nosec
 
     @staticmethod
     def log_error(action: str) -> None:
-        logger.error(f"ERROR: failed to {action}")
+        _get_logger().error(f"ERROR: failed to {action}")
 
-    @classmethod
-    def is_poetry_project(cls, dirpath: Path) -> bool:
-        toml_file = Path("pyproject.toml")
-        for _ in range(3):
-            toml_file = dirpath / toml_file.name
-            if toml_file.exists():
-                break
-            dirpath = dirpath.parent
-        else:
-            return False
-        if shutil.which("poetry") is None:
-            return False
-        if "[tool.poetry]" not in toml_file.read_text(encoding="utf-8"):
-            return False
-        cmd = "poetry run python -m pip --version"
-        return cls.check_shell(cmd)
+    @staticmethod
+    def is_poetry_project(dirpath: Path) -> bool:
+        from ._project import detect
+
+        return detect(dirpath).manager == "poetry"
 
     @staticmethod
     def check_shell(cmd: str) -> bool:
+        import shlex
+        import subprocess  # nosec
+
         rc = subprocess.call(shlex.split(cmd), stderr=subprocess.DEVNULL)  # nosec
         return rc == 0
 
+    @classmethod
+    def get_poetry_py_path(cls) -> Path:
+        from ._project import FIND_COMMANDS
+
+        return cls.find_env_path(FIND_COMMANDS["poetry"]) or Path()
+
     @staticmethod
-    def get_poetry_py_path() -> Path:
-        cmd = "poetry env info --path"
-        r = subprocess.run(cmd.split(), capture_output=True, encoding="utf-8")  # nosec
-        return Path(r.stdout.strip())
+    def find_env_path(cmd: str) -> Path | None:
+        """Ask the project manager where its environment is, see `_project.py`"""
+        import shlex
+        import subprocess  # nosec
+
+        from ._project import env_from_output
+
+        args = shlex.split(cmd)
+        r = subprocess.run(args, capture_output=True, encoding="utf-8")  # nosec
+        return env_from_output(r.stdout) if r.returncode == 0 else None
 
     @cached_property
     def workdir(self) -> Path:
@@ -359,41 +787,459 @@ class EnsureImport(AbstractContextManager):
 
     @staticmethod
     def is_module_installed(name: str) -> bool:
-        try:
-            importlib.import_module(name)
-        except ImportError:
-            return False
+        """Whether module or distribution `name` is available (not imported)"""
+        from ._probe import probe
+
+        return probe([name])[name].present
+
+    @staticmethod
+    def probe(
+        *names: str, path: Sequence[str] | None = None
+    ) -> dict[str, ModuleStatus]:
+        """Get present/missing/version of modules without running their code
+
+        Usage::
+            >>> EnsureImport.probe("pytest", "yaml", "no_such_module")
+            {'pytest': ModuleStatus(name='pytest', present=True, version='8.4.2'),
+             'yaml': ModuleStatus(name='yaml', present=True, version='6.0.2'),
+             'no_such_module': ModuleStatus(name='no_such_module', present=False, version=None)}
+        """
+        from ._probe import probe
+
+        return probe(names, path)
+
+    @staticmethod
+    def missing_modules(names: Sequence[str]) -> list[str]:
+        """Filter out the modules that can be found, without importing them"""
+        from ._probe import find_module
+
+        return [i for i in names if not find_module(i)]
+
+    @cached_property
+    def resolution_cache(self) -> ResolutionCache:
+        from ._cache import ResolutionCache
+
+        return ResolutionCache(self.workdir, (self._venv_dir or "venv", ".venv"))
+
+    @cached_property
+    def installer(self) -> Installer:
+        from ._installers import get_installer
+
+        return get_installer(self._installer)
+
+    @cached_property
+    def wheelhouse(self) -> Wheelhouse | None:
+        from ._wheelhouse import Wheelhouse
+
+        if isinstance(wh := self._wheelhouse, Wheelhouse):
+            return wh
+        if wh is None:
+            return Wheelhouse.from_env()
+        return Wheelhouse(wh, getattr(self, "WHEELHOUSE_MAX_SIZE", None))
+
+    @cached_property
+    def templates(self) -> TemplateStore | None:
+        from ._template import TemplateStore
+
+        if isinstance(store := self._templates, TemplateStore):
+            return store
+        if store is None:
+            return TemplateStore.from_env()
+        if store is False:
+            return None
+        return TemplateStore(None if store is True else store)
+
+    def prefetch(self, *modules: str) -> int:
+        """Build wheels of modules and their dependencies into the wheelhouse
+
+        Usage::
+            >>> EnsureImport(_wheelhouse="~/wheels").prefetch("cv2", "yaml")
+            >>> # On the offline node:
+            >>> while _ei := EnsureImport(_wheelhouse="~/wheels"):
+            ...     with _ei:
+            ...         import cv2
+        """
+        if (wheelhouse := self.wheelhouse) is None:
+            raise ValueError("No wheelhouse, use `_wheelhouse` to set one")
+        packages = self.resolve_packages(modules)
+        wheelhouse.path.mkdir(parents=True, exist_ok=True)
+        py = self._target_python()
+        cmd = wheelhouse.prefetch_command(py, packages, self.installer)
+        if rc := self.run_and_echo(cmd):
+            self.log_error(f"prefetch {' '.join(packages)}")
+            return rc
+        wheelhouse.evict(keep=wheelhouse.touch(packages))
+        return 0
+
+    def _locate_env(
+        self, installer: Installer, packages: Sequence[str] = ()
+    ) -> Steps[tuple[Path, str | Path] | None]:
+        """Find or create the virtual environment, return its path and python
+
+        A new one is cloned from the template which has most of the `packages`
+        if templates are enabled. Return None if failed to create it.
+        """
+        from ._venv import VenvStamp, is_venv_dir, venv_python
+
+        cache = self.resolution_cache
+        found = cache.get("project")
+        if found is None or (found["env"] and not is_venv_dir(Path(found["env"]))):
+            from ._project import detect
+
+            with self.stats.span("project_detect") as args:
+                project: Project = yield "call", lambda: detect(self.workdir)
+                env = project.env
+                if env is not None and not is_venv_dir(env):
+                    # Not created yet, or not a venv (e.g.: pdm uses the system
+                    # python), fallback to venv/.venv
+                    env = None
+                if env is None and (cmd := project.find_command):
+                    if (env := (yield "env_path", cmd)) and not is_venv_dir(env):
+                        env = None
+                args.update(manager=project.manager, env=env and env.as_posix())
+            found = {"manager": project.manager, "env": env and env.as_posix()}
+            if env is not None or project.manager is None:
+                cache.set("project", found)
+        if env_dir := found["env"]:
+            p = Path(env_dir)
+            if installer.name == "poetry" and found["manager"] == "poetry":
+                return p, "poetry run python"
+            return p, venv_python(p)
+        venv_dir = Path(self._venv_dir or "venv")
+        p = self.workdir / venv_dir
+        if p.exists():
+            if not venv_python(p).exists():
+                # Maybe it is being created by another process, wait for it
+                (yield "lock", (p.absolute().as_posix(),)).release()
+        elif p.parent.joinpath(".venv").exists():
+            p = p.with_name(".venv")
         else:
-            return True
+            p = self.workdir / installer.venv_dir(venv_dir.as_posix())
+            with self.stats.span("lock", key=p.as_posix()) as args:
+                flock: FileLock = yield "lock", (p.absolute().as_posix(),)
+                args["waited"] = flock.waited
+            try:
+                if not (flock.waited and venv_python(p).exists()):
+                    created_by = f"ensure_import {__version__} ({installer.name})"
+                    template: Template | None = yield (
+                        "call",
+                        lambda: self._clone_template(p, packages),
+                    )
+                    if template:
+                        created_by += f" from template {template.venv.parent.name}"
+                    else:
+                        py = Path(sys.executable)
+                        with self.stats.span("venv_create", path=p.as_posix()) as args:
+                            args["rc"] = rc = yield "run", installer.venv_command(py, p)
+                        if rc:
+                            self.log_error(f"create virtual environment for {py}")
+                            return None
+                        if not p.is_dir():
+                            # Created elsewhere, e.g.: poetry uses its cache dir
+                            from ._project import FIND_COMMANDS
+
+                            env = None
+                            if cmd := FIND_COMMANDS.get(installer.name):
+                                env = yield "env_path", cmd
+                            if env is None or not is_venv_dir(env):
+                                self.log_error(f"find the venv of {installer.name}")
+                                return None
+                            p = env
+                            found = {"manager": installer.name, "env": p.as_posix()}
+                            cache.set("project", found)
+                    stamp = VenvStamp(p)
+                    stamp.set("created_by", created_by)
+                    # What the venv has, to save it as a template after installs
+                    stamp.set("packages", sorted(template.packages if template else ()))
+                    stamp.save()
+            finally:
+                flock.release()
+        return p, venv_python(p)
+
+    def _clone_template(self, venv: Path, packages: Sequence[str]) -> Template | None:
+        if (store := self.templates) is None or not packages:
+            return None
+        if (template := store.lookup(packages)) is None:
+            return None
+        from ._template import clone_venv
+
+        with self.stats.span("venv_clone", template=template.venv.as_posix()) as args:
+            try:
+                args.update(clone_venv(template.venv, venv))
+            except OSError:
+                _get_logger().exception(f"Failed to clone {template.venv}")
+                import shutil
+
+                shutil.rmtree(venv, ignore_errors=True)
+                return None
+        return template
 
     def install_and_extend_sys_path(self, *packages) -> int:
+        """Install packages, and append site-packages of the venv to sys.path
+
+        It is safe to call from many threads: a package that is being
+        installed into the same env by another thread is waited for instead of
+        installed again, and the packages that are requested meanwhile are
+        installed together.
+        """
+        from ._coalesce import get_batcher
+
+        return get_batcher(self._install_target()).install(
+            packages, self._install_batch
+        )
+
+    def _install_target(self) -> str:
+        """Key of the env that is installed into, to share its installs"""
+        if (env := self._target_env()) is None:
+            if self._no_venv or self.is_venv():
+                env = Path(sys.prefix)
+            else:
+                env = self.workdir / (self._venv_dir or "venv")
+        return env.absolute().as_posix()
+
+    def _install_batch(self, *packages: str) -> int:
+        with self.stats.span("install_and_extend_sys_path", packages=packages) as args:
+            args["rc"] = rc = self._drive(self._install_steps(*packages))
+        return rc
+
+    async def ainstall_and_extend_sys_path(self, *packages) -> int:
+        """Same as `install_and_extend_sys_path` but not block the event loop"""
+        import asyncio
+
+        from ._coalesce import get_batcher
+
+        target = await asyncio.to_thread(self._install_target)
+        return await get_batcher(target).ainstall(packages, self._ainstall_batch)
+
+    async def _ainstall_batch(self, *packages: str) -> int:
+        from ._aio import drive
+
+        with self.stats.span("install_and_extend_sys_path", packages=packages) as args:
+            args["rc"] = rc = await drive(self._install_steps(*packages))
+        return rc
+
+    def _drive(self, steps: Steps[T]) -> T:
+        """Run the shell commands that `steps` asks for, see `_install_steps`"""
+        from ._filelock import FileLock
+
+        handlers: dict[str, Callable[[Any], Any]] = {
+            "run": self.run_and_echo,
+            "check": self.check_shell,
+            "env_path": self.find_env_path,
+            "lock": lambda key: FileLock.for_key(*key).acquire(),
+            "call": lambda fn: fn(),
+        }
+        result = None
+        while True:
+            try:
+                effect, arg = steps.send(result)
+            except StopIteration as e:
+                return e.value
+            result = handlers[effect](arg)
+
+    def _install_steps(self, *packages: str) -> Steps[int]:
+        """Logic of `install_and_extend_sys_path` without doing any process IO
+
+        It yields `(effect, argument)` and receives the result of that effect:
+        - ("run", cmd) -> return code of `run_and_echo(cmd)`
+        - ("check", cmd) -> `check_shell(cmd)`
+        - ("env_path", cmd) -> `find_env_path(cmd)`
+        - ("lock", key) -> acquired `FileLock.for_key(*key)`
+        - ("call", fn) -> `fn()`, for the other blocking work, e.g.: probe
+        so that both the sync and the async (see `_aio.py`) API share it.
+        """
+        import importlib
+
         py: str | Path = Path(sys.executable)
-        depends = " ".join(packages)
+        venv: Path | None = None
+        stamp: VenvStamp | None = None
+        lock: Lockfile | None = None
+        installer = self.installer
+        wheelhouse = self.wheelhouse
         if not self._no_venv and not self.is_venv():
-            if self.is_poetry_project(self.workdir):
-                p = self.get_poetry_py_path()
-                py = "poetry run python"
-            else:
-                p = self.workdir / "venv"
-                if not p.exists():
-                    if p.parent.joinpath(".venv").exists():
-                        p = p.with_name(".venv")
-                    elif self.run_and_echo(f"{py} -m venv {self._venv_dir}"):
-                        self.log_error(f"create virtual environment for {py}")
-                        return 1
-                if platform.system() == "Windows":
-                    py = p / "Scripts" / "python.exe"
-                else:
-                    py = p / "bin/python"
-            if (lib := list(p.rglob("site-packages"))[0].as_posix()) not in sys.path:
+            from ._venv import VenvStamp, find_site_packages, is_importable
+
+            located = yield from self._locate_env(installer, packages)
+            if located is None:
+                return 1
+            venv, py = located
+            cache = self.resolution_cache
+            cache.watch(venv / "pyvenv.cfg")
+            yield "call", cache.save
+            stamp = VenvStamp(venv)
+            if not (site_packages := find_site_packages(venv)):
+                self.log_error(f"find site-packages of {venv}")
+                return 1
+            lib = site_packages[0].as_posix()
+            if self._lock:
+                from ._lock import LOCK_NAME, Lockfile
+
+                lock_path = venv.parent / LOCK_NAME
+                lock = yield "call", lambda: Lockfile(lock_path)
+            if lib not in sys.path:
                 sys.path.append(lib)
-                if not self.check_shell(f"{py} -c 'import ensure_import'"):
+                # Tell it by the files of site-packages, run its python if unsure
+                fast = (importable := is_importable(venv)) is not None
+                if not fast and (importable := stamp.get("self_importable")) is None:
+                    with self.stats.span("self_import_probe"):
+                        importable = yield "check", f"{py} -c 'import ensure_import'"
+                    stamp.set("self_importable", importable)
+                    stamp.save()
+                self.stats.mark("self_import_check", fast=fast, importable=importable)
+                if not importable:
                     sys.path.append(Path(__file__).parent.parent.as_posix())
-                if self.is_module_installed(packages[0]):
+                with self.stats.span("probe", packages=packages) as args:
+                    statuses = yield "call", lambda: self.probe(*packages)
+                    args["present"] = present = all(
+                        i.present for i in statuses.values()
+                    )
+                if present:
                     return 0
-            if self._install:
-                self.run_and_echo(f"{py} -m pip install --upgrade pip")
-        if self._install and self.run_and_echo(f"{py} -m pip install {depends}"):
-            self.log_error(f"install {depends}")
-            return 2
+                if self.templates is not None:
+                    # Only install what the venv (e.g.: cloned from template) lacks
+                    packages = tuple(k for k, v in statuses.items() if not v.present)
+        if not self._install:
+            return 0
+        env = Path(sys.prefix) if venv is None else venv
+        key = (env.absolute().as_posix(), " ".join(sorted(packages)))
+        with self.stats.span("lock", key=key) as args:
+            flock: FileLock = yield "lock", key
+            args["waited"] = flock.waited
+        try:
+            if flock.waited:
+                # Another process did the same install when this one was waiting
+                importlib.invalidate_caches()
+                statuses = yield "call", lambda: self.probe(*packages)
+                if all(i.present for i in statuses.values()):
+                    return 0
+            if (
+                stamp is not None
+                and wheelhouse is None
+                and not stamp.get("bootstrapped")
+                and (cmd := installer.bootstrap_command(py))
+            ):
+                with self.stats.span("bootstrap", cmd=cmd) as args:
+                    args["rc"] = rc = yield "run", cmd
+                if rc == 0:
+                    stamp.set("bootstrapped", cmd)
+                    stamp.save()
+            # Bytecode of a venv only, not of the interpreter's own site-packages
+            compile_new = venv is not None and self._compile is not False
+            rc = yield from self._install_packages(
+                installer, py, packages, env, lock, compile_new
+            )
+            if rc == 0 and stamp is not None and venv is not None:
+                yield "call", lambda: self._save_template(venv, stamp, packages)
+            return rc
+        finally:
+            flock.release()
+
+    def _save_template(
+        self, venv: Path, stamp: VenvStamp, packages: Sequence[str]
+    ) -> None:
+        """Keep the venv in template store, if it was created by ensure_import
+
+        It is saved only when the packages are not all in the venv already,
+        otherwise the template of the same packages exists.
+        """
+        if (store := self.templates) is None or (has := stamp.get("packages")) is None:
+            return
+        if set(packages) <= set(has):
+            return
+        names = sorted({*has, *packages})
+        stamp.set("packages", names)
+        stamp.save()
+        with self.stats.span("template_save", packages=names) as args:
+            args["saved"] = store.save(venv, names) is not None
+
+    def _install_packages(
+        self,
+        installer: Installer,
+        py: str | Path,
+        packages: Sequence[str],
+        env: Path,
+        lock: Lockfile | None,
+        compile_new: bool = False,
+    ) -> Steps[int]:
+        """Install from the lockfile if possible, then resolve the others
+
+        :param compile_new: compile the new distributions after installing
+            them, rather than by the installer
+        """
+        wheelhouse = self.wheelhouse
+        options = () if wheelhouse is None else wheelhouse.install_options()
+        site_packages: Path | None = None
+        existing: set[str] = set()
+        if compile_new:
+            from ._compile import dist_infos
+            from ._venv import find_site_packages
+
+            if found := find_site_packages(env):
+                site_packages = found[0]
+                existing = yield "call", lambda: dist_infos(found[0])
+                options = (*options, *installer.no_compile_options())
+        to_resolve: Sequence[str] = packages
+        if lock is not None:
+            locked, to_resolve = lock.split(packages)
+            if locked:
+                import shlex
+
+                req = yield "call", lambda: lock.write_requirements(locked, env)
+                opts = (*options, "--no-deps", "-r", shlex.quote(req.as_posix()))
+                cmd = installer.install_command(py, [], *opts)
+                with self.stats.span("install_locked", cmd=cmd) as args:
+                    args["rc"] = rc = yield "run", cmd
+                req.unlink(missing_ok=True)
+                if rc:  # e.g.: a pinned version was yanked, resolve again
+                    to_resolve = packages
+        if to_resolve:
+            report_opts: tuple[str, ...] = ()
+            if lock is not None:
+                from ._lock import REPORT_NAME
+
+                report_opts = installer.report_options(report := env / REPORT_NAME)
+            cmd = installer.install_command(py, to_resolve, *options, *report_opts)
+            with self.stats.span("install", cmd=cmd) as args:
+                args["rc"] = rc = yield "run", cmd
+            if rc:
+                self.log_error(f"install {' '.join(packages)}")
+                return 2
+            if lock is not None:
+                yield "call", lambda: self._record_lock(lock, to_resolve, env, report)
+        if wheelhouse is not None:
+            yield "call", lambda: wheelhouse.touch(packages)
+        if site_packages is not None:
+            yield from self._compile_new(py, site_packages, existing)
         return 0
+
+    @staticmethod
+    def _record_lock(
+        lock: Lockfile, requirements: Sequence[str], env: Path, report: Path
+    ) -> None:
+        """Pin what was installed, with the hashes of the report if any"""
+        from ._lock import read_report
+        from ._venv import find_site_packages
+
+        hashes = read_report(report)
+        report.unlink(missing_ok=True)
+        lock.record(requirements, [find_site_packages(env)[0].as_posix()], hashes)
+        lock.save()
+
+    def _compile_new(
+        self, py: str | Path, site_packages: Path, existing: set[str]
+    ) -> Steps[None]:
+        """Compile the distributions that are not in `existing` to bytecode"""
+        from ._compile import compile_command, new_sources, write_file_list
+
+        added, files = yield "call", lambda: new_sources(site_packages, existing)
+        if not files:
+            return
+        workers = 0 if self._compile is True else int(self._compile)
+        file_list = yield "call", lambda: write_file_list(files)
+        cmd = compile_command(py, file_list, workers)
+        with self.stats.span("compile", dists=added, files=len(files)) as args:
+            args["rc"] = rc = yield "run", cmd
+        file_list.unlink(missing_ok=True)
+        if rc:
+            # Not fatal, those not compiled will be compiled by their import
+            _get_logger().warning(f"Failed to compile {' '.join(added)}")
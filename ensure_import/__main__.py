@@ -0,0 +1,143 @@
+"""
+Provision a project ahead of time, instead of one ImportError at a time.
+
+Usage::
+    python -m ensure_import scan src/ main.py     # report third-party imports
+    python -m ensure_import scan --check .        # exit 1 if any is missing
+    python -m ensure_import install .             # install the missing ones
+    python -m ensure_import prefetch --wheelhouse ~/wheels .
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from collections.abc import Sequence
+from pathlib import Path
+
+from . import EnsureImport, __version__
+from ._probe import find_module
+from ._scan import scan_paths
+from ._venv import find_site_packages, is_importable
+
+
+def is_missing(module: str, env: Path | None) -> bool:
+    """Whether the module can't be imported by the python of env
+
+    None env is the current interpreter. Otherwise the site-packages of env
+    are searched, along with the paths and editable finders of its `.pth`.
+    """
+    if env is None:
+        return not find_module(module)
+    if find_module(module, [p.as_posix() for p in find_site_packages(env)]):
+        return False
+    if (importable := is_importable(env, module)) is None:
+        return not find_module(module)  # It includes the system site-packages
+    return not importable
+
+
+def collect(args: argparse.Namespace, ei: EnsureImport) -> list[dict]:
+    """Scanned modules with their distributions and whether they are found
+
+    They are looked up in the env that `ei` installs into, e.g.: the venv of
+    the project's manager, see `EnsureImport._target_env`.
+    """
+    found = scan_paths(args.paths, jobs=args.jobs)
+    env = ei._target_env()
+    return [
+        {
+            "module": m,
+            "package": package,
+            "missing": is_missing(m, env),
+            "files": [f.as_posix() for f in found[m]],
+        }
+        for m, package in ei.iter_packages(found)
+    ]
+
+
+def _instance(args: argparse.Namespace) -> EnsureImport:
+    return EnsureImport(
+        _workdir=args.workdir,
+        _installer=args.installer,
+        _wheelhouse=getattr(args, "wheelhouse", None),
+        _no_venv=args.no_venv or None,
+        _exit=False,
+    )
+
+
+def _report(items: list[dict], as_json: bool) -> None:
+    if as_json:
+        print(json.dumps(items, indent=2))
+        return
+    for item in items:
+        status = "missing" if item["missing"] else "ok"
+        print(f"{item['module']:<24} {item['package']:<28} {status}")
+
+
+def cmd_scan(args: argparse.Namespace) -> int:
+    items = collect(args, _instance(args))
+    if args.missing:
+        items = [i for i in items if i["missing"]]
+    _report(items, args.json)
+    return int(args.check and any(i["missing"] for i in items))
+
+
+def cmd_install(args: argparse.Namespace) -> int:
+    ei = _instance(args)
+    packages = [i["package"] for i in collect(args, ei) if i["missing"]]
+    packages = list(dict.fromkeys(packages))
+    if not packages:
+        print("Nothing to install")
+        return 0
+    if args.dry_run:
+        print(" ".join(packages))
+        return 0
+    return ei.install_and_extend_sys_path(*packages)
+
+
+def cmd_prefetch(args: argparse.Namespace) -> int:
+    ei = _instance(args)
+    modules = [i["module"] for i in collect(args, ei)]
+    return ei.prefetch(*modules) if modules else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m ensure_import", description=__doc__.strip().splitlines()[0]
+    )
+    parser.add_argument("--version", action="version", version=__version__)
+    sub = parser.add_subparsers(dest="command", required=True)
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("paths", nargs="*", default=["."], help="files or dirs")
+    common.add_argument("--workdir", type=Path, help="project dir, default to cwd")
+    common.add_argument("--installer", help="uv/pip/poetry/pdm, default: auto")
+    common.add_argument("--no-venv", action="store_true", help="use current env")
+    common.add_argument("-j", "--jobs", type=int, help="parsing processes")
+
+    scan = sub.add_parser("scan", parents=[common], help="report imports")
+    scan.add_argument("--json", action="store_true", help="output json")
+    scan.add_argument("--missing", action="store_true", help="only missing ones")
+    scan.add_argument("--check", action="store_true", help="exit 1 if missing")
+    scan.set_defaults(func=cmd_scan)
+
+    install = sub.add_parser("install", parents=[common], help="install missing")
+    install.add_argument("--dry-run", action="store_true", help="only print them")
+    install.add_argument("--wheelhouse", help="install offline from this dir")
+    install.set_defaults(func=cmd_install)
+
+    prefetch = sub.add_parser(
+        "prefetch", parents=[common], help="build wheels of all the imports"
+    )
+    prefetch.add_argument("--wheelhouse", required=True, help="dir to save wheels")
+    prefetch.set_defaults(func=cmd_prefetch)
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
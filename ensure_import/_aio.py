@@ -0,0 +1,63 @@
+"""Run the shell commands of EnsureImport by asyncio subprocesses."""
+
+from __future__ import annotations
+
+import asyncio
+import shlex
+import subprocess  # nosec
+from pathlib import Path
+from typing import Any
+
+from . import Steps, T, _get_logger
+
+
+async def run_and_echo(cmd: str) -> int:
+    _get_logger().info(f"--> Executing shell command:\n {cmd}")
+    proc = await asyncio.create_subprocess_exec(*shlex.split(cmd))
+    return await proc.wait()
+
+
+async def check_shell(cmd: str) -> bool:
+    proc = await asyncio.create_subprocess_exec(
+        *shlex.split(cmd), stderr=subprocess.DEVNULL
+    )
+    return await proc.wait() == 0
+
+
+async def find_env_path(cmd: str) -> Path | None:
+    from ._project import env_from_output
+
+    proc = await asyncio.create_subprocess_exec(
+        *shlex.split(cmd), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    stdout, _ = await proc.communicate()
+    if proc.returncode:
+        return None
+    return env_from_output(stdout.decode("utf-8"))
+
+
+async def _handle(effect: str, arg: Any) -> Any:
+    if effect == "run":
+        return await run_and_echo(arg)
+    if effect == "check":
+        return await check_shell(arg)
+    if effect == "env_path":
+        return await find_env_path(arg)
+    if effect == "lock":
+        from ._filelock import FileLock
+
+        return await asyncio.to_thread(FileLock.for_key(*arg).acquire)
+    if effect == "call":
+        return await asyncio.to_thread(arg)
+    raise ValueError(f"Unknown effect: {effect!r}")
+
+
+async def drive(steps: Steps[T]) -> T:
+    """Async counterpart of `EnsureImport._drive`"""
+    result = None
+    while True:
+        try:
+            effect, arg = steps.send(result)
+        except StopIteration as e:
+            return e.value
+        result = await _handle(effect, arg)
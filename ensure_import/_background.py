@@ -0,0 +1,78 @@
+"""Install packages in a background thread and gate imports on the result.
+
+`ImportGate` sits at the front of `sys.meta_path`. When a module that is still
+being installed is imported, the importing thread waits for the install of
+that module only, then lets the regular finders locate it. Imports of other
+modules are not affected.
+"""
+
+from __future__ import annotations
+
+import importlib
+import importlib.abc
+import sys
+import threading
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+_executor: ThreadPoolExecutor | None = None
+_gate: ImportGate | None = None
+_lock = threading.Lock()
+_worker = threading.local()
+
+
+def _run_in_worker(fn: Callable[..., Any], *args: Any) -> Any:
+    _worker.active = True
+    try:
+        return fn(*args)
+    finally:
+        _worker.active = False
+
+
+def submit(fn: Callable[..., Any], *args: Any) -> Future:
+    """Run `fn` in the shared worker, installs are serialized by it"""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(1, thread_name_prefix="ensure_import")
+    return _executor.submit(_run_in_worker, fn, *args)
+
+
+class ImportGate(importlib.abc.MetaPathFinder):
+    def __init__(self) -> None:
+        self._pending: dict[str, Future] = {}
+
+    def add(self, modules: Iterable[str], future: Future) -> None:
+        names = set(modules)
+        self._pending.update(dict.fromkeys(names, future))
+        future.add_done_callback(lambda f: self._discard(names, f))
+
+    def _discard(self, names: set[str], future: Future) -> None:
+        for name in names:
+            if self._pending.get(name) is future:
+                del self._pending[name]
+
+    def pending(self) -> set[Future]:
+        return set(self._pending.values())
+
+    def find_spec(self, fullname, path=None, target=None):
+        if path is not None or getattr(_worker, "active", False):
+            return None
+        if (future := self._pending.get(fullname)) is not None:
+            try:
+                future.result()
+            except Exception:  # nosec
+                pass  # The error is logged by worker, let the import fail
+            importlib.invalidate_caches()
+        return None
+
+
+def get_gate() -> ImportGate:
+    global _gate
+    with _lock:
+        if _gate is None:
+            _gate = ImportGate()
+        if _gate not in sys.meta_path:
+            sys.meta_path.insert(0, _gate)
+    return _gate
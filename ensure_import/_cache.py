@@ -0,0 +1,117 @@
+"""Persist the results of environment discovery between processes.
+
+The cache is a small json file stored in the project's virtual environment
+directory (`venv/.ensure_import.json` or `.venv/.ensure_import.json`), or in
+the user cache directory when the project has no local venv (e.g.: poetry
+keeps its environments outside the project). It is invalidated when the
+interpreter, `pyproject.toml` or `pyvenv.cfg` is modified.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any
+
+CACHE_NAME = ".ensure_import.json"
+VENV_DIRS = ("venv", ".venv")
+DISABLE_ENV = "ENSURE_IMPORT_NO_CACHE"
+
+PathLike = str | Path
+
+
+def user_cache_dir() -> Path:
+    if sys.platform == "win32":
+        base = os.getenv("LOCALAPPDATA") or Path.home() / "AppData" / "Local"
+    else:
+        base = os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "ensure_import"
+
+
+def _mtime(path: str) -> int | None:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class ResolutionCache:
+    """Key-value store bound to a workdir, see module docstring for details"""
+
+    def __init__(self, workdir: Path, venv_dirs: tuple[str, ...] = VENV_DIRS):
+        self.workdir = workdir.absolute()
+        self.venv_dirs = venv_dirs
+        self.enabled = not os.getenv(DISABLE_ENV)
+        dirs = [self.workdir, *self.workdir.parents][:3]
+        self._watched = {sys.executable, *(str(d / "pyproject.toml") for d in dirs)}
+        self._data: dict[str, Any] = self._load() if self.enabled else {}
+        self._dirty = False
+
+    @property
+    def path(self) -> Path:
+        for name in self.venv_dirs:
+            if (venv := self.workdir / name).is_dir():
+                return venv / CACHE_NAME
+        digest = hashlib.sha1(str(self.workdir).encode(), usedforsecurity=False)
+        return user_cache_dir() / f"{digest.hexdigest()[:16]}.json"
+
+    def _load(self) -> dict[str, Any]:
+        try:
+            content = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(content, dict):
+            return {}
+        if content.get("workdir") != str(self.workdir):
+            return {}
+        if content.get("executable") != sys.executable:
+            return {}
+        stamps: dict[str, int | None] = content.get("stamps") or {}
+        fresh = self._watched.issubset(stamps) and all(
+            _mtime(p) == mtime for p, mtime in stamps.items()
+        )
+        self._watched.update(stamps)
+        if not fresh:
+            return {}
+        return content.get("data") or {}
+
+    def watch(self, path: PathLike) -> None:
+        """Invalidate the cache when `path` is created/modified/removed"""
+        self._watched.add(str(path))
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._data.get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        if self._data.get(key, ...) != value:
+            self._data[key] = value
+            self._dirty = True
+
+    def discard(self, key: str) -> None:
+        if self._data.pop(key, ...) is not ...:
+            self._dirty = True
+
+    def save(self) -> bool:
+        """Write to disk if changed, return False when it is not writable"""
+        if not self.enabled or not self._dirty:
+            return True
+        content = {
+            "workdir": str(self.workdir),
+            "executable": sys.executable,
+            "stamps": {p: _mtime(p) for p in sorted(self._watched)},
+            "data": self._data,
+        }
+        path = self.path
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(json.dumps(content, indent=2), encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+            return False
+        self._dirty = False
+        return True
@@ -0,0 +1,158 @@
+"""Share installs between the threads and coroutines of one process.
+
+Only one install into an environment runs at a time. A package that is
+requested while it is being installed waits for that install instead of
+starting another one, and the packages which are requested in the meantime
+are installed together by the next installer invocation. Batchers are kept
+per target environment, so EnsureImport instances that install into the
+same venv share one.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections.abc import Awaitable, Callable, Sequence
+from concurrent.futures import Future
+from typing import Any
+
+
+class InstallBatcher:
+    """Coalesce and batch the calls of `install(*packages) -> returncode`
+
+    Usage::
+        >>> batcher = InstallBatcher(lambda *ps: run(f"pip install {' '.join(ps)}"))
+        >>> batcher.install("numpy")  # in many threads at the same time
+        0
+    """
+
+    def __init__(self, install: Callable[..., int] | None = None) -> None:
+        self._install = install
+        self._cond = threading.Condition()
+        self._pending: dict[str, Future[int]] = {}
+        self._running: dict[str, Future[int]] = {}
+        self._owner: object = None  # Token of the running install
+        self._thread: int | None = None  # Thread that runs it, or its event loop
+        self._released: Future[None] = Future()
+
+    def __repr__(self) -> str:
+        return (
+            f"<{type(self).__name__} running={list(self._running)}"
+            f" pending={list(self._pending)}>"
+        )
+
+    def _future(self, package: str) -> Future[int]:
+        if (f := self._running.get(package) or self._pending.get(package)) is None:
+            f = self._pending[package] = Future()
+        return f
+
+    def install(
+        self, packages: Sequence[str], install: Callable[..., int] | None = None
+    ) -> int:
+        """Block until all the packages were installed, return the worst rc
+
+        :param install: run the batch by this one if it is this call that
+            starts the next install, default to the one given to the batcher
+        """
+        if (install := install or self._install) is None:
+            raise TypeError("No install function")
+        if self._thread == threading.get_ident():
+            # Called by the running install itself, e.g.: by the import hook,
+            # or on the event loop of the running `ainstall`, which would never
+            # resume if this thread waited for it
+            return install(*packages)
+        with self._cond:
+            futures = [self._future(p) for p in packages]
+        while True:
+            with self._cond:
+                while self._owner is not None and not all(f.done() for f in futures):
+                    self._cond.wait()
+                if all(f.done() for f in futures):
+                    break
+                batch = self._claim(object())
+            try:
+                rc = install(*batch)
+            except Exception as e:
+                self._finish(batch, e)
+            except BaseException:
+                self._finish(batch, None)
+                raise
+            else:
+                self._finish(batch, rc)
+        return max((f.result() for f in futures), default=0)
+
+    async def ainstall(
+        self, packages: Sequence[str], install: Callable[..., Awaitable[int]]
+    ) -> int:
+        """Same as `install` but wait without blocking the event loop"""
+        token = object()
+        with self._cond:
+            futures = [self._future(p) for p in packages]
+        while True:
+            with self._cond:
+                if all(f.done() for f in futures):
+                    break
+                if self._owner is None:
+                    batch = self._claim(token)
+                else:
+                    waits: list[Future[Any]] = [self._released]
+                    waits += (f for f in futures if not f.done())
+            if self._owner is not token:
+                await asyncio.wait(
+                    [asyncio.wrap_future(f) for f in waits],
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                continue
+            try:
+                rc = await install(*batch)
+            except Exception as e:
+                self._finish(batch, e)
+            except BaseException:
+                self._finish(batch, None)
+                raise
+            else:
+                self._finish(batch, rc)
+        return max((f.result() for f in futures), default=0)
+
+    def _claim(self, owner: object) -> dict[str, Future[int]]:
+        """Take the pending packages to install by `owner`
+
+        It is called with the lock held and no install running.
+        """
+        batch, self._pending = self._pending, {}
+        self._running = batch
+        self._owner = owner
+        self._thread = threading.get_ident()
+        self._released = Future()
+        return batch
+
+    def _finish(self, batch: dict[str, Future[int]], result: int | Exception | None):
+        """Release the install, settle the futures of its batch
+
+        :param result: None if the install was interrupted, e.g.: by
+            KeyboardInterrupt, then the batch is left for the waiters to retry
+        """
+        with self._cond:
+            self._running = {}
+            self._owner = self._thread = None
+            if result is None:
+                self._pending = {**batch, **self._pending}
+            for future in batch.values():
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                elif result is not None:
+                    future.set_result(result)
+            self._released.set_result(None)
+            self._cond.notify_all()
+
+
+_batchers: dict[str, InstallBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(target: str) -> InstallBatcher:
+    """The batcher of installs into environment `target`"""
+    with _batchers_lock:
+        if (batcher := _batchers.get(target)) is None:
+            batcher = _batchers[target] = InstallBatcher()
+        return batcher
@@ -0,0 +1,86 @@
+"""Compile the modules of newly installed distributions to bytecode.
+
+Otherwise it is done by the first import of each module, on the request path
+and maybe into a read-only layer. The distributions are the `*.dist-info`
+directories that appeared in site-packages during an install, and their `.py`
+files are listed by `RECORD`. They are compiled by the interpreter of the
+environment itself, so the bytecode always matches its version, with a pool
+of worker processes (`compileall -j` only applies to directories, not to the
+files of a list).
+"""
+
+from __future__ import annotations
+
+import csv
+import os
+import shlex
+import tempfile
+from collections.abc import Iterable
+from pathlib import Path
+
+from ._installers import PathLike, _arg
+
+FILE_LIST_PREFIX = "ensure_import-compile-"
+#: files per task of a worker, fewer files than this are compiled in-process
+CHUNK_SIZE = 32
+#: run by `python -c`: compile the files of list argv[2] by argv[1] workers
+COMPILE_SCRIPT = f"""\
+import concurrent.futures, functools, os, py_compile, sys
+with open(sys.argv[2], encoding="utf-8") as f:
+    files = f.read().splitlines()
+workers = int(sys.argv[1]) or os.cpu_count() or 1
+workers = min(workers, 61, len(files) // {CHUNK_SIZE} + 1)
+compile_file = functools.partial(py_compile.compile, quiet=1)
+if workers > 1:
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        done = list(pool.map(compile_file, files, chunksize={CHUNK_SIZE}))
+else:
+    done = list(map(compile_file, files))
+sys.exit(None in done)
+"""
+
+
+def dist_infos(site_packages: Path) -> set[str]:
+    try:
+        return {i for i in os.listdir(site_packages) if i.endswith(".dist-info")}
+    except OSError:
+        return set()
+
+
+def record_sources(site_packages: Path, dist_info: str) -> list[Path]:
+    """.py files of the distribution which are inside site-packages"""
+    try:
+        with open(site_packages / dist_info / "RECORD", newline="") as f:
+            rows = list(csv.reader(f))
+    except OSError:
+        return []
+    root = site_packages.absolute()
+    files = []
+    for row in rows:
+        if not row or not row[0].endswith(".py"):
+            continue
+        path = Path(os.path.normpath(root / row[0]))
+        if path.is_relative_to(root):  # Skip scripts, e.g.: ../../bin/x.py
+            files.append(path)
+    return files
+
+
+def new_sources(
+    site_packages: Path, existing: set[str]
+) -> tuple[list[str], list[Path]]:
+    """Distributions that are not in `existing`, and their .py files"""
+    added = sorted(dist_infos(site_packages) - existing)
+    return added, [f for d in added for f in record_sources(site_packages, d)]
+
+
+def write_file_list(files: Iterable[Path]) -> Path:
+    fd, name = tempfile.mkstemp(prefix=FILE_LIST_PREFIX, suffix=".txt")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.writelines(f"{p}\n" for p in files)
+    return Path(name)
+
+
+def compile_command(python: PathLike, file_list: Path, workers: int = 0) -> str:
+    """:param workers: 0 to start one process per cpu"""
+    script = shlex.quote(COMPILE_SCRIPT)
+    return f"{_arg(python)} -c {script} {workers} {_arg(file_list)}"
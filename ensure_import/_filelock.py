@@ -0,0 +1,124 @@
+"""Inter-process lock, so that only one process creates a venv or installs.
+
+Lock files are kept in `<user cache dir>/locks`, named by a digest of the key
+(venv path and package set). The OS releases the lock when its holder dies,
+so a crashed install never leaves the others waiting forever.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sys
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from ._cache import user_cache_dir
+
+if TYPE_CHECKING:
+    if sys.version_info > (3, 11):
+        from typing import Self
+    else:
+        from typing_extensions import Self
+
+LOCKS_DIR = "locks"
+
+if sys.platform == "win32":
+    import msvcrt
+
+    def _lock(fd: int, blocking: bool) -> bool:
+        # msvcrt has no blocking lock without a time limit, poll instead
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            return False
+        return True
+
+    def _unlock(fd: int) -> None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def _lock(fd: int, blocking: bool) -> bool:
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(fd, flags)
+        except OSError:
+            return False
+        return True
+
+    def _unlock(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class FileLock:
+    """Exclusive lock of a file, `waited` tells whether another process held it
+
+    Usage::
+        >>> with FileLock.for_key("/path/to/venv", "numpy pandas") as lock:
+        ...     if lock.waited:
+        ...         ...  # check whether the other process did the work
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.waited = False
+        self._fd: int | None = None
+
+    @classmethod
+    def for_key(cls, *parts: str) -> FileLock:
+        key = "\0".join(parts).encode()
+        digest = hashlib.sha1(key, usedforsecurity=False).hexdigest()[:16]
+        return cls(user_cache_dir() / LOCKS_DIR / f"{digest}.lock")
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.path.name} locked={self.locked}>"
+
+    @property
+    def locked(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self, timeout: float | None = None, interval: float = 0.05) -> Self:
+        """Wait until locked, raise TimeoutError after `timeout` seconds
+
+        If the lock file can not be opened (e.g.: read-only cache dir), it
+        goes on without locking, as it was before the lock was introduced.
+        """
+        if self.locked:
+            return self
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+        except OSError:
+            return self
+        if not _lock(fd, blocking=False):
+            self.waited = True
+            if timeout is None and sys.platform != "win32":
+                _lock(fd, blocking=True)
+            else:
+                deadline = time.monotonic() + (timeout or 0)
+                while not _lock(fd, blocking=False):
+                    if timeout is not None and time.monotonic() >= deadline:
+                        os.close(fd)
+                        raise TimeoutError(f"Failed to lock {self.path}")
+                    time.sleep(interval)
+        self._fd = fd
+        return self
+
+    def release(self) -> None:
+        if (fd := self._fd) is None:
+            return
+        self._fd = None
+        try:
+            _unlock(fd)
+        finally:
+            os.close(fd)
+
+    def __enter__(self) -> Self:
+        return self.acquire()
+
+    def __exit__(self, *args) -> None:
+        self.release()
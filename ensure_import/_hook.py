@@ -0,0 +1,75 @@
+"""Meta path finder that installs missing top-level modules on demand."""
+
+from __future__ import annotations
+
+import importlib
+import importlib.abc
+import importlib.machinery
+import sys
+import threading
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from . import EnsureImport
+
+
+class InstallHook(importlib.abc.MetaPathFinder):
+    """Appended to the end of `sys.meta_path`, so it is asked only after all
+    the other finders failed. It installs the package of the module by the
+    EnsureImport instance, and returns the spec that is found afterwards, so
+    the original import statement goes on as if the module was there.
+
+    Only the modules that are allowed are installed: the keys of the mapping
+    (`EnsureImport.mapping` and that of the instance) and the import names of
+    the `modules` packages, so that a typo or a probe like `try: import ujson`
+    does not install anything.
+    """
+
+    def __init__(self, ensure_import: EnsureImport) -> None:
+        self.ensure_import = ensure_import
+        mapping = {**ensure_import.mapping, **ensure_import._mapping}
+        self.allowed = frozenset(
+            [*mapping, *ensure_import._import_names(ensure_import._modules)]
+        )
+        self._failed: set[str] = set()
+        self._local = threading.local()
+
+    def __repr__(self) -> str:
+        return (
+            f"<{type(self).__name__} allowed={sorted(self.allowed)}"
+            f" failed={sorted(self._failed)}>"
+        )
+
+    def find_spec(self, fullname, path=None, target=None):
+        if path is not None or "." in fullname or fullname in self._failed:
+            return None
+        if fullname not in self.allowed:
+            return None
+        if fullname in sys.stdlib_module_names or "--no-install" in sys.argv:
+            return None
+        if getattr(self._local, "busy", False):
+            return None  # Module imported by the install itself
+        self._local.busy = True
+        try:
+            ei = self.ensure_import
+            rc = ei.install_and_extend_sys_path(*ei.resolve_packages([fullname]))
+        finally:
+            self._local.busy = False
+        spec = None
+        if rc == 0:
+            importlib.invalidate_caches()
+            spec = importlib.machinery.PathFinder.find_spec(fullname)
+        if spec is None:
+            self._failed.add(fullname)
+        return spec
+
+
+def install(ensure_import: EnsureImport) -> InstallHook:
+    uninstall()
+    hook = InstallHook(ensure_import)
+    sys.meta_path.append(hook)
+    return hook
+
+
+def uninstall() -> None:
+    sys.meta_path[:] = [i for i in sys.meta_path if not isinstance(i, InstallHook)]
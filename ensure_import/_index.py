@@ -0,0 +1,86 @@
+"""Map import names to the distribution names that pip should install."""
+
+from __future__ import annotations
+
+import functools
+import json
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from pathlib import Path
+
+INDEX_FILE = Path(__file__).with_name("_distributions.json")
+INDEX_FORMAT = 1
+
+
+@functools.cache
+def bundled_index() -> dict[str, str]:
+    """Known import names whose distribution name is different.
+
+    Names which only differ by case or `-`/`_` are not listed, pip resolves
+    them anyway.
+    """
+    try:
+        data = json.loads(INDEX_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if data.get("format") != INDEX_FORMAT:
+        return {}
+    return data["modules"]
+
+
+def installed_index(path: Sequence[str] | None = None) -> dict[str, str]:
+    """Import name -> distribution from the metadata of installed packages
+
+    The directories are read through the inventory, which is cached by their
+    mtime, so an unchanged site-packages is not scanned again.
+
+    :param path: directories to read, default to `sys.path`
+    """
+    import os
+    import sys
+
+    from ._inventory import Inventory
+
+    inventory = Inventory()
+    index: dict[str, str] = {}
+    try:
+        for directory in dict.fromkeys(sys.path if path is None else path):
+            if not directory or not os.path.isdir(directory):
+                continue  # e.g.: a zip file in sys.path
+            dists = inventory.directory(Path(directory))["dists"]
+            for name, _, tops in dists.values():
+                for top in tops:
+                    if name and top != name:
+                        index.setdefault(top, name)
+    finally:
+        inventory.save()
+    return index
+
+
+def iter_distributions(
+    modules: Iterable[str],
+    overrides: Mapping[str, str] | None = None,
+    path: Sequence[str] | None = None,
+) -> Iterator[tuple[str, str]]:
+    """(module, distribution) of each module as soon as it is read from `modules`
+
+    Priority: `overrides` > installed metadata > bundled index > module name
+    """
+    overrides = overrides or {}
+    installed: dict[str, str] | None = None
+    for module in modules:
+        top = module.partition(".")[0]
+        if (dist := overrides.get(module, overrides.get(top))) is None:
+            if installed is None:
+                installed = installed_index(path)
+            dist = installed.get(top) or bundled_index().get(top, module)
+        yield module, dist
+
+
+def resolve_distributions(
+    modules: Iterable[str],
+    overrides: Mapping[str, str] | None = None,
+    path: Sequence[str] | None = None,
+) -> list[str]:
+    """Get the names to pass to pip for `modules`, see `iter_distributions`"""
+    pairs = iter_distributions(modules, overrides, path)
+    return list(dict.fromkeys(dist for _, dist in pairs))
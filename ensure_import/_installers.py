@@ -0,0 +1,164 @@
+"""Backends that create virtual environments and install packages."""
+
+from __future__ import annotations
+
+import shlex
+import shutil
+import sys
+from collections.abc import Sequence
+from pathlib import Path
+
+PathLike = str | Path
+
+
+def _arg(value: PathLike) -> str:
+    # `python` may be a command such as 'poetry run python', only quote paths
+    return shlex.quote(value.as_posix()) if isinstance(value, Path) else value
+
+
+class Installer:
+    """Install packages by `python -m pip` and create venv by `python -m venv`"""
+
+    name = "pip"
+    #: executable that must be found in PATH to use this backend
+    requires: str | None = None
+    #: whether the target environment needs pip
+    needs_pip = True
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return cls.requires is None or shutil.which(cls.requires) is not None
+
+    def venv_dir(self, requested: str) -> str:
+        """Directory name where the virtual environment will be created"""
+        return requested
+
+    def venv_command(self, python: PathLike, venv_dir: PathLike) -> str:
+        return f"{_arg(python)} -m venv {_arg(venv_dir)}"
+
+    def bootstrap_command(self, python: PathLike) -> str | None:
+        """Command to run once for a newly used environment"""
+        return f"{_arg(python)} -m pip install --upgrade pip"
+
+    def install_command(
+        self, python: PathLike, packages: Sequence[str], *options: str
+    ) -> str:
+        args = " ".join([*options, *map(shlex.quote, packages)])
+        return f"{_arg(python)} -m pip install {args}"
+
+    def wheel_command(
+        self, python: PathLike, wheel_dir: PathLike, packages: Sequence[str]
+    ) -> str:
+        """Build wheels of packages (and dependencies) for the interpreter"""
+        args = " ".join(map(shlex.quote, packages))
+        return f"{_arg(python)} -m pip wheel --wheel-dir {_arg(wheel_dir)} {args}"
+
+    def report_options(self, report: PathLike) -> tuple[str, ...]:
+        """Install options to write what was installed as json (pip>=22.2)"""
+        return ("--report", _arg(report))
+
+    def no_compile_options(self) -> tuple[str, ...]:
+        """Install options to skip compiling to bytecode, it is done afterwards"""
+        return ("--no-compile",)
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.name!r}>"
+
+
+class PipInstaller(Installer):
+    pass
+
+
+class UvInstaller(Installer):
+    """Use `uv venv` and `uv pip install`, which is much faster than pip"""
+
+    name = "uv"
+    requires = "uv"
+    needs_pip = False
+
+    def venv_command(self, python: PathLike, venv_dir: PathLike) -> str:
+        return f"uv venv --python {_arg(python)} {_arg(venv_dir)}"
+
+    def bootstrap_command(self, python: PathLike) -> str | None:
+        return None
+
+    def install_command(
+        self, python: PathLike, packages: Sequence[str], *options: str
+    ) -> str:
+        args = " ".join([*options, *map(shlex.quote, packages)])
+        return f"uv pip install --python {_arg(python)} {args}"
+
+    def wheel_command(
+        self, python: PathLike, wheel_dir: PathLike, packages: Sequence[str]
+    ) -> str:
+        # uv can't build wheels and its venv has no pip, let the pip of current
+        # python build them for the venv's interpreter (pip>=22.3)
+        cmd = super().wheel_command(Path(sys.executable), wheel_dir, packages)
+        return cmd.replace(" -m pip ", f" -m pip --python {_arg(python)} ", 1)
+
+    def report_options(self, report: PathLike) -> tuple[str, ...]:
+        return ()
+
+    def no_compile_options(self) -> tuple[str, ...]:
+        return ()  # It doesn't compile unless `--compile-bytecode` is given
+
+
+class PoetryInstaller(Installer):
+    """Install into the poetry managed environment of current project"""
+
+    name = "poetry"
+    requires = "poetry"
+
+    def venv_command(self, python: PathLike, venv_dir: PathLike) -> str:
+        return f"poetry env use {_arg(python)}"
+
+    def bootstrap_command(self, python: PathLike) -> str | None:
+        return super().bootstrap_command("poetry run python")
+
+    def install_command(
+        self, python: PathLike, packages: Sequence[str], *options: str
+    ) -> str:
+        return super().install_command("poetry run python", packages, *options)
+
+    def wheel_command(
+        self, python: PathLike, wheel_dir: PathLike, packages: Sequence[str]
+    ) -> str:
+        return super().wheel_command("poetry run python", wheel_dir, packages)
+
+
+class PdmInstaller(Installer):
+    """Create the in-project `.venv` by pdm, install by its pip"""
+
+    name = "pdm"
+    requires = "pdm"
+
+    def venv_dir(self, requested: str) -> str:
+        return ".venv"
+
+    def venv_command(self, python: PathLike, venv_dir: PathLike) -> str:
+        return f"pdm venv create --with-pip {_arg(python)}"
+
+
+INSTALLERS: dict[str, type[Installer]] = {
+    i.name: i for i in (UvInstaller, PipInstaller, PoetryInstaller, PdmInstaller)
+}
+#: candidates of auto-detection, fastest first
+AUTO_ORDER = ("uv", "pip")
+
+
+def get_installer(name: str | Installer | None = None) -> Installer:
+    """Get backend by name, or the fastest available one if `name` is None"""
+    if isinstance(name, Installer):
+        return name
+    if name is None:
+        for candidate in AUTO_ORDER:
+            if (cls := INSTALLERS[candidate]).is_available():
+                return cls()
+        return PipInstaller()
+    try:
+        cls = INSTALLERS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown installer {name!r}, expected one of: {', '.join(INSTALLERS)}"
+        ) from None
+    return cls()
@@ -0,0 +1,174 @@
+"""Persistent index of the modules and distributions in site-packages.
+
+Each directory is indexed with its mtime, which changes whenever a package is
+added or removed. An outdated directory is rescanned, and the metadata of the
+dist-info directories which are still there is reused, so only the changed
+distributions are parsed again. The index lives in the user cache dir, set
+env `ENSURE_IMPORT_NO_CACHE=1` to disable it.
+"""
+
+from __future__ import annotations
+
+import importlib.machinery
+import json
+import os
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from ._cache import DISABLE_ENV, user_cache_dir
+
+INVENTORY_NAME = "inventory.json"
+INVENTORY_FORMAT = 1
+
+
+class ModuleInfo(NamedTuple):
+    name: str
+    distribution: str | None
+    version: str | None
+
+
+def _module_name(entry: os.DirEntry) -> str | None:
+    """Same rules as `pkgutil.iter_modules`: packages need `__init__`"""
+    if entry.is_dir():
+        if "." in entry.name:
+            return None
+        try:
+            names = os.listdir(entry.path)
+        except OSError:
+            return None
+        suffixes = importlib.machinery.all_suffixes()
+        if any(f"__init__{s}" in names for s in suffixes):
+            return entry.name
+        return None
+    for suffix in importlib.machinery.all_suffixes():
+        if entry.name.endswith(suffix):
+            name = entry.name[: -len(suffix)]
+            return name if name and "." not in name and name != "__init__" else None
+    return None
+
+
+def _read_metadata(meta_dir: Path) -> list[Any]:
+    """[name, version, top-level modules] of a dist-info/egg-info directory"""
+    name = version = None
+    for filename in ("METADATA", "PKG-INFO"):
+        try:
+            with open(meta_dir / filename, encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    if not line.strip():
+                        break  # Only the headers are needed
+                    key, _, value = line.partition(":")
+                    if key == "Name":
+                        name = value.strip()
+                    elif key == "Version":
+                        version = value.strip()
+        except OSError:
+            continue
+        break
+    tops: list[str] = []
+    try:
+        tops = (meta_dir / "top_level.txt").read_text(encoding="utf-8").split()
+    except OSError:
+        try:
+            record = (meta_dir / "RECORD").read_text(encoding="utf-8")
+        except OSError:
+            record = ""
+        for line in record.splitlines():
+            parts = line.split(",", 1)[0].split("/")
+            top = parts[0]
+            if len(parts) == 1:
+                if not top.endswith(".py"):
+                    continue
+                top = top[:-3]
+            if top.isidentifier() and top != "__pycache__" and top not in tops:
+                tops.append(top)
+    return [name, version, tops]
+
+
+class Inventory:
+    """See module docstring"""
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.enabled = path is not None or not os.getenv(DISABLE_ENV)
+        self.path = path or user_cache_dir() / INVENTORY_NAME
+        self._data: dict[str, Any] = self._load() if self.enabled else {}
+        self._dirty = False
+
+    def _load(self) -> dict[str, Any]:
+        try:
+            content = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(content, dict) or content.get("format") != INVENTORY_FORMAT:
+            return {}
+        return content.get("directories") or {}
+
+    def save(self) -> bool:
+        if not self.enabled or not self._dirty:
+            return True
+        content = {"format": INVENTORY_FORMAT, "directories": self._data}
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(json.dumps(content), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+            return False
+        self._dirty = False
+        return True
+
+    def directory(self, directory: Path) -> dict[str, Any]:
+        """Index of one directory: {"mtime", "modules", "dists"}"""
+        key = str(directory.absolute())
+        try:
+            mtime = os.stat(key).st_mtime_ns
+        except OSError:
+            return {"mtime": None, "modules": [], "dists": {}}
+        cached = self._data.get(key)
+        if cached is not None and cached["mtime"] == mtime:
+            return cached
+        old_dists: dict[str, list[Any]] = (cached or {}).get("dists", {})
+        modules: list[str] = []
+        dists: dict[str, list[Any]] = {}
+        with os.scandir(key) as it:
+            for entry in it:
+                if entry.name.endswith((".dist-info", ".egg-info")) and entry.is_dir():
+                    dists[entry.name] = old_dists.get(entry.name) or _read_metadata(
+                        Path(entry.path)
+                    )
+                elif name := _module_name(entry):
+                    modules.append(name)
+        index = {"mtime": mtime, "modules": sorted(set(modules)), "dists": dists}
+        self._data[key] = index
+        self._dirty = True
+        return index
+
+    def modules(self, directory: Path) -> list[str]:
+        return self.directory(directory)["modules"]
+
+    def iter_available(self, directories: Iterable[Path]) -> Iterator[ModuleInfo]:
+        """Yield modules of the directories one by one with dist and version"""
+        seen: set[str] = set()
+        for directory in directories:
+            index = self.directory(directory)
+            owners: dict[str, tuple[str | None, str | None]] = {}
+            for name, version, tops in index["dists"].values():
+                for top in tops:
+                    owners.setdefault(top, (name, version))
+            for module in index["modules"]:
+                if module in seen:
+                    continue
+                seen.add(module)
+                yield ModuleInfo(module, *owners.get(module, (None, None)))
+
+
+def site_directories() -> list[Path]:
+    """site-packages/dist-packages directories in sys.path"""
+    import sys
+
+    return [
+        Path(p)
+        for p in dict.fromkeys(sys.path)
+        if p and Path(p).name in ("site-packages", "dist-packages")
+    ]
@@ -0,0 +1,100 @@
+"""Module stand-ins that import, and install if missing, on first use."""
+
+from __future__ import annotations
+
+import importlib
+import sys
+import threading
+from types import ModuleType
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from . import EnsureImport
+
+
+def _import(name: str, ensure_import: EnsureImport) -> ModuleType:
+    try:
+        return importlib.import_module(name)
+    except ModuleNotFoundError as e:
+        missing = e.name or name
+        packages = ensure_import.resolve_packages([missing])
+        if ensure_import.install_and_extend_sys_path(*packages):
+            raise ModuleNotFoundError(
+                f"Failed to install {' '.join(packages)} for {name!r}", name=missing
+            ) from e
+    importlib.invalidate_caches()
+    return importlib.import_module(name)
+
+
+class LazyModule(ModuleType):
+    """Stand-in of module `name`, which is loaded by its first attribute access
+
+    Until then it is kept in `sys.modules`, so `import name` elsewhere gets it
+    too. Once loaded, the real module replaces it in `sys.modules` and in the
+    namespaces it was created for, and the stand-in forwards to the module for
+    the references that were taken before.
+    """
+
+    def __init__(self, name: str, ensure_import: EnsureImport) -> None:
+        super().__init__(name)
+        for attr in ("__spec__", "__loader__", "__package__"):
+            del self.__dict__[attr]  # Forward them to the module as well
+        self.__dict__.update(
+            _lazy_ensure_import=ensure_import,
+            _lazy_lock=threading.RLock(),
+            _lazy_module=None,
+            _lazy_namespaces=[],
+        )
+
+    @classmethod
+    def create(
+        cls,
+        name: str,
+        ensure_import: EnsureImport,
+        namespace: dict[str, Any] | None = None,
+    ) -> ModuleType:
+        """The module if it is imported, otherwise the registered stand-in"""
+        module = sys.modules.setdefault(name, cls(name, ensure_import))
+        if isinstance(module, cls) and namespace is not None:
+            module.__dict__["_lazy_namespaces"].append(namespace)
+        return module
+
+    def _lazy_load(self) -> ModuleType:
+        if (module := self.__dict__["_lazy_module"]) is not None:
+            return module
+        with self.__dict__["_lazy_lock"]:
+            if (module := self.__dict__["_lazy_module"]) is not None:
+                return module
+            name = self.__name__
+            ei: EnsureImport = self.__dict__["_lazy_ensure_import"]
+            if sys.modules.get(name) is self:
+                del sys.modules[name]
+            with ei.stats.span("lazy_load", module=name):
+                try:
+                    module = _import(name, ei)
+                except BaseException:
+                    sys.modules.setdefault(name, self)
+                    raise
+            self.__dict__["_lazy_module"] = module
+            for namespace in self.__dict__["_lazy_namespaces"]:
+                for key, value in list(namespace.items()):
+                    if value is self:
+                        namespace[key] = module
+        return module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._lazy_load(), attr)
+
+    def __setattr__(self, attr: str, value: Any) -> None:
+        setattr(self._lazy_load(), attr, value)
+
+    def __delattr__(self, attr: str) -> None:
+        delattr(self._lazy_load(), attr)
+
+    def __dir__(self) -> list[str]:
+        return dir(self._lazy_load())
+
+    def __repr__(self) -> str:
+        if (module := self.__dict__["_lazy_module"]) is not None:
+            return repr(module)
+        return f"<{type(self).__name__} {self.__name__!r} (not loaded)>"
@@ -0,0 +1,182 @@
+"""Versions that were installed into a virtual environment, to reinstall them.
+
+The lockfile `ensure_import.lock` is written next to the venv directory, it
+maps each requested package to the pinned distributions it pulled in (itself
+and its dependencies, found by the installed metadata). A later install of
+the same request writes those pins into a requirements file and installs it
+with `--no-deps`, so the resolver is skipped. Hashes are added when the
+installer reported them (`pip install --report`); pip switches to hash
+checking mode as soon as one of the requirements has hashes, so they are only
+written when all the pins have some.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+from typing import Any
+
+from ._probe import normalize, requirement_name
+
+LOCK_NAME = "ensure_import.lock"
+LOCK_FORMAT = 1
+REQUIREMENTS_NAME = ".ensure_import-lock.txt"
+REPORT_NAME = ".ensure_import-report.json"
+
+
+def _python() -> str:
+    return "{}.{}".format(*sys.version_info)
+
+
+def read_report(path: Path) -> dict[str, list[str]]:
+    """{normalized name: ['sha256:...']} of a `pip install --report` file"""
+    try:
+        report = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    hashes: dict[str, list[str]] = {}
+    for item in report.get("install") or []:
+        try:
+            name = item["metadata"]["name"]
+            archive = item["download_info"]["archive_info"]
+        except (KeyError, TypeError):
+            continue
+        if found := archive.get("hashes"):
+            hashes[normalize(name)] = sorted(f"{k}:{v}" for k, v in found.items())
+        elif (value := archive.get("hash")) and "=" in value:
+            hashes[normalize(name)] = [value.replace("=", ":", 1)]
+    return hashes
+
+
+def installed_closure(requirement: str, path: Sequence[str]) -> dict[str, str] | None:
+    """{name: version} of the requirement and its installed dependencies
+
+    Dependencies which are not installed (extras, markers of other platforms)
+    are skipped. Return None if the requirement itself is not installed.
+    """
+    import importlib.metadata
+
+    dists = {
+        normalize(d.metadata["Name"] or ""): d
+        for d in importlib.metadata.distributions(path=list(path))
+    }
+    if normalize(requirement_name(requirement)) not in dists:
+        return None
+    pending = [normalize(requirement_name(requirement))]
+    result: dict[str, str] = {}
+    while pending:
+        if (key := pending.pop()) in result or (dist := dists.get(key)) is None:
+            continue
+        result[key] = dist.version
+        for req in dist.requires or []:
+            if "extra ==" not in req.replace('"', "").replace("'", ""):
+                pending.append(normalize(requirement_name(req)))
+    return result
+
+
+class Lockfile:
+    """See module docstring"""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._data = self._load()
+        self._dirty = False
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.path.as_posix()!r})"
+
+    def _load(self) -> dict[str, Any]:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = None
+        if (
+            not isinstance(data, dict)
+            or data.get("format") != LOCK_FORMAT
+            or data.get("python") != _python()
+        ):
+            return {"requests": {}, "packages": {}}
+        return data
+
+    @property
+    def requests(self) -> dict[str, list[str]]:
+        return self._data["requests"]
+
+    @property
+    def packages(self) -> dict[str, dict[str, Any]]:
+        return self._data["packages"]
+
+    def split(self, requirements: Iterable[str]) -> tuple[list[str], list[str]]:
+        """Separate the requirements into locked ones and the ones to resolve"""
+        locked: list[str] = []
+        missing: list[str] = []
+        for req in requirements:
+            names = self.requests.get(req.strip())
+            if names and all(n in self.packages for n in names):
+                locked.append(req)
+            else:
+                missing.append(req)
+        return locked, missing
+
+    def requirements(self, locked: Iterable[str]) -> list[str]:
+        """Lines of requirements file that pin `locked` with dependencies"""
+        names = sorted({n for req in locked for n in self.requests[req.strip()]})
+        pins = [self.packages[n] for n in names]
+        with_hashes = all(p.get("hashes") for p in pins)
+        lines = []
+        for name, pin in zip(names, pins, strict=True):
+            line = f"{name}=={pin['version']}"
+            if with_hashes:
+                line += "".join(f" --hash={h}" for h in pin["hashes"])
+            lines.append(line)
+        return lines
+
+    def write_requirements(self, locked: Iterable[str], directory: Path) -> Path:
+        path = directory / REQUIREMENTS_NAME
+        path.write_text("\n".join(self.requirements(locked)) + "\n", encoding="utf-8")
+        return path
+
+    def record(
+        self,
+        requirements: Iterable[str],
+        path: Sequence[str],
+        hashes: dict[str, list[str]] | None = None,
+    ) -> list[str]:
+        """Pin the installed versions of the requirements, return recorded ones"""
+        recorded: list[str] = []
+        hashes = hashes or {}
+        for req in requirements:
+            if (closure := installed_closure(req, path)) is None:
+                continue
+            for name, version in closure.items():
+                pin = self.packages.get(name) or {}
+                if pin.get("version") != version:
+                    pin = {"version": version}
+                if name in hashes:
+                    pin["hashes"] = hashes[name]
+                if self.packages.get(name) != pin:
+                    self.packages[name] = pin
+                    self._dirty = True
+            names = sorted(closure)
+            if self.requests.get(req.strip()) != names:
+                self.requests[req.strip()] = names
+                self._dirty = True
+            recorded.append(req)
+        return recorded
+
+    def save(self) -> bool:
+        if not self._dirty:
+            return True
+        self._data.update(format=LOCK_FORMAT, python=_python())
+        tmp = self.path.with_name(f"{LOCK_NAME}.{os.getpid()}.tmp")
+        try:
+            tmp.write_text(json.dumps(self._data, indent=2, sort_keys=True), "utf-8")
+            os.replace(tmp, self.path)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+            return False
+        self._dirty = False
+        return True
@@ -0,0 +1,148 @@
+"""Check whether modules/distributions are available without importing them."""
+
+from __future__ import annotations
+
+import importlib.machinery
+import importlib.metadata
+import importlib.util
+import re
+import sys
+from collections.abc import Iterable, Sequence
+from typing import Any, NamedTuple
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*")
+
+
+class ModuleStatus(NamedTuple):
+    name: str
+    present: bool
+    version: str | None = None
+
+
+def normalize(name: str) -> str:
+    """PEP 503 normalized project name"""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def requirement_name(requirement: str) -> str:
+    """'foo[bar]>=1.0' -> 'foo'"""
+    m = _NAME_RE.match(requirement.strip())
+    return m.group() if m else requirement
+
+
+def requirement_specifier(requirement: str) -> str:
+    """'foo[bar]>=1.0; python_version>"3.8"' -> '>=1.0', '' if no version given"""
+    text = requirement.split(";", 1)[0].strip()
+    rest = text[len(requirement_name(text)) :].strip()
+    if rest.startswith("["):
+        rest = rest.partition("]")[2].strip()
+    if rest.startswith("@"):
+        return ""  # Direct reference, no version to compare
+    return rest.strip("() ")
+
+
+def satisfies(version: str | None, specifier: str) -> bool:
+    """Whether `version` matches `specifier`, False when unable to tell
+
+    `packaging` is not a dependency, without it any specifier is unsatisfied,
+    then the installer decides whether an upgrade is needed.
+    """
+    if not specifier:
+        return True
+    if version is None:
+        return False
+    try:
+        from packaging.specifiers import SpecifierSet
+    except ImportError:
+        return False
+    try:
+        return SpecifierSet(specifier).contains(version, prereleases=True)
+    except ValueError:  # InvalidSpecifier/InvalidVersion
+        return False
+
+
+def find_module(name: str, path: Sequence[str] | None = None) -> bool:
+    """Whether the top-level module of `name` can be found.
+
+    Only finders are consulted, so the code of the module is not executed.
+    """
+    top = name.partition(".")[0]
+    if not top.isidentifier():
+        return False
+    if path is None:
+        if top in sys.modules:
+            return True
+        try:
+            return importlib.util.find_spec(top) is not None
+        except (ImportError, ValueError):
+            return False
+    return importlib.machinery.PathFinder.find_spec(top, list(path)) is not None
+
+
+def distribution_version(name: str, path: Sequence[str] | None = None) -> str | None:
+    """Version of the installed distribution named `name`, None if missing"""
+    if path is None:
+        try:
+            return importlib.metadata.version(name)
+        except (importlib.metadata.PackageNotFoundError, ValueError):
+            return None
+    for dist in importlib.metadata.distributions(name=name, path=list(path)):
+        return dist.version
+    return None
+
+
+def module_distributions(path: Sequence[str] | None) -> dict[str, list[str]]:
+    """Like `importlib.metadata.packages_distributions` but accept `path`"""
+    mapping: dict[str, list[str]] = {}
+    kw: dict[str, Any] = {} if path is None else {"path": list(path)}
+    for dist in importlib.metadata.distributions(**kw):
+        dist_name = dist.metadata["Name"]
+        top_level = dist.read_text("top_level.txt")
+        tops = top_level.split() if top_level else []
+        if not tops:
+            for file in dist.files or ():
+                top = file.parts[0] if file.parts else ""
+                if len(file.parts) == 1:
+                    if file.suffix != ".py":
+                        continue
+                    top = top.removesuffix(".py")
+                if top.isidentifier() and top != "__pycache__":
+                    tops.append(top)
+        for top in dict.fromkeys(tops):
+            mapping.setdefault(top, []).append(dist_name)
+    return mapping
+
+
+def probe(
+    names: Iterable[str], path: Sequence[str] | None = None
+) -> dict[str, ModuleStatus]:
+    """Report present/missing/version for many module or distribution names.
+
+    A name is present when it is the name of an installed distribution, or a
+    finder can locate it as a top-level module, and the installed version
+    matches the specifier of the requirement if any. Version is looked up from
+    the distribution metadata, so none of the probed modules get imported.
+
+    :param names: module names or pip requirements, e.g.: `yaml`, `pyyaml>=6`
+    :param path: directories to search instead of `sys.path`
+    """
+    result: dict[str, ModuleStatus] = {}
+    owners: dict[str, list[str]] | None = None
+    for requirement in names:
+        name = requirement_name(requirement)
+        specifier = requirement_specifier(requirement)
+        version = distribution_version(name, path)
+        if version is not None:
+            present = satisfies(version, specifier)
+            result[requirement] = ModuleStatus(name, present, version)
+            continue
+        if not find_module(name, path):
+            result[requirement] = ModuleStatus(name, False)
+            continue
+        if owners is None:
+            owners = module_distributions(path)
+        if dists := owners.get(name.partition(".")[0]):
+            version = distribution_version(dists[0], path)
+        present = satisfies(version, specifier)
+        result[requirement] = ModuleStatus(name, present, version)
+    return result
@@ -0,0 +1,191 @@
+"""Find the project manager (poetry/pdm/uv/hatch) and its environment.
+
+It is decided by `pyproject.toml` (parsed by tomllib) and the lock/config
+files beside it, and the environment is located by the rules of each tool,
+so no tool has to be spawned. `Project.find_command` asks the tool itself,
+which is only needed when the location can not be worked out from files.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Any, NamedTuple
+
+#: directories to look for pyproject.toml: workdir and its parents
+DEPTH = 3
+#: command that prints the environment of the project, for the fallback
+FIND_COMMANDS = {
+    "poetry": "poetry env info --path",
+    "pdm": "pdm info --python",
+    "hatch": "hatch env find",
+}
+
+
+class Project(NamedTuple):
+    manager: str | None
+    root: Path
+    #: None if it can not be determined without running the manager
+    env: Path | None
+
+    @property
+    def find_command(self) -> str | None:
+        import shutil
+
+        if self.manager is None or (cmd := FIND_COMMANDS.get(self.manager)) is None:
+            return None
+        return cmd if shutil.which(self.manager) else None
+
+
+def load_toml(path: Path) -> dict[str, Any] | None:
+    """Parsed content, None if there is no toml parser (python3.10 without tomli)"""
+    if sys.version_info >= (3, 11):
+        import tomllib
+    else:
+        try:
+            import tomli as tomllib
+        except ImportError:
+            return None
+    try:
+        with path.open("rb") as f:
+            return tomllib.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def find_pyproject(dirpath: Path, depth: int = DEPTH) -> Path | None:
+    for d in [dirpath, *dirpath.parents][:depth]:
+        if (toml_file := d / "pyproject.toml").is_file():
+            return toml_file
+    return None
+
+
+def _tool_sections(toml_file: Path) -> tuple[dict[str, Any], dict[str, Any] | None]:
+    """(`tool` table, the whole document), parse headers only if no tomllib"""
+    if (doc := load_toml(toml_file)) is not None:
+        return doc.get("tool") or {}, doc
+    try:
+        text = toml_file.read_text(encoding="utf-8")
+    except OSError:
+        return {}, None
+    names = re.findall(r"^\[tool\.(\w+)[\].]", text, re.M)
+    return dict.fromkeys(names, {}), None
+
+
+def manager_of(root: Path, tool: dict[str, Any]) -> str | None:
+    for name, lock in (
+        ("poetry", "poetry.lock"),
+        ("pdm", "pdm.lock"),
+        ("uv", "uv.lock"),
+        ("hatch", "hatch.toml"),
+    ):
+        if name in tool or (root / lock).exists():
+            return name
+    return None
+
+
+def _poetry_cache_dir() -> Path:
+    if cache := os.getenv("POETRY_CACHE_DIR"):
+        return Path(cache)
+    if sys.platform == "win32":
+        base = os.getenv("LOCALAPPDATA") or Path.home() / "AppData" / "Local"
+        return Path(base) / "pypoetry" / "Cache"
+    if sys.platform == "darwin":
+        return Path.home() / "Library" / "Caches" / "pypoetry"
+    return Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache") / "pypoetry"
+
+
+def _poetry_config(root: Path) -> dict[str, Any]:
+    """virtualenvs settings of the project's poetry.toml"""
+    if not (config := root / "poetry.toml").exists():
+        return {}
+    return (load_toml(config) or {}).get("virtualenvs") or {}
+
+
+def poetry_env(root: Path, doc: dict[str, Any] | None) -> Path | None:
+    """Same naming rule as poetry's EnvManager.generate_env_name"""
+    import base64
+    import hashlib
+
+    config = _poetry_config(root)
+    if in_project := os.getenv("POETRY_VIRTUALENVS_IN_PROJECT"):
+        config["in-project"] = in_project.lower() in ("1", "true")
+    if (venv := root / ".venv").is_dir() or config.get("in-project"):
+        return venv
+    if doc is None:
+        return None
+    name = (doc.get("tool", {}).get("poetry") or {}).get("name") or (
+        doc.get("project") or {}
+    ).get("name")
+    if not name:
+        return None
+    if path := os.getenv("POETRY_VIRTUALENVS_PATH") or config.get("path"):
+        envs_dir = Path(path).expanduser()
+    else:
+        envs_dir = _poetry_cache_dir() / "virtualenvs"
+    sanitized = re.sub(r'[ $`!*@"\\\r\n\t]', "_", name.lower())[:42]
+    digest = hashlib.sha256(str(root.resolve()).encode()).digest()
+    prefix = f"{sanitized}-{base64.urlsafe_b64encode(digest).decode()[:8]}"
+    minor = "{}.{}".format(*sys.version_info)
+    if (envs := load_toml(envs_dir / "envs.toml")) and prefix in envs:
+        minor = envs[prefix].get("minor") or minor
+    if (env := envs_dir / f"{prefix}-py{minor}").is_dir():
+        return env
+    candidates = list(envs_dir.glob(f"{prefix}-py*"))
+    return candidates[0] if len(candidates) == 1 else None
+
+
+def pdm_env(root: Path) -> Path | None:
+    try:
+        python = (root / ".pdm-python").read_text(encoding="utf-8").strip()
+    except OSError:
+        python = ""
+    if python:
+        # .venv/bin/python or .venv/Scripts/python.exe
+        return Path(python).parent.parent
+    venv = root / ".venv"
+    return venv if venv.is_dir() else None
+
+
+def uv_env(root: Path) -> Path:
+    if env := os.getenv("UV_PROJECT_ENVIRONMENT"):
+        return root / env  # Absolute path is kept by the joining
+    return root / ".venv"
+
+
+def hatch_env(root: Path, tool: dict[str, Any]) -> Path | None:
+    default = ((tool.get("hatch") or {}).get("envs") or {}).get("default") or {}
+    if path := default.get("path"):
+        return root / path
+    return None
+
+
+def detect(dirpath: Path) -> Project:
+    """Manager of the project which the dirpath belongs to, and its environment"""
+    if (toml_file := find_pyproject(dirpath)) is None:
+        return Project(None, dirpath, None)
+    root = toml_file.parent
+    tool, doc = _tool_sections(toml_file)
+    manager = manager_of(root, tool)
+    env: Path | None = None
+    if manager == "poetry":
+        env = poetry_env(root, doc)
+    elif manager == "pdm":
+        env = pdm_env(root)
+    elif manager == "uv":
+        env = uv_env(root)
+    elif manager == "hatch":
+        env = hatch_env(root, tool)
+    return Project(manager, root, env)
+
+
+def env_from_output(output: str) -> Path | None:
+    """Environment dir of the `FIND_COMMANDS` output (a dir or its python)"""
+    if not (line := output.strip().splitlines()[-1:]):
+        return None
+    path = Path(line[0].strip())
+    if path.is_file():
+        return path.parent.parent
+    return path if path.is_dir() else None
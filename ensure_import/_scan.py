@@ -0,0 +1,315 @@
+"""Static discovery of the modules that a piece of source code imports."""
+
+from __future__ import annotations
+
+import ast
+import json
+import linecache
+import os
+import sys
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from types import TracebackType
+from typing import Any
+
+#: directories that never contain the sources of a project
+SKIP_DIRS = {
+    "__pycache__",
+    "build",
+    "dist",
+    "node_modules",
+    "site-packages",
+    "venv",
+}
+_OPTIONAL_ERRORS = {"ImportError", "ModuleNotFoundError"}
+#: fields of the nodes that hold statements, e.g.: If.body, Try.handlers
+_BLOCK_FIELDS = ("body", "handlers", "orelse", "finalbody", "cases")
+_TRY_NODES = (ast.Try, ast.TryStar) if sys.version_info >= (3, 11) else (ast.Try,)
+SCAN_CACHE_NAME = "scan.json"
+SCAN_FORMAT = 1
+#: stale files to parse before a process pool is worth starting
+PARALLEL_MIN = 200
+#: max files sent to a worker at once
+CHUNK_SIZE = 256
+
+
+def _handles_import_error(node: ast.AST) -> bool:
+    for handler in getattr(node, "handlers", ()):
+        types = [handler.type]
+        if isinstance(handler.type, ast.Tuple):
+            types = handler.type.elts
+        if any(isinstance(t, ast.Name) and t.id in _OPTIONAL_ERRORS for t in types):
+            return True
+    return False
+
+
+def _iter_imports(tree: ast.AST) -> Iterator[tuple[ast.Import | ast.ImportFrom, bool]]:
+    """(import node, whether guarded by ImportError) in source order
+
+    Imports are statements, so only the statement blocks are walked, which is
+    far cheaper than `ast.walk` over every expression of a big file.
+    """
+    stack: list[tuple[ast.AST, bool]] = [(tree, False)]
+    while stack:
+        node, guarded = stack.pop()
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            yield node, guarded
+            continue
+        children: list[tuple[ast.AST, bool]] = []
+        for field in _BLOCK_FIELDS:
+            flag = guarded
+            if field == "body" and isinstance(node, _TRY_NODES):
+                flag = guarded or _handles_import_error(node)
+            children.extend((child, flag) for child in getattr(node, field, ()))
+        stack.extend(reversed(children))
+
+
+def imported_modules(tree: ast.AST, optional: bool = True) -> list[str]:
+    """Top-level names of the absolute imports in `tree`, in source order
+
+    :param optional: include imports guarded by `try: ... except ImportError:`
+    """
+    nodes = [node for node, guarded in _iter_imports(tree) if optional or not guarded]
+    names: dict[str, None] = {}
+    for node in nodes:
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                names[alias.name.partition(".")[0]] = None
+        elif not node.level and node.module:
+            names[node.module.partition(".")[0]] = None
+    return list(names)
+
+
+def third_party(names: Iterable[str]) -> list[str]:
+    """Drop stdlib and builtin module names"""
+    skip = {*sys.stdlib_module_names, *sys.builtin_module_names, "__future__"}
+    return [i for i in names if i not in skip]
+
+
+def guarded_block(tree: ast.AST, lineno: int) -> ast.With | ast.AsyncWith | None:
+    """The innermost `with` statement whose body contains `lineno`"""
+    found: ast.With | ast.AsyncWith | None = None
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.With, ast.AsyncWith)) or not node.body:
+            continue
+        end = node.end_lineno or node.body[-1].lineno
+        if node.body[0].lineno <= lineno <= end:
+            if found is None or node.lineno > found.lineno:
+                found = node
+    return found
+
+
+def scan_traceback(tb: TracebackType | None) -> list[str]:
+    """Third-party modules imported by the block that raised an exception.
+
+    `tb` is the traceback given to `__exit__`, whose first frame is the one
+    that runs the `with` statement. When the block can not be located, all the
+    imports of the caller's source are returned instead.
+    """
+    if tb is None:
+        return []
+    frame = tb.tb_frame
+    lines = linecache.getlines(frame.f_code.co_filename, frame.f_globals)
+    if not lines:
+        return []
+    try:
+        tree = ast.parse("".join(lines))
+    except (SyntaxError, ValueError):
+        return []
+    block = guarded_block(tree, tb.tb_lineno)
+    if block is not None:
+        tree = ast.Module(body=block.body, type_ignores=[])
+    return third_party(imported_modules(tree))
+
+
+def iter_sources(paths: Iterable[str | Path]) -> Iterator[Path]:
+    """.py files of the paths, hidden dirs, venvs and build dirs are skipped"""
+    for path in map(Path, paths):
+        if path.is_file():
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(
+                d for d in dirs if d not in SKIP_DIRS and not d.startswith(".")
+            )
+            for name in sorted(files):
+                if name.endswith(".py"):
+                    yield Path(root, name)
+
+
+def _parse(path: str) -> list[str]:
+    """Absolute imports of a file, optional imports excluded"""
+    try:
+        with open(path, "rb") as f:
+            tree = ast.parse(f.read(), filename=path)
+    except (OSError, SyntaxError, ValueError):
+        return []
+    return imported_modules(tree, optional=False)
+
+
+def _parse_chunk(paths: list[str]) -> list[tuple[str, list[str]]]:
+    """Run by the workers of the process pool"""
+    return [(p, _parse(p)) for p in paths]
+
+
+def file_imports(path: Path) -> list[str]:
+    """Third-party modules that a file imports, optional imports excluded"""
+    return third_party(_parse(str(path)))
+
+
+def first_party(files: Iterable[Path]) -> set[str]:
+    """Top-level names that the files provide: modules and outermost packages
+
+    A submodule is not counted, e.g.: `proj/celery.py` of package `proj` is
+    imported as `proj.celery`, so `import celery` is still third-party.
+    """
+    tops: dict[Path, str | None] = {}  # dir -> outermost package of it
+
+    def package_of(d: Path) -> str | None:
+        if d not in tops:
+            if d.parent == d or not d.joinpath("__init__.py").is_file():
+                tops[d] = None
+            else:
+                tops[d] = package_of(d.parent) or d.name
+        return tops[d]
+
+    return {package_of(f.parent) or f.stem for f in map(Path.absolute, files)}
+
+
+class ScanCache:
+    """Imports of each scanned file, reused while its mtime and size are same
+
+    The names are kept before the stdlib ones are dropped, so it is shared by
+    all interpreters. It lives in the user cache dir, set env
+    `ENSURE_IMPORT_NO_CACHE=1` to disable it.
+    """
+
+    def __init__(self, path: Path | None = None) -> None:
+        from ._cache import DISABLE_ENV, user_cache_dir
+
+        self.enabled = path is not None or not os.getenv(DISABLE_ENV)
+        self.path = path or user_cache_dir() / SCAN_CACHE_NAME
+        self._data: dict[str, list[Any]] = self._load() if self.enabled else {}
+        self._dirty = False
+
+    def _load(self) -> dict[str, list[Any]]:
+        try:
+            content = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(content, dict) or content.get("format") != SCAN_FORMAT:
+            return {}
+        return content.get("files") or {}
+
+    def save(self) -> bool:
+        if not self.enabled or not self._dirty:
+            return True
+        content = {"format": SCAN_FORMAT, "files": self._data}
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(json.dumps(content), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+            return False
+        self._dirty = False
+        return True
+
+    @staticmethod
+    def stamp(path: str) -> list[int] | None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return [st.st_mtime_ns, st.st_size]
+
+    def get(self, path: str, stamp: list[int] | None) -> list[str] | None:
+        if stamp is None or (cached := self._data.get(path)) is None:
+            return None
+        return cached[2] if cached[:2] == stamp else None
+
+    def set(self, path: str, stamp: list[int] | None, names: list[str]) -> None:
+        if self.enabled and stamp is not None:
+            self._data[path] = [*stamp, names]
+            self._dirty = True
+
+
+def _chunks(items: list[str], size: int) -> Iterator[list[str]]:
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def iter_scan(
+    files: Iterable[Path], jobs: int | None = None, cache: ScanCache | None = None
+) -> Iterator[tuple[Path, list[str]]]:
+    """(file, its third-party imports) of each file, in the order they are done
+
+    Files that are unchanged since the last scan are served from the cache
+    first, the others are parsed by a process pool of `jobs` workers (default
+    to the count of cpus), or in this process when there are only a few.
+
+    :param jobs: 1 to never start a process pool
+    """
+    if cache is None:
+        cache = ScanCache()
+    stale: dict[str, tuple[Path, list[int] | None]] = {}
+    try:
+        for path in files:
+            key = str(path.absolute())
+            if (names := cache.get(key, stamp := cache.stamp(key))) is not None:
+                yield path, third_party(names)
+            else:
+                stale[key] = (path, stamp)
+        jobs = jobs or os.cpu_count() or 1
+        if jobs == 1 or len(stale) < PARALLEL_MIN:
+            for key, (path, stamp) in stale.items():
+                cache.set(key, stamp, names := _parse(key))
+                yield path, third_party(names)
+            return
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        size = min(max(len(stale) // (jobs * 4), 1), CHUNK_SIZE)
+        with ProcessPoolExecutor(jobs) as pool:
+            futures = [pool.submit(_parse_chunk, c) for c in _chunks([*stale], size)]
+            for future in as_completed(futures):
+                for key, names in future.result():
+                    path, stamp = stale[key]
+                    cache.set(key, stamp, names)
+                    yield path, third_party(names)
+    finally:
+        cache.save()
+
+
+def iter_modules(
+    paths: Iterable[str | Path], jobs: int | None = None, cache: ScanCache | None = None
+) -> Iterator[tuple[str, Path]]:
+    """(module, file) of each third-party import found in the sources
+
+    First-party names are decided by the file list up front, so the results
+    are streamed while the files are parsed, see `iter_scan`.
+    """
+    files = list(iter_sources(paths))
+    local = first_party(files)
+    for path, names in iter_scan(files, jobs, cache):
+        for name in names:
+            if name not in local:
+                yield name, path
+
+
+def scan_paths(
+    paths: Iterable[str | Path], jobs: int | None = None, cache: ScanCache | None = None
+) -> dict[str, list[Path]]:
+    """Third-party modules imported by the sources -> files that import them
+
+    Same order as a sequential scan: by the first file that imports a module.
+    """
+    files = list(iter_sources(paths))
+    local = first_party(files)
+    results = dict(iter_scan(files, jobs, cache))
+    found: dict[str, list[Path]] = {}
+    for path in files:
+        for name in results.get(path, ()):
+            if name not in local:
+                found.setdefault(name, []).append(path)
+    return found
@@ -0,0 +1,112 @@
+"""Timing of EnsureImport phases, exportable as a Chrome/Perfetto trace.
+
+Set env `ENSURE_IMPORT_TRACE=path.json` to write the trace at exit, then
+load it by chrome://tracing or https://ui.perfetto.dev
+"""
+
+from __future__ import annotations
+
+import _thread
+import os
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+TRACE_ENV = "ENSURE_IMPORT_TRACE"
+MAX_EVENTS = 10_000
+
+
+def _now_us() -> float:
+    return time.perf_counter_ns() / 1000
+
+
+class Stats:
+    """Recorded events in Chrome trace event format
+
+    Usage::
+        >>> EnsureImport.stats.phases()
+        {'install_and_extend_sys_path': {'count': 1, 'total': 2.31},
+         'install': {'count': 1, 'total': 2.05}, ...}
+    """
+
+    def __init__(self) -> None:
+        self.events: list[dict[str, Any]] = []
+        self._atexit = False
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} events={len(self.events)}>"
+
+    def _add(self, event: dict[str, Any]) -> None:
+        event.update(pid=os.getpid(), tid=_thread.get_ident())
+        if len(self.events) >= MAX_EVENTS:
+            del self.events[: MAX_EVENTS // 2]
+        self.events.append(event)
+        if not self._atexit and os.getenv(TRACE_ENV):
+            import atexit
+
+            atexit.register(self._dump_env)
+            self._atexit = True
+
+    @contextmanager
+    def span(self, name: str, **args: Any) -> Iterator[dict[str, Any]]:
+        """Time the block as a complete event, `args` can be updated inside"""
+        start = _now_us()
+        try:
+            yield args
+        finally:
+            self._add(
+                {
+                    "name": name,
+                    "cat": "ensure_import",
+                    "ph": "X",
+                    "ts": start,
+                    "dur": _now_us() - start,
+                    "args": args,
+                }
+            )
+
+    def mark(self, name: str, **args: Any) -> None:
+        """Record an instant event, e.g.: which fast path was taken"""
+        self._add(
+            {
+                "name": name,
+                "cat": "ensure_import",
+                "ph": "i",
+                "s": "t",
+                "ts": _now_us(),
+                "args": args,
+            }
+        )
+
+    def phases(self) -> dict[str, dict[str, float]]:
+        """Count and total seconds of each span name"""
+        result: dict[str, dict[str, float]] = {}
+        for event in self.events:
+            if event["ph"] != "X":
+                continue
+            item = result.setdefault(event["name"], {"count": 0, "total": 0.0})
+            item["count"] += 1
+            item["total"] += event["dur"] / 1e6
+        return result
+
+    def marks(self, name: str) -> list[dict[str, Any]]:
+        """Arguments of the instant events named `name`"""
+        return [e["args"] for e in self.events if e["ph"] == "i" and e["name"] == name]
+
+    def clear(self) -> None:
+        self.events.clear()
+
+    def dump(self, path: str | os.PathLike[str]) -> None:
+        import json
+
+        content = {"traceEvents": self.events, "displayTimeUnit": "ms"}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(content, f, default=str)
+
+    def _dump_env(self) -> None:
+        import contextlib
+
+        if path := os.getenv(TRACE_ENV):
+            with contextlib.suppress(OSError):
+                self.dump(path)
@@ -0,0 +1,240 @@
+"""Store of provisioned virtual environments to clone new ones from.
+
+A template is a venv kept in `<store>/<key>/venv` with `template.json`
+beside it, the key is derived from the interpreter and the set of packages
+installed into it. A new project venv is cloned from the template that has
+most of the requested packages (and none of the others), file by file by
+reflink (copy-on-write, Linux btrfs/xfs), hardlink, or plain copy as the
+last resort. Only modules are hardlinked, which installers replace rather
+than write into, so that changing a clone (e.g.: appending to a `.pth`
+file) doesn't change the template. The absolute path of the template in
+`pyvenv.cfg` and the scripts of `bin`/`Scripts` (shebangs, activate) is
+rewritten to the new one.
+Then only the packages that the template doesn't have need to be installed.
+Packages are matched by name, version specifiers are not compared.
+
+Set env `ENSURE_IMPORT_TEMPLATES=1` (or a directory of the store) to enable.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from collections.abc import Iterable
+from pathlib import Path
+from typing import NamedTuple
+
+from ._cache import CACHE_NAME, user_cache_dir
+from ._probe import normalize, requirement_name
+from ._venv import STAMP_NAME
+
+DIR_ENV = "ENSURE_IMPORT_TEMPLATES"
+META_NAME = "template.json"
+#: templates to keep in the store, the least recently used are removed
+MAX_TEMPLATES = 8
+#: files in a venv that belong to the project rather than the environment
+EXCLUDED = {
+    CACHE_NAME,
+    STAMP_NAME,
+    ".ensure_import-lock.txt",
+    ".ensure_import-report.json",
+}
+#: files that are safe to share by hardlink, see module docstring
+HARDLINK_SUFFIXES = (".py", ".pyc", ".pyi", ".so", ".pyd")
+_FICLONE = 0x40049409  # ioctl of linux/fs.h
+
+PathLike = str | Path
+
+
+def _python_key() -> str:
+    return f"{sys.executable}|{sys.version}"
+
+
+def _names(packages: Iterable[str]) -> set[str]:
+    return {normalize(requirement_name(i)) for i in packages}
+
+
+def _reflink(src: str, dst: str) -> bool:
+    if sys.platform != "linux":
+        return False
+    import fcntl
+
+    try:
+        with open(src, "rb") as fs, open(dst, "wb") as fd:
+            fcntl.ioctl(fd.fileno(), _FICLONE, fs.fileno())
+    except OSError:
+        with contextlib.suppress(OSError):
+            os.unlink(dst)
+        return False
+    shutil.copystat(src, dst)
+    return True
+
+
+def _rewrite(path: str, old: bytes, new: bytes) -> bool:
+    """Replace the prefix in a text file, binary files are left as they are"""
+    try:
+        data = Path(path).read_bytes()
+    except OSError:
+        return False
+    if old not in data or b"\0" in data:
+        return False
+    tmp = f"{path}.{os.getpid()}.tmp"
+    Path(tmp).write_bytes(data.replace(old, new))
+    shutil.copymode(path, tmp)
+    os.replace(tmp, path)
+    return True
+
+
+def clone_venv(
+    src: Path, dst: Path, link: str = "auto", final: Path | None = None
+) -> dict[str, int]:
+    """Clone virtual environment `src` to `dst`, return count of each method
+
+    :param link: 'auto' tries reflink then hardlink (`HARDLINK_SUFFIXES`
+        only) then copy, 'copy' to always copy files
+    :param final: where `dst` will be moved to, paths are rewritten to it
+    """
+    src, dst = src.absolute(), dst.absolute()
+    counts = {"reflink": 0, "hardlink": 0, "copy": 0, "symlink": 0, "rewrite": 0}
+    can_reflink = can_hardlink = link == "auto"
+    final = dst if final is None else final.absolute()
+    old, new = os.fsencode(src), os.fsencode(final)
+    scripts: list[str] = []
+    for root, dirs, files in os.walk(src):
+        rel = os.path.relpath(root, src)
+        target = os.path.join(dst, rel) if rel != "." else str(dst)
+        os.makedirs(target, exist_ok=True)
+        for name in [*dirs, *files]:
+            s = os.path.join(root, name)
+            if not os.path.islink(s):
+                continue
+            if name in dirs:
+                dirs.remove(name)  # Don't walk into linked dirs
+            link_to = os.readlink(s)
+            if os.path.isabs(link_to) and Path(link_to).is_relative_to(src):
+                link_to = os.path.join(final, os.path.relpath(link_to, src))
+            os.symlink(link_to, os.path.join(target, name))
+            counts["symlink"] += 1
+        in_scripts = rel in ("bin", "Scripts")
+        for name in files:
+            s, d = os.path.join(root, name), os.path.join(target, name)
+            if os.path.islink(s) or (rel == "." and name in EXCLUDED):
+                continue
+            if in_scripts or (rel == "." and name == "pyvenv.cfg"):
+                shutil.copy2(s, d)  # Will be rewritten, so never share it
+                counts["copy"] += 1
+                scripts.append(d)
+                continue
+            if can_reflink:
+                if _reflink(s, d):
+                    counts["reflink"] += 1
+                    continue
+                can_reflink = False  # Not supported by this filesystem
+            if can_hardlink and name.endswith(HARDLINK_SUFFIXES):
+                try:
+                    os.link(s, d)
+                except OSError:
+                    can_hardlink = False
+                else:
+                    counts["hardlink"] += 1
+                    continue
+            shutil.copy2(s, d)
+            counts["copy"] += 1
+    for path in scripts:
+        counts["rewrite"] += _rewrite(path, old, new)
+    return counts
+
+
+class Template(NamedTuple):
+    venv: Path
+    packages: frozenset[str]
+
+
+class TemplateStore:
+    """Directory of template venvs, see module docstring"""
+
+    def __init__(self, path: PathLike | None = None) -> None:
+        self.path = Path(path or user_cache_dir() / "templates").expanduser()
+
+    @classmethod
+    def from_env(cls) -> TemplateStore | None:
+        if not (value := os.getenv(DIR_ENV)):
+            return None
+        return cls(None if value.lower() in ("1", "true") else value)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.path.as_posix()!r})"
+
+    def key(self, packages: Iterable[str]) -> str:
+        content = "\n".join([_python_key(), *sorted(_names(packages))])
+        return hashlib.sha256(content.encode()).hexdigest()[:16]
+
+    def templates(self) -> list[tuple[Template, dict]]:
+        if not self.path.is_dir():
+            return []
+        found = []
+        for meta_file in self.path.glob(f"*/{META_NAME}"):
+            try:
+                meta = json.loads(meta_file.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            venv = meta_file.parent / "venv"
+            if meta.get("python") == _python_key() and venv.is_dir():
+                found.append((Template(venv, frozenset(meta["packages"])), meta))
+        return found
+
+    def lookup(self, packages: Iterable[str]) -> Template | None:
+        """The template with most of the packages and no unrequested ones"""
+        wanted = _names(packages)
+        best: Template | None = None
+        for template, _ in self.templates():
+            if not template.packages <= wanted:
+                continue
+            if best is None or len(template.packages) > len(best.packages):
+                best = template
+        if best is not None:
+            self._touch(best.venv.parent)
+        return best
+
+    def _touch(self, directory: Path) -> None:
+        meta_file = directory / META_NAME
+        with contextlib.suppress(OSError, ValueError):
+            meta = json.loads(meta_file.read_text(encoding="utf-8"))
+            meta["used"] = time.time()
+            meta_file.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+    def save(self, venv: Path, packages: Iterable[str]) -> Template | None:
+        """Keep a copy of provisioned `venv` as the template of packages"""
+        names = _names(packages)
+        directory = self.path / self.key(names)
+        if directory.joinpath(META_NAME).exists():
+            self._touch(directory)
+            return Template(directory / "venv", frozenset(names))
+        tmp = self.path / f".{directory.name}.{os.getpid()}.tmp"
+        try:
+            clone_venv(venv, tmp / "venv", final=directory / "venv")
+            meta = {
+                "python": _python_key(),
+                "packages": sorted(names),
+                "used": time.time(),
+            }
+            (tmp / META_NAME).write_text(json.dumps(meta, indent=2), encoding="utf-8")
+            os.rename(tmp, directory)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            return None
+        self.evict()
+        return Template(directory / "venv", frozenset(names))
+
+    def evict(self, keep: int = MAX_TEMPLATES) -> list[Path]:
+        found = sorted(self.templates(), key=lambda i: i[1].get("used", 0))
+        removed = []
+        for template, _ in found[: max(len(found) - keep, 0)]:
+            shutil.rmtree(template.venv.parent, ignore_errors=True)
+            removed.append(template.venv.parent)
+        return removed
@@ -0,0 +1,180 @@
+"""Helpers to inspect virtual environments without walking the whole tree."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import Any
+
+STAMP_NAME = ".ensure_import-stamp.json"
+
+_site_packages_cache: dict[Path, list[Path]] = {}
+
+
+def read_pyvenv_cfg(venv: Path) -> dict[str, str]:
+    """Parse `pyvenv.cfg` of the virtual environment, empty dict if missing"""
+    try:
+        text = venv.joinpath("pyvenv.cfg").read_text(encoding="utf-8")
+    except OSError:
+        return {}
+    cfg: dict[str, str] = {}
+    for line in text.splitlines():
+        key, sep, value = line.partition("=")
+        if sep:
+            cfg[key.strip().lower()] = value.strip()
+    return cfg
+
+
+def is_venv_dir(path: Path) -> bool:
+    """Whether it is a virtual environment, rather than e.g.: the system prefix"""
+    return path.joinpath("pyvenv.cfg").is_file()
+
+
+def python_version(venv: Path) -> str:
+    """'X.Y' of the interpreter that the virtual environment was created by"""
+    cfg = read_pyvenv_cfg(venv)
+    for key in ("version_info", "version"):
+        if parts := cfg.get(key, "").split(".")[:2]:
+            if len(parts) == 2 and all(i.isdigit() for i in parts):
+                return ".".join(parts)
+    return "{}.{}".format(*sys.version_info)
+
+
+def _candidates(venv: Path) -> list[Path]:
+    version = python_version(venv)
+    lib = venv / "lib"
+    return [
+        venv / "Lib" / "site-packages",  # Windows
+        lib / f"python{version}" / "site-packages",
+        lib / f"python{version}t" / "site-packages",  # free-threaded build
+        lib / f"pypy{version}" / "site-packages",
+        venv / "site-packages",  # pypy on Windows
+    ]
+
+
+def find_site_packages(venv: Path) -> list[Path]:
+    """Locate the site-packages directories of a virtual environment.
+
+    The well-known layouts are derived from `pyvenv.cfg`, with `lib*/*/` as
+    the fallback, the tree is never walked. Results are memoized per venv root,
+    call `clear_cache` after removing/recreating a virtual environment.
+    """
+    root = venv.absolute()
+    if (cached := _site_packages_cache.get(root)) and all(i.is_dir() for i in cached):
+        return list(cached)
+    found = [p for p in _candidates(root) if p.is_dir()]
+    if not found:
+        found = [p for p in root.glob("lib*/*/site-packages") if p.is_dir()]
+    if found:
+        _site_packages_cache[root] = list(found)
+    else:
+        _site_packages_cache.pop(root, None)
+    return found
+
+
+def venv_python(venv: Path) -> Path:
+    """Path of the interpreter inside a virtual environment"""
+    if sys.platform == "win32":
+        return venv / "Scripts" / "python.exe"
+    return venv / "bin" / "python"
+
+
+def _pth_provides(site: Path, pth: Path, name: str) -> bool:
+    """Whether a .pth file makes `name` importable: by path or editable finder"""
+    import re
+
+    try:
+        lines = pth.read_text(encoding="utf-8").splitlines()
+    except (OSError, UnicodeDecodeError):
+        return False
+    for line in lines:
+        if not (line := line.strip()) or line.startswith("#"):
+            continue
+        if line.startswith(("import ", "import\t")):
+            # e.g.: import __editable___ensure_import_0_6_5_finder; ....install()
+            for module in re.findall(r"\bimport\s+([\w.]+)", line):
+                try:
+                    finder = (site / f"{module}.py").read_text(encoding="utf-8")
+                except (OSError, UnicodeDecodeError):
+                    continue
+                pattern = rf"""['"]{re.escape(name)}['"]\s*:\s*['"]([^'"]+)['"]"""
+                if (m := re.search(pattern, finder)) and Path(m.group(1)).exists():
+                    return True
+        elif (site / line / name / "__init__.py").is_file():
+            return True
+    return False
+
+
+def is_importable(venv: Path, name: str = "ensure_import") -> bool | None:
+    """Whether the python of venv can import the package, without running it
+
+    Look for the package dir in site-packages, and the paths/editable finders
+    of `.pth` files. Return None if it can not be told by files, e.g.: the
+    venv includes the system site-packages.
+    """
+    for site in find_site_packages(venv):
+        if (site / name / "__init__.py").is_file():
+            return True
+        if any(_pth_provides(site, pth, name) for pth in site.glob("*.pth")):
+            return True
+    cfg = read_pyvenv_cfg(venv)
+    if not cfg or cfg.get("include-system-site-packages", "").lower() == "true":
+        return None
+    return False
+
+
+def clear_cache() -> None:
+    _site_packages_cache.clear()
+
+
+class VenvStamp:
+    """Bootstrap state of a virtual environment, stored inside of it.
+
+    Keys in use: `created_by`, `bootstrapped` (the command that upgraded pip),
+    `self_importable` (whether its python can import ensure_import, only when
+    `is_importable` can not tell it by files). The stamp
+    is dropped when `pyvenv.cfg` reports a different python version.
+    """
+
+    def __init__(self, venv: Path) -> None:
+        self.venv = venv
+        self.path = venv / STAMP_NAME
+        self.python = python_version(venv)
+        self._data = self._load()
+        self._dirty = False
+
+    def _load(self) -> dict[str, Any]:
+        import json
+
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("python") != self.python:
+            return {}
+        return data
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._data.get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        if self._data.get(key, ...) != value:
+            self._data[key] = value
+            self._dirty = True
+
+    def save(self) -> bool:
+        import json
+        import os
+
+        if not self._dirty:
+            return True
+        self._data["python"] = self.python
+        tmp = self.path.with_name(f"{STAMP_NAME}.{os.getpid()}.tmp")
+        try:
+            tmp.write_text(json.dumps(self._data, indent=2), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+            return False
+        self._dirty = False
+        return True
@@ -0,0 +1,175 @@
+"""Local directory of wheels to install from without network access.
+
+Wheels are added by `prefetch` (`pip wheel --wheel-dir`), and installs use
+`--no-index --find-links <dir>`. The last time each wheel was used is recorded
+in `.wheelhouse.json`, and the least recently used ones are removed when the
+total size is larger than `max_size`.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import time
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from ._probe import normalize
+
+if TYPE_CHECKING:
+    from ._installers import Installer
+
+INDEX_NAME = ".wheelhouse.json"
+DIR_ENV = "ENSURE_IMPORT_WHEELHOUSE"
+MAX_SIZE_ENV = "ENSURE_IMPORT_WHEELHOUSE_MAX_SIZE"
+_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+
+PathLike = str | Path
+
+
+def parse_size(value: str | int | None) -> int | None:
+    """'500M' -> 524288000"""
+    if value is None or isinstance(value, int):
+        return value
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)i?B?\s*", value.upper())
+    if m is None:
+        raise ValueError(f"Invalid size: {value!r}")
+    return int(float(m.group(1)) * _UNITS[m.group(2)])
+
+
+def _project_name(filename: str) -> str:
+    # Both `{name}-{version}(-...).whl` and `{name}-{version}.tar.gz`
+    return normalize(filename.split("-", 1)[0])
+
+
+def _requires(wheel: Path) -> list[str]:
+    """Names of Requires-Dist in wheel metadata, markers are ignored"""
+    if wheel.suffix != ".whl":
+        return []
+    import zipfile
+
+    try:
+        with zipfile.ZipFile(wheel) as zf:
+            name = next(i for i in zf.namelist() if i.endswith(".dist-info/METADATA"))
+            metadata = zf.read(name).decode("utf-8", "replace")
+    except (OSError, StopIteration, zipfile.BadZipFile):
+        return []
+    return [
+        normalize(m.group(1))
+        for m in re.finditer(r"^Requires-Dist:\s*([A-Za-z0-9][\w.-]*)", metadata, re.M)
+    ]
+
+
+class Wheelhouse:
+    """Managed wheel directory, see module docstring for details"""
+
+    def __init__(self, path: PathLike, max_size: int | str | None = None) -> None:
+        self.path = Path(path).expanduser().absolute()
+        self.max_size = parse_size(max_size)
+
+    @classmethod
+    def from_env(cls) -> Wheelhouse | None:
+        if not (path := os.getenv(DIR_ENV)):
+            return None
+        return cls(path, os.getenv(MAX_SIZE_ENV))
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__}({self.path.as_posix()!r}, max_size={self.max_size})"
+        )
+
+    @property
+    def index_file(self) -> Path:
+        return self.path / INDEX_NAME
+
+    def install_options(self) -> tuple[str, ...]:
+        return ("--no-index", "--find-links", self.path.as_posix())
+
+    def prefetch_command(
+        self,
+        python: PathLike,
+        packages: Sequence[str],
+        installer: Installer | None = None,
+    ) -> str:
+        """Command to build wheels for `python`, whose ABI they must match"""
+        if installer is None:
+            from ._installers import PipInstaller
+
+            installer = PipInstaller()
+        return installer.wheel_command(python, self.path, packages)
+
+    def files(self) -> list[Path]:
+        if not self.path.is_dir():
+            return []
+        return [
+            p
+            for p in self.path.iterdir()
+            if p.is_file() and p.name != INDEX_NAME and not p.name.startswith(".")
+        ]
+
+    def size(self) -> int:
+        return sum(p.stat().st_size for p in self.files())
+
+    def _load_index(self) -> dict[str, float]:
+        try:
+            data = json.loads(self.index_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _dump_index(self, index: dict[str, float]) -> None:
+        tmp = self.index_file.with_name(f"{INDEX_NAME}.{os.getpid()}.tmp")
+        try:
+            tmp.write_text(json.dumps(index, indent=2, sort_keys=True), "utf-8")
+            os.replace(tmp, self.index_file)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+
+    def touch(self, packages: Iterable[str]) -> set[Path]:
+        """Mark wheels of `packages` and their dependencies as recently used"""
+        from ._probe import requirement_name
+
+        by_name: dict[str, list[Path]] = {}
+        for p in self.files():
+            by_name.setdefault(_project_name(p.name), []).append(p)
+        pending = [normalize(requirement_name(i)) for i in packages]
+        used: set[Path] = set()
+        seen: set[str] = set()
+        while pending:
+            if (name := pending.pop()) in seen:
+                continue
+            seen.add(name)
+            for wheel in by_name.get(name, ()):
+                used.add(wheel)
+                pending.extend(_requires(wheel))
+        if used:
+            index = self._load_index()
+            now = time.time()
+            index.update({p.name: now for p in used})
+            self._dump_index(index)
+        return used
+
+    def evict(self, keep: Iterable[Path] = ()) -> list[Path]:
+        """Remove least recently used files until size is within `max_size`"""
+        if self.max_size is None:
+            return []
+        files = self.files()
+        total = sum(p.stat().st_size for p in files)
+        if total <= self.max_size:
+            return []
+        index = self._load_index()
+        protected = set(keep)
+        removed: list[Path] = []
+        for p in sorted(files, key=lambda p: index.get(p.name, p.stat().st_mtime)):
+            if total <= self.max_size:
+                break
+            if p in protected:
+                continue
+            total -= p.stat().st_size
+            p.unlink(missing_ok=True)
+            index.pop(p.name, None)
+            removed.append(p)
+        self._dump_index({k: v for k, v in index.items() if (self.path / k).exists()})
+        return removed
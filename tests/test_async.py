@@ -0,0 +1,186 @@
+import asyncio
+import shlex
+import sys
+import threading
+import time
+from pathlib import Path
+
+from ensure_import import EnsureImport, _aio
+from ensure_import._aio import _handle, check_shell, run_and_echo
+from ensure_import._coalesce import InstallBatcher
+from ensure_import._installers import Installer
+from tests.utils import lock_sys_path
+
+PY = shlex.quote(sys.executable)
+
+
+class SleepInstaller(Installer):
+    name = "sleep"
+
+    def install_command(self, python, packages, *options) -> str:
+        return f"{PY} -c 'import time;time.sleep(0.3)'"
+
+
+def test_shell_helpers():
+    async def main():
+        assert await run_and_echo(f"{PY} -c 'import sys;sys.exit(3)'") == 3
+        assert await check_shell(f"{PY} -c 'pass'")
+        assert not await check_shell(f"{PY} -c 'import ei_not_exist'")
+        # Blocking steps, e.g.: probe, run in a worker thread
+        assert await _handle("call", threading.get_ident) != threading.get_ident()
+
+    asyncio.run(main())
+
+
+def test_install_does_not_block_event_loop():
+    ticks: list[int] = []
+
+    async def ticker():
+        for i in range(100):
+            ticks.append(i)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        EnsureImport.reset()
+        _ei = EnsureImport(_no_venv=True, _installer=SleepInstaller())
+        task = asyncio.create_task(ticker())
+        assert await _ei.ainstall_and_extend_sys_path("ei_not_exist") == 0
+        task.cancel()
+        EnsureImport.reset()
+
+    asyncio.run(main())
+    assert len(ticks) >= 10
+
+
+def test_async_retry(tmp_path: Path, monkeypatch):
+    calls: list[tuple[str, ...]] = []
+
+    async def fake_install(self, *packages: str) -> int:
+        calls.append(packages)
+        tmp_path.joinpath("ei_async_mod.py").write_text("VALUE = 1")
+        return 0
+
+    monkeypatch.setattr(EnsureImport, "ainstall_and_extend_sys_path", fake_install)
+
+    async def main():
+        async for _ei in EnsureImport(ei_async_mod="ei-async-dist"):
+            async with _ei:
+                import ei_async_mod
+        return ei_async_mod.VALUE
+
+    EnsureImport.reset()
+    with lock_sys_path():
+        sys.path.append(tmp_path.as_posix())
+        assert asyncio.run(main()) == 1
+    EnsureImport.reset()
+    sys.modules.pop("ei_async_mod", None)
+    assert calls == [("ei-async-dist",)]
+
+
+def test_async_installs_are_coalesced(monkeypatch):
+    calls: list[tuple[str, ...]] = []
+
+    def install(self, *packages: str) -> int:
+        calls.append(packages)
+        time.sleep(0.3)
+        return 0
+
+    async def ainstall(self, *packages: str) -> int:
+        calls.append(packages)
+        await asyncio.sleep(0.3)
+        return 0
+
+    monkeypatch.setattr(EnsureImport, "_install_batch", install)
+    monkeypatch.setattr(EnsureImport, "_ainstall_batch", ainstall)
+
+    async def main():
+        _ei = EnsureImport(_no_venv=True)
+        thread = threading.Thread(target=_ei.install_and_extend_sys_path, args=["a"])
+        thread.start()
+        await asyncio.sleep(0.1)
+        installs = [_ei.ainstall_and_extend_sys_path(p, "b") for p in "abab"]
+        assert await asyncio.gather(*installs) == [0] * 4
+        thread.join()
+
+    EnsureImport.reset()
+    asyncio.run(main())
+    EnsureImport.reset()
+    assert calls == [("a",), ("b",)]
+
+
+def test_sync_install_on_loop_of_running_ainstall():
+    # e.g.: a LazyModule is loaded while a coroutine of the loop installs
+    batcher = InstallBatcher()
+    calls: list[tuple[str, ...]] = []
+
+    async def slow(*packages: str) -> int:
+        calls.append(packages)
+        await asyncio.sleep(0.2)
+        return 0
+
+    def sync(*packages: str) -> int:
+        calls.append(packages)
+        return 0
+
+    async def main():
+        task = asyncio.create_task(batcher.ainstall(["a"], slow))
+        await asyncio.sleep(0.05)
+        assert batcher.install(["b"], sync) == 0  # Not wait for the loop
+        assert await task == 0
+
+    # Run by a daemon thread, so that a deadlock fails the test but not hangs
+    thread = threading.Thread(target=asyncio.run, args=[main()], daemon=True)
+    thread.start()
+    thread.join(5)
+    assert not thread.is_alive(), "deadlocked"
+    assert calls == [("a",), ("b",)]
+
+
+def test_blocking_steps_off_the_loop(tmp_path: Path, monkeypatch):
+    from ensure_import import _compile, _project
+
+    version = "{}.{}".format(*sys.version_info)
+    threads: dict[str, set[int]] = {}
+
+    def record(name: str, func):
+        def wrapper(*args):
+            threads.setdefault(name, set()).add(threading.get_ident())
+            return func(*args)
+
+        return wrapper
+
+    async def run_and_echo(cmd: str) -> int:
+        if " venv " in cmd:
+            venv = tmp_path / "venv"
+            venv.joinpath("lib", f"python{version}", "site-packages").mkdir(
+                parents=True
+            )
+            venv.joinpath("pyvenv.cfg").write_text("")
+        return 0
+
+    async def check_shell(cmd: str) -> bool:
+        return True
+
+    monkeypatch.setattr(_aio, "run_and_echo", run_and_echo)
+    monkeypatch.setattr(_aio, "check_shell", check_shell)
+    monkeypatch.setattr(_project, "detect", record("detect", _project.detect))
+    monkeypatch.setattr(_compile, "dist_infos", record("dist", _compile.dist_infos))
+    monkeypatch.setattr(EnsureImport, "is_venv", staticmethod(lambda: False))
+    probe = staticmethod(record("probe", EnsureImport.probe))
+    monkeypatch.setattr(EnsureImport, "probe", probe)
+    monkeypatch.setenv("ENSURE_IMPORT_NO_CACHE", "1")
+
+    async def main() -> int:
+        threads["loop"] = {threading.get_ident()}
+        _ei = EnsureImport(_workdir=tmp_path, _installer="pip", _lock=True)
+        return await _ei.ainstall_and_extend_sys_path("ei-async-pkg")
+
+    EnsureImport.reset()
+    try:
+        with lock_sys_path():
+            assert asyncio.run(main()) == 0
+    finally:
+        EnsureImport.reset()
+    loop = threads.pop("loop")
+    assert set(threads) == {"detect", "dist", "probe"}
+    assert not any(loop & i for i in threads.values())
@@ -0,0 +1,48 @@
+import sys
+import time
+from pathlib import Path
+
+from ensure_import import EnsureImport
+from tests.utils import lock_sys_path
+
+
+def test_background_install_gates_import(tmp_path: Path, monkeypatch):
+    def slow_install(self, *packages: str) -> int:
+        time.sleep(0.5)
+        for name in packages:
+            module = name.replace("-", "_").removeprefix("python_")
+            tmp_path.joinpath(f"{module}.py").write_text(f"NAME = {name!r}")
+        return 0
+
+    monkeypatch.setattr(EnsureImport, "install_and_extend_sys_path", slow_install)
+    EnsureImport.reset()
+    with lock_sys_path():
+        sys.path.append(tmp_path.as_posix())
+        start = time.perf_counter()
+        with EnsureImport(
+            modules="python-ei_bg_dotenv ei_bg_other",
+            _background=True,
+            ei_bg_dotenv="python-ei_bg_dotenv",
+        ) as _ei:
+            assert time.perf_counter() - start < 0.4
+            import ei_bg_dotenv
+        assert time.perf_counter() - start >= 0.5
+        assert ei_bg_dotenv.NAME == "python-ei_bg_dotenv"
+        assert _ei.wait(timeout=5)
+        import ei_bg_other
+
+        assert ei_bg_other.NAME == "ei_bg_other"
+    EnsureImport.reset()
+    for name in ("ei_bg_dotenv", "ei_bg_other"):
+        sys.modules.pop(name, None)
+
+
+def test_background_failure(monkeypatch):
+    monkeypatch.setattr(
+        EnsureImport, "install_and_extend_sys_path", lambda self, *ps: 2
+    )
+    EnsureImport.reset()
+    _ei = EnsureImport(_no_venv=True)
+    _ei.install_in_background("ei_bg_broken")
+    assert not _ei.wait(timeout=5)
+    EnsureImport.reset()
@@ -0,0 +1,21 @@
+import json
+import subprocess  # nosec
+import sys
+from pathlib import Path
+
+from tests.utils import TEST_DIR
+
+
+def test_benchmarks_quick(tmp_path: Path):
+    output = tmp_path / "bench.json"
+    script = TEST_DIR.parent / "benchmarks" / "run.py"
+    r = subprocess.run(  # nosec
+        [sys.executable, script.as_posix(), "--quick", "-o", output.as_posix()],
+        capture_output=True,
+        encoding="utf-8",
+    )
+    assert r.returncode == 0, r.stderr
+    report = json.loads(output.read_text())
+    names = {i["name"] for i in report["results"]}
+    assert {"import.process", "show", "install.warm_cache", "retry_loop"} <= names
+    assert all(i["median"] >= 0 for i in report["results"])
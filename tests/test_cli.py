@@ -0,0 +1,111 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from ensure_import import EnsureImport
+from ensure_import.__main__ import main
+from ensure_import._scan import scan_paths
+from tests.utils import fake_venv, lock_sys_path
+
+SOURCES = {
+    "app/__init__.py": "from app import helpers\n",
+    "app/helpers.py": "import os\nimport ei_cli_missing.sub\nfrom . import x\n",
+    "app/main.py": (
+        "from app import helpers\nimport pytest\nimport yaml\n"
+        "try:\n    import ei_cli_optional\nexcept ImportError:\n    pass\n"
+    ),
+    "venv/lib/site.py": "import ei_cli_in_venv\n",
+    ".hidden/a.py": "import ei_cli_hidden\n",
+}
+
+
+def _project(root: Path) -> Path:
+    for name, content in SOURCES.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    return root
+
+
+def test_scan_paths(tmp_path: Path):
+    root = _project(tmp_path)
+    found = scan_paths([root])
+    assert list(found) == ["ei_cli_missing", "pytest", "yaml"]
+    assert found["yaml"] == [root / "app/main.py"]
+    assert list(scan_paths([root / "app/helpers.py"])) == ["ei_cli_missing"]
+
+
+def test_scan(tmp_path: Path, capsys):
+    root = _project(tmp_path)
+    args = ["scan", str(root), "--workdir", str(root), "--json"]
+    with lock_sys_path():
+        assert main(args) == 0
+        items = {i["module"]: i for i in json.loads(capsys.readouterr().out)}
+        assert items["yaml"]["package"] == "PyYAML"
+        assert items["ei_cli_missing"]["missing"] is True
+        assert items["pytest"]["missing"] is False
+        assert main([*args, "--check", "--missing"]) == 1
+        items = json.loads(capsys.readouterr().out)
+        assert "pytest" not in {i["module"] for i in items}
+
+
+def test_install(tmp_path: Path, monkeypatch, capsys):
+    root = _project(tmp_path)
+    calls: list[tuple[str, ...]] = []
+
+    def install(self, *packages: str) -> int:
+        calls.append(packages)
+        return 0
+
+    monkeypatch.setattr(EnsureImport, "install_and_extend_sys_path", install)
+    EnsureImport.reset()
+    try:
+        with lock_sys_path():
+            args = ["install", str(root), "--workdir", str(root), "--dry-run"]
+            assert main(args) == 0
+            assert "ei_cli_missing" in capsys.readouterr().out
+            assert not calls
+            assert main(["install", str(root / "app/helpers.py")]) == 0
+            assert calls == [("ei_cli_missing",)]
+            (empty := tmp_path / "empty").mkdir()
+            assert main(["install", str(empty)]) == 0
+            assert capsys.readouterr().out.strip().endswith("Nothing to install")
+    finally:
+        EnsureImport.reset()
+
+
+def test_module_entry():
+    r = subprocess.run(
+        [sys.executable, "-m", "ensure_import", "--help"],
+        capture_output=True,
+        text=True,
+    )
+    assert r.returncode == 0
+    assert "scan" in r.stdout and "prefetch" in r.stdout
+
+
+def test_missing_in_project_env(tmp_path: Path, monkeypatch, capsys):
+    root = tmp_path / "proj"
+    root.joinpath("app").mkdir(parents=True)
+    root.joinpath("pyproject.toml").write_text('[project]\nname = "a"\n')
+    root.joinpath("uv.lock").write_text("")
+    root.joinpath("app", "main.py").write_text(
+        "import ei_cli_in_env\nimport ei_cli_editable\nimport pytest\n"
+    )
+    env = tmp_path / "env"
+    site = env / "lib" / "python{}.{}".format(*sys.version_info) / "site-packages"
+    site.joinpath("ei_cli_in_env").mkdir(parents=True)
+    site.joinpath("ei_cli_in_env", "__init__.py").write_text("")
+    env.joinpath("pyvenv.cfg").write_text("include-system-site-packages = false\n")
+    # Installed by `pip install -e`, found by the path in the .pth file
+    editable = tmp_path / "src"
+    editable.joinpath("ei_cli_editable").mkdir(parents=True)
+    editable.joinpath("ei_cli_editable", "__init__.py").write_text("")
+    site.joinpath("ei_cli_editable.pth").write_text(f"{editable}\n")
+    monkeypatch.setenv("UV_PROJECT_ENVIRONMENT", env.as_posix())
+    with fake_venv(monkeypatch, project=True):
+        assert main(["scan", str(root), "--workdir", str(root), "--json"]) == 0
+    items = {i["module"]: i["missing"] for i in json.loads(capsys.readouterr().out)}
+    # pytest is importable here, but not by the python of the project's env
+    assert items == {"ei_cli_in_env": False, "ei_cli_editable": False, "pytest": True}
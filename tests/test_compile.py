@@ -0,0 +1,120 @@
+import os
+import shlex
+import subprocess
+import sys
+from pathlib import Path
+
+from ensure_import import EnsureImport
+from ensure_import._compile import (
+    CHUNK_SIZE,
+    compile_command,
+    record_sources,
+    write_file_list,
+)
+from tests.utils import fake_venv, lock_sys_path, site_packages
+
+
+def _fake_run(site: Path):
+    def run(cmd: str) -> int:
+        if " -c " in cmd:
+            # The venv is not real, compile by current python instead
+            return subprocess.call([sys.executable, *shlex.split(cmd)[1:]])
+        elif cmd.endswith(" ei-compile-mod"):
+            pkg = site / "ei_compile_mod"
+            pkg.mkdir()
+            pkg.joinpath("__init__.py").write_text("VALUE = 1\n")
+            dist_info = site / "ei_compile_mod-1.0.dist-info"
+            dist_info.mkdir()
+            dist_info.joinpath("METADATA").write_text("Name: ei-compile-mod\n")
+            dist_info.joinpath("RECORD").write_text(
+                "ei_compile_mod/__init__.py,,\n"
+                "ei_compile_mod-1.0.dist-info/METADATA,,\n"
+                "../../../bin/ei_compile_script.py,,\n"
+            )
+        return 0
+
+    return run
+
+
+def test_record_sources(tmp_path: Path):
+    site = site_packages(tmp_path / "venv")
+    site.mkdir(parents=True)
+    _fake_run(site)("pip install ei-compile-mod")
+    files = record_sources(site, "ei_compile_mod-1.0.dist-info")
+    assert files == [site / "ei_compile_mod" / "__init__.py"]
+
+
+def test_compile_after_install(tmp_path: Path, monkeypatch):
+    site = site_packages(tmp_path / "venv")
+    EnsureImport.stats.clear()
+    try:
+        with fake_venv(monkeypatch, _fake_run(site)) as commands:
+            _ei = EnsureImport(_workdir=tmp_path, _installer="pip", _lock=False)
+            assert _ei.install_and_extend_sys_path("ei-compile-mod") == 0
+        assert "--no-compile" in commands[-2]
+        assert commands[-1].startswith(f"{site.parent.parent.parent}/bin/python -c ")
+        assert list((site / "ei_compile_mod" / "__pycache__").glob("*.pyc"))
+        (span,) = [e for e in EnsureImport.stats.events if e["name"] == "compile"]
+        assert span["args"] == {
+            "dists": ["ei_compile_mod-1.0.dist-info"],
+            "files": 1,
+            "rc": 0,
+        }
+    finally:
+        EnsureImport.stats.clear()
+
+
+def test_compile_disabled(tmp_path: Path, monkeypatch):
+    run = _fake_run(site_packages(tmp_path / "venv"))
+    with fake_venv(monkeypatch, run) as commands:
+        _ei = EnsureImport(_workdir=tmp_path, _installer="pip", _compile=False)
+        assert _ei.install_and_extend_sys_path("ei-compile-mod") == 0
+    assert "--no-compile" not in commands[-1]
+    assert not any(" -c " in cmd for cmd in commands)
+
+
+def test_no_compile_stage_without_venv(monkeypatch):
+    commands: list[str] = []
+    monkeypatch.setattr(
+        EnsureImport,
+        "run_and_echo",
+        staticmethod(lambda cmd: commands.append(cmd) or 0),
+    )
+    monkeypatch.setenv("ENSURE_IMPORT_NO_CACHE", "1")
+    EnsureImport.reset()
+    try:
+        with lock_sys_path():
+            _ei = EnsureImport(_no_venv=True, _installer="pip")
+            assert _ei.install_and_extend_sys_path("ei-compile-mod") == 0
+    finally:
+        EnsureImport.reset()
+    # The interpreter's own site-packages is left to the installer
+    assert len(commands) == 1 and "--no-compile" not in commands[0]
+
+
+def test_compile_by_worker_pool(tmp_path: Path):
+    files = []
+    for i in range(CHUNK_SIZE * 4):
+        files.append(path := tmp_path / "src" / f"ei_mod_{i}.py")
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(f"VALUE = {i}\n")
+    file_list = write_file_list(files)
+    try:
+        cmd = compile_command(Path(sys.executable), file_list, workers=2)
+        # Shadow py_compile, to tell the processes that compiled each file
+        fake = tmp_path / "fake"
+        fake.mkdir()
+        fake.joinpath("py_compile.py").write_text(
+            "import os, time\n"
+            "def compile(file, quiet=0):\n"
+            "    time.sleep(0.01)\n"
+            "    open(file + '.pid', 'w').write(str(os.getpid()))\n"
+            "    return file + 'c'\n"
+        )
+        env = dict(os.environ, PYTHONPATH=fake.as_posix())
+        assert subprocess.call(shlex.split(cmd), env=env) == 0
+    finally:
+        file_list.unlink()
+    pids = {Path(f"{f}.pid").read_text() for f in files}
+    assert len(pids) == 2
+    assert str(os.getpid()) not in pids
@@ -0,0 +1,67 @@
+import subprocess
+import sys
+import textwrap
+import time
+from pathlib import Path
+
+import pytest
+
+from ensure_import._filelock import FileLock
+
+WORKER = textwrap.dedent(
+    """
+    import sys, time
+    from pathlib import Path
+    from ensure_import import EnsureImport
+
+    target = Path(sys.argv[1])
+    sys.path.append(target.as_posix())
+
+    def run_and_echo(cmd):
+        with (target / "installs.log").open("a") as f:
+            f.write(cmd + "\\n")
+        time.sleep(0.3)
+        (target / "ei_flock_pkg.py").write_text("")
+        return 0
+
+    EnsureImport.run_and_echo = staticmethod(run_and_echo)
+    rc = EnsureImport(_no_venv=True, _installer="pip").install_and_extend_sys_path(
+        "ei_flock_pkg"
+    )
+    sys.exit(rc)
+    """
+)
+
+
+def test_single_flight_install(tmp_path: Path):
+    cache = tmp_path / "cache"
+    script = tmp_path / "worker.py"
+    script.write_text(WORKER)
+    root = Path(__file__).parent.parent
+    env = {"XDG_CACHE_HOME": str(cache), "PYTHONPATH": str(root)}
+    procs = [
+        subprocess.Popen([sys.executable, script, tmp_path], env=env) for _ in range(4)
+    ]
+    assert [p.wait(timeout=60) for p in procs] == [0, 0, 0, 0]
+    assert len(tmp_path.joinpath("installs.log").read_text().splitlines()) == 1
+
+
+def test_timeout(tmp_path: Path):
+    with FileLock(tmp_path / "a.lock") as lock:
+        assert lock.locked and not lock.waited
+        other = FileLock(tmp_path / "a.lock")
+        start = time.perf_counter()
+        with pytest.raises(TimeoutError):
+            other.acquire(timeout=0.2)
+        assert time.perf_counter() - start >= 0.2
+        assert other.waited and not other.locked
+    assert not lock.locked
+    with other.acquire(timeout=0.2):
+        assert other.locked
+
+
+def test_unwritable(tmp_path: Path):
+    (tmp_path / "file").write_text("")
+    lock = FileLock(tmp_path / "file" / "a.lock").acquire()
+    assert not lock.locked
+    lock.release()
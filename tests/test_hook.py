@@ -0,0 +1,62 @@
+import sys
+from pathlib import Path
+
+from ensure_import import EnsureImport
+from tests.utils import lock_sys_path
+
+
+def test_install_hook(tmp_path: Path, monkeypatch):
+    installed: list[tuple[str, ...]] = []
+    executed: list[int] = []
+
+    def fake_install(self, *packages: str) -> int:
+        installed.append(packages)
+        if packages == ("ei-hook-dist",):
+            tmp_path.joinpath("ei_hook_mod.py").write_text("VALUE = 1")
+        elif packages == ("ei-hook-cls-dist",):
+            tmp_path.joinpath("ei_hook_cls.py").write_text("VALUE = 2")
+        return 0
+
+    monkeypatch.setattr(EnsureImport, "install_and_extend_sys_path", fake_install)
+    # Modules of the class-level mapping are allowed as well
+    mapping = {**EnsureImport.mapping, "ei_hook_cls": "ei-hook-cls-dist"}
+    monkeypatch.setattr(EnsureImport, "mapping", mapping)
+    EnsureImport.reset()
+    with lock_sys_path():
+        sys.path.append(tmp_path.as_posix())
+        hook = EnsureImport.install_hook(
+            modules="ei-hook-missing", ei_hook_mod="ei-hook-dist"
+        )
+        try:
+            executed.append(1)
+            import ei_hook_cls
+            import ei_hook_mod
+
+            try:
+                import ei_hook_missing  # noqa: F401
+            except ImportError:
+                pass
+            try:
+                import ei_hook_missing  # noqa: F401,F811
+            except ImportError:
+                pass
+            try:
+                import ei_hook_not_allowed  # noqa: F401
+            except ImportError:
+                pass
+        finally:
+            EnsureImport.uninstall_hook()
+    EnsureImport.reset()
+    sys.modules.pop("ei_hook_mod", None)
+    sys.modules.pop("ei_hook_cls", None)
+    assert hook not in sys.meta_path
+    assert "ei_hook_missing" in hook.allowed  # Import name of the pip name
+    assert ei_hook_mod.VALUE == 1
+    assert ei_hook_cls.VALUE == 2
+    assert executed == [1]
+    # Failed module is not tried again, and not allowed one is not installed
+    assert installed == [
+        ("ei-hook-cls-dist",),
+        ("ei-hook-dist",),
+        ("ei_hook_missing",),
+    ]
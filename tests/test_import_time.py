@@ -0,0 +1,58 @@
+import subprocess  # nosec
+import sys
+
+from tests.utils import TEST_DIR
+
+# Cumulative microseconds reported by `python -X importtime` for ensure_import
+IMPORT_TIME_BUDGET_US = 60_000
+HEAVY_MODULES = (
+    "datetime",
+    "json",
+    "logging",
+    "pkgutil",
+    "platform",
+    "random",
+    "shlex",
+    "shutil",
+    "subprocess",
+)
+
+
+def _import_in_subprocess(code: str) -> subprocess.CompletedProcess:
+    return subprocess.run(  # nosec
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        encoding="utf-8",
+        cwd=TEST_DIR.parent,
+    )
+
+
+def test_import_time_budget():
+    r = _import_in_subprocess("import ensure_import")
+    assert r.returncode == 0, r.stderr
+    line = next(
+        i for i in reversed(r.stderr.splitlines()) if i.endswith("| ensure_import")
+    )
+    cumulative = int(line.split("|")[1])
+    assert cumulative < IMPORT_TIME_BUDGET_US, line
+
+
+def test_no_eager_reexports():
+    code = "import sys, ensure_import;print(' '.join(sorted(sys.modules)))"
+    r = _import_in_subprocess(code)
+    loaded = set(r.stdout.split())
+    assert "ensure_import" in loaded
+    assert not loaded & set(HEAVY_MODULES)
+
+
+def test_lazy_reexports():
+    import json
+    from datetime import datetime, timedelta
+
+    import ensure_import
+
+    assert ensure_import.json is json
+    assert ensure_import.datetime is datetime
+    assert ensure_import.timedelta is timedelta
+    assert "subprocess" in dir(ensure_import)
+    assert ensure_import.logger.name == "ensure_import"
@@ -0,0 +1,69 @@
+import sys
+from pathlib import Path
+
+from ensure_import import EnsureImport, _inventory
+from ensure_import._index import bundled_index, resolve_distributions
+
+
+def test_bundled_index():
+    index = bundled_index()
+    assert index["cv2"] == "opencv-python"
+    assert index["yaml"] == "PyYAML"
+    assert index["sklearn"] == "scikit-learn"
+    # Names that pip can resolve by itself are not listed
+    assert "numpy" not in index
+
+
+def test_resolve_priority(tmp_path: Path):
+    site_packages = tmp_path / "site-packages"
+    dist_info = site_packages / "ei_fancy_dist-0.1.dist-info"
+    dist_info.mkdir(parents=True)
+    dist_info.joinpath("METADATA").write_text(
+        "Metadata-Version: 2.1\nName: ei-fancy-dist\nVersion: 0.1\n"
+    )
+    dist_info.joinpath("top_level.txt").write_text("ei_fancy\n")
+    path = [site_packages.as_posix()]
+    modules = ["cv2", "yaml", "ei_fancy", "numpy", "PIL.Image", "PIL"]
+    assert resolve_distributions(modules, {"yaml": "ruamel.yaml"}, path) == [
+        "opencv-python",
+        "ruamel.yaml",
+        "ei-fancy-dist",
+        "numpy",
+        "pillow",
+    ]
+
+
+def test_run_uses_index(monkeypatch):
+    installed: list[tuple[str, ...]] = []
+    monkeypatch.setattr(EnsureImport, "_exec", lambda self, *ms: installed.append(ms))
+    EnsureImport.reset()
+    _ei = EnsureImport(dotenv="my-dotenv")
+    _ei.run(ModuleNotFoundError("No module named 'dotenv'"))
+    _ei.run(ModuleNotFoundError("No module named 'bs4'"))
+    EnsureImport.reset()
+    assert installed == [("my-dotenv",), ("beautifulsoup4",)]
+
+
+def test_target_venv(tmp_path: Path, monkeypatch):
+    version = "{}.{}".format(*sys.version_info)
+    site_packages = tmp_path / "venv" / "lib" / f"python{version}" / "site-packages"
+    dist_info = site_packages / "ei_venv_dist-0.1.dist-info"
+    dist_info.mkdir(parents=True)
+    dist_info.joinpath("METADATA").write_text("Name: ei-venv-dist\nVersion: 0.1\n")
+    dist_info.joinpath("top_level.txt").write_text("ei_venv_mod\n")
+    monkeypatch.setattr(EnsureImport, "is_venv", staticmethod(lambda: False))
+    monkeypatch.setenv("XDG_CACHE_HOME", (tmp_path / "cache").as_posix())
+    monkeypatch.delenv("ENSURE_IMPORT_NO_CACHE", raising=False)
+    read: list[Path] = []
+    read_metadata = _inventory._read_metadata
+    monkeypatch.setattr(
+        _inventory, "_read_metadata", lambda d: read.append(d) or read_metadata(d)
+    )
+    EnsureImport.reset()
+    try:
+        _ei = EnsureImport(_workdir=tmp_path)
+        for _ in range(2):
+            assert _ei.resolve_packages(["ei_venv_mod"]) == ["ei-venv-dist"]
+    finally:
+        EnsureImport.reset()
+    assert read == [dist_info]  # Cached by the mtime of site-packages
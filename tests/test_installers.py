@@ -0,0 +1,83 @@
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+from ensure_import import EnsureImport
+from ensure_import._installers import (
+    PdmInstaller,
+    PipInstaller,
+    UvInstaller,
+    get_installer,
+)
+from tests.utils import fake_venv, site_packages
+
+
+def test_auto_detect(monkeypatch):
+    monkeypatch.setattr(shutil, "which", lambda cmd: f"/usr/bin/{cmd}")
+    assert isinstance(get_installer(), UvInstaller)
+    monkeypatch.setattr(shutil, "which", lambda cmd: None)
+    assert isinstance(get_installer(), PipInstaller)
+    assert isinstance(get_installer("pdm"), PdmInstaller)
+    with pytest.raises(ValueError):
+        get_installer("conda")
+
+
+def test_commands():
+    py = Path("/tmp/my venv/bin/python")
+    uv = UvInstaller()
+    assert uv.install_command(py, ["a", "b>=1"]) == (
+        "uv pip install --python '/tmp/my venv/bin/python' a 'b>=1'"
+    )
+    assert uv.bootstrap_command(py) is None
+    # No pip in a uv venv, the current pip builds wheels for the venv python
+    assert uv.wheel_command(py, "/w", ["a"]).endswith(
+        " -m pip --python '/tmp/my venv/bin/python' wheel --wheel-dir /w a"
+    )
+    assert PipInstaller().venv_command("python3", "venv") == "python3 -m venv venv"
+    assert PdmInstaller().venv_dir("venv") == ".venv"
+
+
+def test_install_by_chosen_backend(tmp_path: Path, monkeypatch):
+    with fake_venv(monkeypatch) as commands:
+        _ei = EnsureImport(_workdir=tmp_path, _installer="uv", _no_venv=False)
+        assert _ei.install_and_extend_sys_path("ei_not_exist") == 0
+    py = tmp_path / "venv" / "bin" / "python"
+    assert commands == [
+        f"uv venv --python {sys.executable} {tmp_path / 'venv'}",
+        f"uv pip install --python {py} ei_not_exist",
+    ]
+
+
+@pytest.mark.parametrize("created", [True, False])
+def test_poetry_env_outside_workdir(tmp_path: Path, monkeypatch, created: bool):
+    env = tmp_path / "cache" / "virtualenvs" / "proj-py"
+    workdir = tmp_path / "proj"
+    workdir.mkdir()
+
+    def run(cmd: str) -> int:
+        if cmd.startswith("poetry env use ") and created:
+            # Poetry creates the venv in its cache dir, not in the workdir
+            site_packages(env).mkdir(parents=True)
+            env.joinpath("pyvenv.cfg").write_text("")
+        return 0
+
+    def find_env_path(cmd: str) -> Path | None:
+        commands.append(cmd)
+        return env if env.is_dir() else None
+
+    monkeypatch.setattr(EnsureImport, "find_env_path", staticmethod(find_env_path))
+    with fake_venv(monkeypatch, run) as commands:
+        _ei = EnsureImport(_workdir=workdir, _installer="poetry", _no_venv=False)
+        rc = _ei.install_and_extend_sys_path("ei_not_exist")
+    assert commands[:2] == [
+        f"poetry env use {sys.executable}",
+        "poetry env info --path",
+    ]
+    if created:
+        assert rc == 0
+        install = "poetry run python -m pip install --no-compile ei_not_exist"
+        assert commands[-1] == install
+    else:
+        assert rc == 1 and len(commands) == 2
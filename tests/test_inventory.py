@@ -0,0 +1,70 @@
+import os
+import sys
+from pathlib import Path
+
+if sys.version_info >= (3, 11):
+    from contextlib import chdir
+else:
+    from contextlib_chdir import chdir
+
+from ensure_import import EnsureImport, _inventory
+from ensure_import._inventory import Inventory, ModuleInfo
+from tests.utils import lock_sys_path
+
+
+def _add_package(site: Path, module: str, dist: str) -> None:
+    site.joinpath(module).mkdir(parents=True)
+    site.joinpath(module, "__init__.py").write_text("")
+    dist_info = site / f"{dist}-1.0.dist-info"
+    dist_info.mkdir()
+    dist_info.joinpath("METADATA").write_text(
+        f"Metadata-Version: 2.1\nName: {dist}\nVersion: 1.0\n\nLong description"
+    )
+    dist_info.joinpath("RECORD").write_text(f"{module}/__init__.py,,\n")
+    # Make sure that the directory mtime is changed
+    st = site.stat()
+    os.utime(site, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+
+def test_incremental_update(tmp_path: Path, monkeypatch):
+    site = tmp_path / "site-packages"
+    _add_package(site, "ei_inv_a", "ei-inv-a")
+    site.joinpath("ei_inv_single.py").write_text("")
+    site.joinpath("not_a_package").mkdir()
+    index_file = tmp_path / "inventory.json"
+    inventory = Inventory(index_file)
+    assert inventory.modules(site) == ["ei_inv_a", "ei_inv_single"]
+    assert inventory.save()
+
+    parsed: list[str] = []
+    origin = _inventory._read_metadata
+
+    def read_metadata(meta_dir: Path):
+        parsed.append(meta_dir.name)
+        return origin(meta_dir)
+
+    monkeypatch.setattr(_inventory, "_read_metadata", read_metadata)
+    inventory = Inventory(index_file)
+    assert inventory.modules(site) == ["ei_inv_a", "ei_inv_single"]
+    assert parsed == []
+    _add_package(site, "ei_inv_b", "ei-inv-b")
+    assert list(Inventory(index_file).iter_available([site])) == [
+        ModuleInfo("ei_inv_a", "ei-inv-a", "1.0"),
+        ModuleInfo("ei_inv_b", "ei-inv-b", "1.0"),
+        ModuleInfo("ei_inv_single", None, None),
+    ]
+    assert parsed == ["ei-inv-b-1.0.dist-info"]
+
+
+def test_show(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    version = "{}.{}".format(*sys.version_info)
+    site = tmp_path / ".venv" / "lib" / f"python{version}" / "site-packages"
+    _add_package(site, "ei_inv_show", "ei-inv-show")
+    EnsureImport.reset()
+    with chdir(tmp_path), lock_sys_path():
+        assert "ei_inv_show" in (EnsureImport.show() or [])
+        available = {i.name: i for i in EnsureImport.iter_available()}
+    EnsureImport.reset()
+    assert available["ei_inv_show"].version == "1.0"
+    assert tmp_path.joinpath("cache", "ensure_import", "inventory.json").exists()
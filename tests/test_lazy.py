@@ -0,0 +1,77 @@
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+from ensure_import import EnsureImport
+from ensure_import._lazy import LazyModule
+from tests.utils import lock_sys_path
+
+NAME = "ei_lazy_mod"
+
+
+@pytest.fixture
+def lazy_env(tmp_path: Path):
+    EnsureImport.reset()
+    with lock_sys_path():
+        sys.path.insert(0, tmp_path.as_posix())
+        try:
+            yield tmp_path
+        finally:
+            sys.modules.pop(NAME, None)
+            EnsureImport.reset()
+
+
+def test_load_on_first_use(lazy_env: Path):
+    lazy_env.joinpath(f"{NAME}.py").write_text("import sys\nVALUE = 42\n")
+    ns = {"EnsureImport": EnsureImport}
+    exec(f"mod = EnsureImport.lazy({NAME!r})", ns)
+    proxy = ns["mod"]
+    assert isinstance(proxy, LazyModule)
+    assert sys.modules[NAME] is proxy
+    assert repr(proxy) == f"<LazyModule {NAME!r} (not loaded)>"
+    assert proxy.VALUE == 42
+    module = sys.modules[NAME]
+    assert not isinstance(module, LazyModule)
+    assert ns["mod"] is module
+    assert module.__spec__ is proxy.__spec__
+    proxy.OTHER = 1  # The stand-in forwards to the module
+    assert module.OTHER == 1
+    assert EnsureImport.lazy(NAME) is module
+
+
+def test_install_once_for_threads(lazy_env: Path, monkeypatch):
+    calls: list[tuple[str, ...]] = []
+
+    def install(self, *packages: str) -> int:
+        calls.append(packages)
+        lazy_env.joinpath(f"{NAME}.py").write_text("VALUE = 'installed'\n")
+        return 0
+
+    monkeypatch.setattr(EnsureImport, "install_and_extend_sys_path", install)
+    proxy = EnsureImport.lazy(NAME, ei_lazy_mod="ei-lazy-dist")
+    barrier = threading.Barrier(8)
+    values: list[str] = []
+
+    def use() -> None:
+        barrier.wait()
+        values.append(proxy.VALUE)
+
+    threads = [threading.Thread(target=use) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert values == ["installed"] * 8
+    assert calls == [("ei-lazy-dist",)]
+
+
+def test_install_failed(lazy_env: Path, monkeypatch):
+    monkeypatch.setattr(
+        EnsureImport, "install_and_extend_sys_path", lambda self, *packages: 1
+    )
+    proxy = EnsureImport.lazy(NAME)
+    with pytest.raises(ModuleNotFoundError, match="Failed to install"):
+        _ = proxy.VALUE
+    assert sys.modules[NAME] is proxy  # Kept for the next try
@@ -0,0 +1,88 @@
+import json
+import shutil
+from pathlib import Path
+
+from ensure_import import EnsureImport
+from ensure_import._lock import LOCK_NAME, Lockfile
+from tests.utils import fake_venv, site_packages
+
+DISTS = {
+    "ei-lock-a": ("1.0", ["ei-lock-b>=2"]),
+    "ei-lock-b": ("2.0", []),
+    "ei-lock-c": ("3.0", []),
+}
+
+
+def _fake_install(site: Path, requirements: list[str]):
+    def install(cmd: str) -> int:
+        args = cmd.split()
+        if "-r" in args:
+            req = Path(args[args.index("-r") + 1])
+            requirements.extend(req.read_text().splitlines())
+            names = [line.split("==")[0] for line in requirements]
+        else:
+            names = [i for i in args[args.index("install") + 1 :] if i in DISTS]
+            names += [r.split(">")[0] for n in names for r in DISTS[n][1]]
+        for name in names:
+            version, requires = DISTS[name]
+            dist_info = site / f"{name.replace('-', '_')}-{version}.dist-info"
+            dist_info.mkdir(exist_ok=True)
+            lines = [f"Name: {name}", f"Version: {version}"]
+            lines += [f"Requires-Dist: {r}" for r in requires]
+            dist_info.joinpath("METADATA").write_text("\n".join(lines) + "\n")
+        if "--report" in args:
+            report = {
+                "install": [
+                    {
+                        "metadata": {"name": n, "version": DISTS[n][0]},
+                        "download_info": {"archive_info": {"hashes": {"sha256": n}}},
+                    }
+                    for n in names
+                ]
+            }
+            Path(args[args.index("--report") + 1]).write_text(json.dumps(report))
+        return 0
+
+    return install
+
+
+def test_install_from_lock(tmp_path: Path, monkeypatch):
+    requirements: list[str] = []
+    install = _fake_install(site_packages(tmp_path / "venv"), requirements)
+    with fake_venv(monkeypatch, install) as commands:
+        for packages in (["ei-lock-a"], ["ei-lock-a", "ei-lock-c"]):
+            # Each time with a fresh venv, the lockfile is kept
+            shutil.rmtree(tmp_path / "venv", ignore_errors=True)
+            commands.clear()
+            EnsureImport.reset()
+            _ei = EnsureImport(
+                _workdir=tmp_path, _installer="pip", _no_venv=False, _lock=True
+            )
+            assert _ei.install_and_extend_sys_path(*packages) == 0
+    assert "--no-deps -r" in commands[-2]
+    assert "-r" not in commands[-1].split() and commands[-1].endswith(" ei-lock-c")
+    assert requirements == [
+        "ei-lock-a==1.0 --hash=sha256:ei-lock-a",
+        "ei-lock-b==2.0 --hash=sha256:ei-lock-b",
+    ]
+    lock = Lockfile(tmp_path / LOCK_NAME)
+    assert lock.requests == {
+        "ei-lock-a": ["ei-lock-a", "ei-lock-b"],
+        "ei-lock-c": ["ei-lock-c"],
+    }
+    assert lock.packages["ei-lock-c"] == {
+        "version": "3.0",
+        "hashes": ["sha256:ei-lock-c"],
+    }
+    assert not list((tmp_path / "venv").glob(".ensure_import-[lr]*"))
+
+
+def test_pins_without_hashes(tmp_path: Path):
+    lock = Lockfile(tmp_path / LOCK_NAME)
+    lock.requests.update({"a": ["a", "b"]})
+    lock.packages.update(
+        {"a": {"version": "1", "hashes": ["sha256:x"]}, "b": {"version": "2"}}
+    )
+    assert lock.split(["a", "c"]) == (["a"], ["c"])
+    # pip would reject `b` if hashes of `a` are written
+    assert lock.requirements(["a"]) == ["a==1", "b==2"]
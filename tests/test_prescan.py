@@ -0,0 +1,54 @@
+import ast
+import sys
+from pathlib import Path
+
+from ensure_import import EnsureImport
+from ensure_import._scan import guarded_block, imported_modules, third_party
+from tests.utils import lock_sys_path
+
+SOURCE = """
+import os
+with ctx():
+    import foo.bar
+    from baz import qux
+    from . import local
+    import json, dotenv
+import outside
+"""
+
+
+def test_scan_guarded_block():
+    tree = ast.parse(SOURCE)
+    block = guarded_block(tree, 5)
+    assert block is not None
+    names = imported_modules(ast.Module(body=block.body, type_ignores=[]))
+    assert names == ["foo", "baz", "json", "dotenv"]
+    assert third_party(names) == ["foo", "baz", "dotenv"]
+    assert guarded_block(tree, 8) is None
+
+
+def test_prescan_installs_in_one_batch(tmp_path: Path, monkeypatch):
+    calls: list[tuple[str, ...]] = []
+
+    def fake_install(self, *packages: str) -> int:
+        calls.append(packages)
+        for name in ("ei_missing_a", "ei_missing_b", "ei_missing_c"):
+            tmp_path.joinpath(f"{name}.py").write_text("")
+        return 0
+
+    monkeypatch.setattr(EnsureImport, "install_and_extend_sys_path", fake_install)
+    EnsureImport.reset()
+    with lock_sys_path():
+        sys.path.append(tmp_path.as_posix())
+        while _ei := EnsureImport(_prescan=True, ei_missing_b="ei-missing-b-dist"):
+            with _ei:
+                import ei_missing_a
+                import ei_missing_b
+                from ei_missing_c import __name__ as c_name
+    EnsureImport.reset()
+    assert calls == [("ei_missing_a", "ei-missing-b-dist", "ei_missing_c")]
+    assert _ei._tried == 1
+    assert ei_missing_a is not ei_missing_b
+    assert c_name == "ei_missing_c"
+    for name in ("ei_missing_a", "ei_missing_b", "ei_missing_c"):
+        sys.modules.pop(name, None)
@@ -0,0 +1,55 @@
+import sys
+from pathlib import Path
+
+from ensure_import import EnsureImport
+from ensure_import._probe import requirement_name, requirement_specifier
+from tests.utils import lock_sys_path
+
+
+def _fake_site_packages(root: Path) -> Path:
+    site_packages = root / "site-packages"
+    pkg = site_packages / "ei_heavy_mod"
+    pkg.mkdir(parents=True)
+    pkg.joinpath("__init__.py").write_text("raise RuntimeError('imported!')")
+    dist_info = site_packages / "ei_heavy_dist-1.2.3.dist-info"
+    dist_info.mkdir()
+    dist_info.joinpath("METADATA").write_text(
+        "Metadata-Version: 2.1\nName: ei-heavy-dist\nVersion: 1.2.3\n"
+    )
+    dist_info.joinpath("RECORD").write_text(
+        "ei_heavy_mod/__init__.py,,\nei_heavy_dist-1.2.3.dist-info/METADATA,,\n"
+    )
+    return site_packages
+
+
+def test_requirement_name():
+    assert requirement_name("foo[bar]>=1.0") == "foo"
+    assert requirement_name("python-dotenv") == "python-dotenv"
+    assert requirement_specifier("foo[bar] >=1.0,<2; python_version>'3'") == (
+        ">=1.0,<2"
+    )
+    assert requirement_specifier("foo") == ""
+
+
+def test_probe_without_importing(tmp_path: Path):
+    path = [_fake_site_packages(tmp_path).as_posix()]
+    status = EnsureImport.probe(
+        "ei_heavy_mod", "ei-heavy-dist>=1", "ei_missing_mod", path=path
+    )
+    assert status["ei_heavy_mod"].present
+    assert status["ei_heavy_mod"].version == "1.2.3"
+    assert status["ei-heavy-dist>=1"] == ("ei-heavy-dist", True, "1.2.3")
+    # Installed but too old, so it has to be upgraded
+    old = EnsureImport.probe("ei-heavy-dist>=2", path=path)["ei-heavy-dist>=2"]
+    assert old == ("ei-heavy-dist", False, "1.2.3")
+    assert not status["ei_missing_mod"].present
+    assert "ei_heavy_mod" not in sys.modules
+
+
+def test_is_module_installed(tmp_path: Path):
+    site_packages = _fake_site_packages(tmp_path)
+    with lock_sys_path():
+        sys.path.append(site_packages.as_posix())
+        assert EnsureImport.is_module_installed("ei_heavy_mod")
+        assert EnsureImport.missing_modules(["ei_heavy_mod", "ei_nope"]) == ["ei_nope"]
+    assert "ei_heavy_mod" not in sys.modules
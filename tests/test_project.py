@@ -0,0 +1,122 @@
+import base64
+import hashlib
+import shutil
+import sys
+from pathlib import Path
+
+from ensure_import import EnsureImport
+from ensure_import._project import detect, env_from_output
+from tests.utils import fake_venv
+
+MINOR = "{}.{}".format(*sys.version_info)
+
+
+def _pyproject(root: Path, content: str) -> Path:
+    root.mkdir(parents=True, exist_ok=True)
+    root.joinpath("pyproject.toml").write_text(content)
+    return root
+
+
+def test_poetry(tmp_path: Path, monkeypatch):
+    root = _pyproject(tmp_path / "proj", '[tool.poetry]\nname = "My App"\n')
+    envs = tmp_path / "envs"
+    monkeypatch.setenv("POETRY_VIRTUALENVS_PATH", str(envs))
+    monkeypatch.delenv("POETRY_VIRTUALENVS_IN_PROJECT", raising=False)
+    assert detect(root / "src") == ("poetry", root, None)
+    digest = hashlib.sha256(str(root.resolve()).encode()).digest()
+    h = base64.urlsafe_b64encode(digest).decode()[:8]
+    env = envs / f"my_app-{h}-py{MINOR}"
+    env.mkdir(parents=True)
+    assert detect(root).env == env
+    root.joinpath("poetry.toml").write_text("[virtualenvs]\nin-project = true\n")
+    assert detect(root).env == root / ".venv"
+
+
+def test_other_managers(tmp_path: Path, monkeypatch):
+    pdm = _pyproject(tmp_path / "pdm", "[tool.pdm]\n")
+    assert detect(pdm) == ("pdm", pdm, None)
+    pdm.joinpath(".pdm-python").write_text("/opt/envs/a/bin/python\n")
+    assert detect(pdm).env == Path("/opt/envs/a")
+
+    uv = _pyproject(tmp_path / "uv", '[project]\nname = "a"\n')
+    uv.joinpath("uv.lock").write_text("")
+    monkeypatch.delenv("UV_PROJECT_ENVIRONMENT", raising=False)
+    assert detect(uv) == ("uv", uv, uv / ".venv")
+    monkeypatch.setenv("UV_PROJECT_ENVIRONMENT", "/opt/envs/b")
+    assert detect(uv).env == Path("/opt/envs/b")
+
+    hatch = _pyproject(tmp_path / "hatch", "[tool.hatch.envs.default]\n")
+    monkeypatch.setattr(shutil, "which", lambda cmd: None)
+    assert detect(hatch) == ("hatch", hatch, None)
+    assert detect(hatch).find_command is None
+    monkeypatch.setattr(shutil, "which", lambda cmd: f"/usr/bin/{cmd}")
+    assert detect(hatch).find_command == "hatch env find"
+    hatch.joinpath("pyproject.toml").write_text(
+        '[tool.hatch.envs.default]\npath = ".hatch"\n'
+    )
+    assert detect(hatch).env == hatch / ".hatch"
+
+    plain = _pyproject(tmp_path / "plain", '[project]\nname = "a"\n')
+    assert detect(plain).manager is None
+
+
+def test_env_from_output(tmp_path: Path):
+    python = tmp_path / "bin" / "python"
+    python.parent.mkdir()
+    python.write_text("")
+    assert env_from_output(f"{python}\n") == tmp_path
+    assert env_from_output(f"{tmp_path}\n") == tmp_path
+    assert env_from_output("") is None
+
+
+def test_get_poetry_py_path(tmp_path: Path, monkeypatch):
+    commands: list[str] = []
+
+    def find_env_path(cmd: str) -> Path | None:
+        commands.append(cmd)
+        return tmp_path if len(commands) == 1 else None
+
+    monkeypatch.setattr(EnsureImport, "find_env_path", staticmethod(find_env_path))
+    assert EnsureImport.get_poetry_py_path() == tmp_path
+    assert EnsureImport.get_poetry_py_path() == Path()
+    assert commands == ["poetry env info --path"] * 2
+
+
+def test_fallback_to_manager_command(tmp_path: Path, monkeypatch):
+    _pyproject(tmp_path, "[tool.hatch.envs.default]\n")
+    env = tmp_path / "hatch-env"
+    env.joinpath("lib", f"python{MINOR}", "site-packages").mkdir(parents=True)
+    env.joinpath("pyvenv.cfg").write_text("")
+    commands: list[str] = []
+
+    def find_env_path(cmd: str) -> Path:
+        commands.append(cmd)
+        return env
+
+    monkeypatch.setattr(shutil, "which", lambda cmd: f"/usr/bin/{cmd}")
+    monkeypatch.setattr(EnsureImport, "find_env_path", staticmethod(find_env_path))
+    with fake_venv(monkeypatch, project=True):
+        _ei = EnsureImport(_workdir=tmp_path, _no_venv=False, _install=False)
+        assert _ei.install_and_extend_sys_path("json") == 0
+        site = env.joinpath("lib", f"python{MINOR}", "site-packages")
+        assert site.as_posix() in sys.path
+    assert commands == ["hatch env find"]
+
+
+def test_reject_env_without_pyvenv_cfg(tmp_path: Path, monkeypatch):
+    # e.g.: pdm is told to use the system python, which is not installed into
+    _pyproject(tmp_path, "[tool.pdm]\n")
+    system = tmp_path / "usr"
+    system.joinpath("lib", f"python{MINOR}", "site-packages").mkdir(parents=True)
+    tmp_path.joinpath(".pdm-python").write_text(f"{system}/bin/python\n")
+    venv = tmp_path / ".venv"
+    venv.joinpath("lib", f"python{MINOR}", "site-packages").mkdir(parents=True)
+    venv.joinpath("pyvenv.cfg").write_text("")
+    monkeypatch.setattr(shutil, "which", lambda cmd: None)
+    with fake_venv(monkeypatch, project=True):
+        _ei = EnsureImport(_workdir=tmp_path, _no_venv=False, _install=False)
+        assert _ei.install_and_extend_sys_path("json") == 0
+        assert venv.joinpath("lib", f"python{MINOR}", "site-packages").as_posix() in (
+            sys.path
+        )
+        assert not any(p.startswith(system.as_posix()) for p in sys.path)
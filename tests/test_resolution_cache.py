@@ -0,0 +1,63 @@
+import os
+import sys
+from pathlib import Path
+
+from ensure_import import EnsureImport
+from ensure_import._cache import CACHE_NAME, ResolutionCache
+from tests.utils import lock_sys_path
+
+
+def _make_venv(workdir: Path) -> Path:
+    venv = workdir / "venv"
+    version = "{}.{}".format(*sys.version_info)
+    venv.joinpath("lib", f"python{version}", "site-packages").mkdir(parents=True)
+    venv.joinpath("pyvenv.cfg").write_text(f"version = {version}.0\n")
+    return venv
+
+
+def test_invalidated_by_mtime(tmp_path: Path):
+    venv = _make_venv(tmp_path)
+    cache = ResolutionCache(tmp_path)
+    cache.watch(venv / "pyvenv.cfg")
+    cache.set("poetry", False)
+    assert cache.save()
+    assert cache.path == venv / CACHE_NAME
+    assert ResolutionCache(tmp_path).get("poetry") is False
+
+    pyproject = tmp_path / "pyproject.toml"
+    pyproject.write_text("[project]\n")
+    assert ResolutionCache(tmp_path).get("poetry") is None
+    cache = ResolutionCache(tmp_path)
+    cache.set("poetry", False)
+    cache.save()
+    assert ResolutionCache(tmp_path).get("poetry") is False
+    st = venv.joinpath("pyvenv.cfg").stat()
+    os.utime(venv / "pyvenv.cfg", ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert ResolutionCache(tmp_path).get("poetry") is None
+
+
+def test_warm_start_skips_subprocess(tmp_path: Path, monkeypatch):
+    venv = _make_venv(tmp_path)
+    # ensure_import may come from system site-packages, so it has to be checked
+    with venv.joinpath("pyvenv.cfg").open("a") as f:
+        f.write("include-system-site-packages = true\n")
+    calls: list[str] = []
+
+    def check_shell(cmd: str) -> bool:
+        calls.append(cmd)
+        return True
+
+    def find_env_path(cmd: str) -> None:
+        calls.append(cmd)
+
+    monkeypatch.setattr(EnsureImport, "is_venv", staticmethod(lambda: False))
+    monkeypatch.setattr(EnsureImport, "check_shell", staticmethod(check_shell))
+    monkeypatch.setattr(EnsureImport, "find_env_path", staticmethod(find_env_path))
+    for expected in (1, 0):
+        EnsureImport.reset()
+        calls.clear()
+        with lock_sys_path():
+            _ei = EnsureImport(_workdir=tmp_path, _no_venv=False, _install=False)
+            assert _ei.install_and_extend_sys_path("json") == 0
+        assert len(calls) == expected
+    EnsureImport.reset()
@@ -0,0 +1,81 @@
+import os
+from pathlib import Path
+
+from ensure_import import EnsureImport, _scan
+from ensure_import._scan import ScanCache, iter_scan, scan_paths
+
+
+def _tree(root: Path, count: int) -> list[Path]:
+    files = []
+    for i in range(count):
+        path = root / f"pkg{i % 3}" / f"mod{i}.py"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        imports = ["os", f"ei_scan_{i % 4}", f"mod{(i + 1) % count}"]
+        path.write_text("".join(f"import {name}\n" for name in imports))
+        files.append(path)
+    return files
+
+
+def test_cache(tmp_path: Path, monkeypatch):
+    files = _tree(tmp_path / "src", 6)
+    cache_file = tmp_path / "scan.json"
+    parsed: list[str] = []
+    parse = _scan._parse
+
+    def _parse(path: str) -> list[str]:
+        parsed.append(path)
+        return parse(path)
+
+    monkeypatch.setattr(_scan, "_parse", _parse)
+    expected = scan_paths([tmp_path / "src"], cache=ScanCache(cache_file))
+    assert list(expected) == [f"ei_scan_{i}" for i in (0, 3, 1, 2)]
+    assert len(parsed) == 6
+    assert scan_paths([tmp_path / "src"], cache=ScanCache(cache_file)) == expected
+    assert len(parsed) == 6
+    files[0].write_text("import ei_scan_changed\n")
+    found = scan_paths([tmp_path / "src"], cache=ScanCache(cache_file))
+    assert len(parsed) == 7
+    assert found["ei_scan_changed"] == [files[0]]
+    assert found["ei_scan_0"] == [files[4]]
+
+
+def test_process_pool(tmp_path: Path, monkeypatch):
+    files = _tree(tmp_path, 12)
+    monkeypatch.setattr(_scan, "PARALLEL_MIN", 0)
+    monkeypatch.setattr(_scan, "CHUNK_SIZE", 2)
+    cache = ScanCache(tmp_path / "scan.json")
+    results = dict(iter_scan(files, jobs=2, cache=cache))
+    assert results == {
+        f: [f"ei_scan_{i % 4}", f"mod{(i + 1) % 12}"] for i, f in enumerate(files)
+    }
+    # Parsed by the workers, but cached by the parent process
+    assert os.path.exists(cache.path)
+    assert len(ScanCache(cache.path)._data) == 12
+
+
+def test_ensure_import_scan(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("ENSURE_IMPORT_NO_CACHE", "1")
+    (tmp_path / "a.py").write_text("import yaml\nimport ei_scan_x\nimport b\n")
+    (tmp_path / "b.py").write_text("import yaml, cv2\n")
+    EnsureImport.reset()
+    try:
+        ei = EnsureImport(_exit=False, ei_scan_x="ei-scan-dist")
+        it = ei.scan(tmp_path, jobs=1)
+        assert next(it) == ("yaml", ei.resolve_packages(["yaml"])[0])
+        assert list(it) == [("ei_scan_x", "ei-scan-dist"), ("cv2", "opencv-python")]
+    finally:
+        EnsureImport.reset()
+
+
+def test_submodules_are_not_first_party(tmp_path: Path):
+    # Layout of the celery docs: proj/celery.py is `proj.celery`
+    proj = tmp_path / "proj"
+    proj.joinpath("cache").mkdir(parents=True)
+    proj.joinpath("__init__.py").write_text("from .celery import app\n")
+    proj.joinpath("celery.py").write_text("from celery import Celery\n")
+    proj.joinpath("cache", "__init__.py").write_text("")
+    proj.joinpath("cache", "redis.py").write_text("import redis\nimport proj\n")
+    tmp_path.joinpath("manage.py").write_text("import proj\nimport manage\n")
+    found = scan_paths([tmp_path], cache=ScanCache(tmp_path / "scan.json"))
+    assert sorted(found) == ["celery", "redis"]
+    assert _scan.first_party(_scan.iter_sources([tmp_path])) == {"manage", "proj"}
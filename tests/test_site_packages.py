@@ -0,0 +1,89 @@
+from pathlib import Path
+
+import pytest
+
+from ensure_import import EnsureImport
+from ensure_import._venv import find_site_packages, is_importable, python_version
+from tests.utils import lock_sys_path
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    EnsureImport.reset()
+    yield
+    EnsureImport.reset()
+
+
+def test_posix_layout_from_pyvenv_cfg(tmp_path: Path):
+    venv = tmp_path / "venv"
+    target = venv / "lib" / "python3.9" / "site-packages"
+    target.mkdir(parents=True)
+    # A decoy which the recursive walk would have picked up as well
+    venv.joinpath("share", "data", "site-packages").mkdir(parents=True)
+    venv.joinpath("pyvenv.cfg").write_text("home = /usr/bin\nversion_info = 3.9.18\n")
+    assert python_version(venv) == "3.9"
+    assert find_site_packages(venv) == [target]
+
+
+def test_windows_layout(tmp_path: Path):
+    target = tmp_path / "Lib" / "site-packages"
+    target.mkdir(parents=True)
+    assert find_site_packages(tmp_path) == [target]
+
+
+def test_fallback_and_memoize(tmp_path: Path, monkeypatch):
+    # Not walked into, e.g.: the system prefix that a project env points to
+    tmp_path.joinpath("share", "custom", "site-packages").mkdir(parents=True)
+    assert find_site_packages(tmp_path) == []
+    target = tmp_path / "lib" / "python3.99" / "site-packages"
+    target.mkdir(parents=True)
+    assert find_site_packages(tmp_path) == [target]
+
+    def fail(*args, **kwargs):
+        raise AssertionError("should be memoized")
+
+    monkeypatch.setattr(Path, "glob", fail)
+    assert find_site_packages(tmp_path) == [target]
+    with lock_sys_path():
+        assert EnsureImport.load_venv(str(tmp_path)) == [target]
+
+
+def test_missing_venv(tmp_path: Path):
+    assert find_site_packages(tmp_path / "not-exists") == []
+
+
+def test_is_importable(tmp_path: Path):
+    venv = tmp_path / "venv"
+    site = venv / "lib" / "python3.9" / "site-packages"
+    site.mkdir(parents=True)
+    venv.joinpath("pyvenv.cfg").write_text("version = 3.9.1\n")
+    assert is_importable(venv) is False
+    # Editable install by setuptools
+    src = tmp_path / "src" / "ensure_import"
+    src.mkdir(parents=True)
+    site.joinpath("__editable__.ensure_import-1.0.pth").write_text(
+        "import __editable___ensure_import_1_0_finder; "
+        "__editable___ensure_import_1_0_finder.install()\n"
+    )
+    site.joinpath("__editable___ensure_import_1_0_finder.py").write_text(
+        f"MAPPING: dict[str, str] = {{'ensure_import': {src.as_posix()!r}}}\n"
+    )
+    assert is_importable(venv) is True
+    src.rename(tmp_path / "moved")
+    assert is_importable(venv) is False
+    # Path in .pth, e.g.: editable install by pdm
+    src.mkdir(parents=True)
+    src.joinpath("__init__.py").write_text("")
+    site.joinpath("_ensure_import.pth").write_text(f"{src.parent}\n")
+    assert is_importable(venv) is True
+    for pth in site.glob("*.pth"):
+        pth.unlink()
+    site.joinpath("ensure_import").mkdir()
+    assert is_importable(venv) is False
+    site.joinpath("ensure_import", "__init__.py").write_text("")
+    assert is_importable(venv) is True
+    site.joinpath("ensure_import", "__init__.py").unlink()
+    venv.joinpath("pyvenv.cfg").write_text(
+        "version = 3.9.1\ninclude-system-site-packages = true\n"
+    )
+    assert is_importable(venv) is None
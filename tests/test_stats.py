@@ -0,0 +1,46 @@
+import json
+import os
+import subprocess  # nosec
+import sys
+from pathlib import Path
+
+from ensure_import import EnsureImport
+from tests.utils import TEST_DIR, fake_venv, site_packages
+
+
+def test_phases(tmp_path: Path, monkeypatch):
+    site_packages(tmp_path / "venv").mkdir(parents=True)
+    EnsureImport.stats.clear()
+    with fake_venv(monkeypatch):
+        _ei = EnsureImport(_workdir=tmp_path, _installer="pip")
+        assert _ei.install_and_extend_sys_path("ei_not_exist") == 0
+    phases = EnsureImport.stats.phases()
+    for name in (
+        "install_and_extend_sys_path",
+        "project_detect",
+        "self_import_probe",
+        "probe",
+        "bootstrap",
+        "install",
+    ):
+        assert phases[name]["count"] == 1, name
+    assert "venv_create" not in phases
+    # No pyvenv.cfg in the fake venv, so it can not be told by files
+    marks = EnsureImport.stats.marks("self_import_check")
+    assert marks == [{"fast": False, "importable": True}]
+    trace = tmp_path / "trace.json"
+    EnsureImport.stats.dump(trace)
+    events = json.loads(trace.read_text())["traceEvents"]
+    assert {"name", "ph", "ts", "dur", "pid", "tid"} <= set(events[0])
+    EnsureImport.stats.clear()
+
+
+def test_trace_env(tmp_path: Path):
+    trace = tmp_path / "trace.json"
+    code = "from ensure_import import EnsureImport;EnsureImport.load_venv('not-exist')"
+    env = dict(os.environ, ENSURE_IMPORT_TRACE=trace.as_posix())
+    subprocess.run(  # nosec
+        [sys.executable, "-c", code], env=env, cwd=TEST_DIR.parent, check=True
+    )
+    events = json.loads(trace.read_text())["traceEvents"]
+    assert [e["name"] for e in events] == ["load_venv"]
@@ -0,0 +1,87 @@
+import subprocess  # nosec
+import sys
+from pathlib import Path
+
+from ensure_import import EnsureImport
+from ensure_import._template import TemplateStore, clone_venv
+from ensure_import._venv import STAMP_NAME, VenvStamp, find_site_packages, venv_python
+from tests.utils import fake_venv, site_packages
+
+
+def test_clone_real_venv(tmp_path: Path):
+    src, dst = tmp_path / "src" / "venv", tmp_path / "dst" / ".venv"
+    subprocess.run([sys.executable, "-m", "venv", "--without-pip", src], check=True)
+    site = find_site_packages(src)[0]
+    site.joinpath("ei_tpl_mod.py").write_text("VALUE = 1\n")
+    site.joinpath("ei_tpl.pth").write_text("")
+    src.joinpath(STAMP_NAME).write_text("{}")
+    counts = clone_venv(src, dst)
+    # A .pth file is appended to in place, so never shared with the template
+    assert find_site_packages(dst)[0].joinpath("ei_tpl.pth").stat().st_nlink == 1
+    assert not dst.joinpath(STAMP_NAME).exists()
+    assert counts["hardlink"] + counts["reflink"] + counts["copy"] >= 2
+    assert counts["rewrite"] >= 1
+    code = "import sys, ei_tpl_mod;print(sys.prefix)"
+    r = subprocess.run(
+        [venv_python(dst), "-c", code], capture_output=True, encoding="utf-8"
+    )
+    assert r.returncode == 0, r.stderr
+    assert Path(r.stdout.strip()) == dst
+    for script in ("pyvenv.cfg", "bin/activate"):
+        if (path := dst / script).exists():
+            assert str(src) not in path.read_text(), script
+
+
+def _fake_install(cmd: str) -> int:
+    args = cmd.split()
+    site = site_packages(Path(args[args.index("--python") + 1]).parent.parent)
+    for name in args[args.index("--python") + 2 :]:
+        dist_info = site / f"{name.replace('-', '_')}-1.0.dist-info"
+        dist_info.mkdir()
+        metadata = f"Name: {name}\nVersion: 1.0\n"
+        dist_info.joinpath("METADATA").write_text(metadata)
+    return 0
+
+
+def test_new_venv_cloned_from_template(tmp_path: Path, monkeypatch):
+    store = TemplateStore(tmp_path / "store")
+    with fake_venv(monkeypatch, _fake_install) as commands:
+        for project, packages in (
+            ("a", ["ei-tpl-a"]),
+            ("b", ["ei-tpl-a", "ei-tpl-b"]),
+        ):
+            workdir = tmp_path / project
+            workdir.mkdir()
+            commands.clear()
+            EnsureImport.reset()
+            _ei = EnsureImport(_workdir=workdir, _installer="uv", _templates=store)
+            assert _ei.install_and_extend_sys_path(*packages) == 0
+    venv = tmp_path / "b" / "venv"
+    assert commands == [f"uv pip install --python {venv_python(venv)} ei-tpl-b"]
+    assert (venv / "pyvenv.cfg").read_text() == f"home = {venv}\n"
+    site = find_site_packages(venv)[0]
+    assert site.joinpath("ei_tpl_a-1.0.dist-info").exists()
+    assert sorted(t.packages for t, _ in store.templates()) == [
+        {"ei-tpl-a"},
+        {"ei-tpl-a", "ei-tpl-b"},
+    ]
+    assert store.lookup(["ei-tpl-b"]) is None
+
+
+def test_save_template_when_packages_grow(tmp_path: Path, monkeypatch):
+    saved: list[list[str]] = []
+    store = TemplateStore(tmp_path / "store")
+    monkeypatch.setattr(store, "save", lambda venv, names: saved.append(names))
+    venv = tmp_path / "venv"
+    venv.mkdir()
+    stamp = VenvStamp(venv)
+    stamp.set("packages", ["ei-tpl-a"])
+    EnsureImport.reset()
+    try:
+        _ei = EnsureImport(_workdir=tmp_path, _templates=store)
+        _ei._save_template(venv, stamp, ["ei-tpl-a"])
+        assert saved == []
+        _ei._save_template(venv, stamp, ["ei-tpl-a", "ei-tpl-b"])
+        assert saved == [["ei-tpl-a", "ei-tpl-b"]]
+    finally:
+        EnsureImport.reset()
@@ -0,0 +1,101 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ensure_import import EnsureImport
+
+
+def test_installs_are_coalesced_and_batched(monkeypatch):
+    calls: list[tuple[str, ...]] = []
+
+    def slow_install(self, *packages: str) -> int:
+        calls.append(packages)
+        time.sleep(0.3)
+        return 0
+
+    monkeypatch.setattr(EnsureImport, "_install_batch", slow_install)
+    EnsureImport.reset()
+    barrier = threading.Barrier(8)
+
+    def worker(i: int) -> int:
+        barrier.wait()
+        _ei = EnsureImport(_no_venv=True)
+        return _ei.install_and_extend_sys_path("ei_common", f"ei_pkg_{i % 3}")
+
+    with ThreadPoolExecutor(8) as executor:
+        assert list(executor.map(worker, range(8))) == [0] * 8
+    EnsureImport.reset()
+    installed = [p for packages in calls for p in packages]
+    assert sorted(installed) == ["ei_common", "ei_pkg_0", "ei_pkg_1", "ei_pkg_2"]
+    assert len(calls) <= 3
+
+
+def test_failure_is_shared(monkeypatch):
+    def failed_install(self, *packages: str) -> int:
+        time.sleep(0.1)
+        if "ei_boom" in packages:
+            raise RuntimeError("boom")
+        return 2
+
+    monkeypatch.setattr(EnsureImport, "_install_batch", failed_install)
+    EnsureImport.reset()
+    _ei = EnsureImport(_no_venv=True)
+    with ThreadPoolExecutor(4) as executor:
+        results = executor.map(_ei.install_and_extend_sys_path, ["a"] * 4)
+        assert list(results) == [2] * 4
+        errors = [
+            executor.submit(_ei.install_and_extend_sys_path, "ei_boom")
+            for _ in range(2)
+        ]
+        for future in errors:
+            assert isinstance(future.exception(), RuntimeError)
+    EnsureImport.reset()
+
+
+def test_retry_state_per_thread():
+    EnsureImport.reset()
+    _ei = EnsureImport(_no_venv=True)
+    assert all(EnsureImport(_no_venv=True) is _ei for _ in range(3))
+    _ei._tried = 5
+
+    def read() -> int:
+        return EnsureImport(_no_venv=True)._tried
+
+    with ThreadPoolExecutor(1) as executor:
+        assert executor.submit(read).result() == 0
+    assert _ei._tried == 5
+    EnsureImport.reset()
+
+
+def test_interrupt_is_not_shared(monkeypatch):
+    calls: list[tuple[str, ...]] = []
+
+    def interrupted_install(self, *packages: str) -> int:
+        calls.append(packages)
+        if len(calls) == 1:
+            raise KeyboardInterrupt
+        return 0
+
+    monkeypatch.setattr(EnsureImport, "_install_batch", interrupted_install)
+    EnsureImport.reset()
+    _ei = EnsureImport(_no_venv=True)
+    with pytest.raises(KeyboardInterrupt):
+        _ei.install_and_extend_sys_path("ei_pkg")
+    assert _ei.install_and_extend_sys_path("ei_pkg") == 0  # Not left locked
+    assert calls == [("ei_pkg",), ("ei_pkg",)]
+    EnsureImport.reset()
+
+
+def test_batcher_per_target_env(tmp_path, monkeypatch):
+    monkeypatch.setattr(EnsureImport, "is_venv", staticmethod(lambda: False))
+    EnsureImport.reset()
+    try:
+        a = EnsureImport(_workdir=tmp_path / "a")
+        b = EnsureImport(_workdir=tmp_path / "b", _venv_dir="venv")
+        c = EnsureImport(_workdir=tmp_path / "b")
+        assert a._install_target() != b._install_target()
+        assert b._install_target() == c._install_target()
+    finally:
+        EnsureImport.reset()
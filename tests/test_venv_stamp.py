@@ -0,0 +1,38 @@
+import sys
+from pathlib import Path
+
+from ensure_import import EnsureImport
+from ensure_import._venv import STAMP_NAME, VenvStamp
+from tests.utils import fake_venv
+
+
+def _make_venv(workdir: Path, version: str) -> Path:
+    venv = workdir / "venv"
+    venv.joinpath("lib", f"python{version}", "site-packages").mkdir(parents=True)
+    venv.joinpath("pyvenv.cfg").write_text(f"version = {version}.1\n")
+    return venv
+
+
+def test_stamp_dropped_when_python_changed(tmp_path: Path):
+    venv = _make_venv(tmp_path, "3.9")
+    stamp = VenvStamp(venv)
+    stamp.set("bootstrapped", "pip install --upgrade pip")
+    assert stamp.save()
+    assert VenvStamp(venv).get("bootstrapped")
+    venv.joinpath("pyvenv.cfg").write_text("version = 3.12.1\n")
+    assert VenvStamp(venv).get("bootstrapped") is None
+
+
+def test_bootstrap_once_per_venv(tmp_path: Path, monkeypatch):
+    venv = _make_venv(tmp_path, "{}.{}".format(*sys.version_info))
+    with fake_venv(monkeypatch) as commands:
+        for _ in range(2):
+            EnsureImport.reset()
+            _ei = EnsureImport(_workdir=tmp_path, _installer="pip")
+            assert _ei.install_and_extend_sys_path("ei_not_exist") == 0
+    upgrades = [i for i in commands if "--upgrade pip" in i]
+    assert len(upgrades) == 1
+    assert len(commands) == 3
+    assert venv.joinpath(STAMP_NAME).exists()
+    # Told by the files of site-packages, no need to store it
+    assert VenvStamp(venv).get("self_importable") is None
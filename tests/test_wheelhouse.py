@@ -0,0 +1,73 @@
+import os
+import zipfile
+from pathlib import Path
+
+from ensure_import import EnsureImport
+from ensure_import._wheelhouse import Wheelhouse, parse_size
+from tests.utils import fake_venv
+
+
+def _wheel(wheelhouse: Path, name: str, *requires: str, size: int = 100) -> Path:
+    path = wheelhouse / f"{name}-1.0-py3-none-any.whl"
+    metadata = f"Metadata-Version: 2.1\nName: {name}\nVersion: 1.0\n"
+    metadata += "".join(f"Requires-Dist: {i}\n" for i in requires)
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr(f"{name}-1.0.dist-info/METADATA", metadata)
+        zf.writestr(f"{name}/data.bin", os.urandom(size))
+    return path
+
+
+def test_parse_size():
+    assert parse_size("2K") == 2048
+    assert parse_size("1.5MB") == 1.5 * 1024**2
+    assert parse_size(None) is None
+
+
+def test_touch_and_evict(tmp_path: Path):
+    a = _wheel(tmp_path, "ei_a", "ei-b (>=1.0); python_version > '3.0'")
+    b = _wheel(tmp_path, "ei_b")
+    c = _wheel(tmp_path, "ei_c", size=5000)
+    wh = Wheelhouse(tmp_path, max_size=a.stat().st_size + b.stat().st_size)
+    for i, p in enumerate((a, b, c)):
+        os.utime(p, (i, i))
+    assert wh.touch(["ei-a>=1"]) == {a, b}
+    assert wh.evict() == [c]
+    assert set(wh.files()) == {a, b}
+
+
+def test_prefetch_and_install_offline(tmp_path: Path, monkeypatch):
+    commands: list[str] = []
+
+    def run_and_echo(cmd: str) -> int:
+        commands.append(cmd)
+        if " wheel " in cmd:
+            _wheel(tmp_path, "PyYAML")
+        return 0
+
+    monkeypatch.setattr(EnsureImport, "run_and_echo", staticmethod(run_and_echo))
+    EnsureImport.reset()
+    _ei = EnsureImport(_wheelhouse=tmp_path, _no_venv=True, _installer="pip")
+    assert _ei.prefetch("yaml") == 0
+    assert _ei.install_and_extend_sys_path("PyYAML") == 0
+    EnsureImport.reset()
+    assert commands[0].endswith(f"-m pip wheel --wheel-dir {tmp_path} PyYAML")
+    assert commands[1].endswith(
+        f"-m pip install --no-index --find-links {tmp_path} PyYAML"
+    )
+    assert (
+        "PyYAML-1.0-py3-none-any.whl"
+        in tmp_path.joinpath(".wheelhouse.json").read_text()
+    )
+
+
+def test_prefetch_for_target_venv(tmp_path: Path, monkeypatch):
+    python = tmp_path / "venv" / "bin" / "python"
+    python.parent.mkdir(parents=True)
+    python.touch()
+    with fake_venv(monkeypatch) as commands:
+        _ei = EnsureImport(
+            _workdir=tmp_path, _wheelhouse=tmp_path / "w", _installer="pip"
+        )
+        assert _ei.prefetch("yaml") == 0
+    # Wheels are built by the venv's python, so ABI-specific ones match it
+    assert commands == [f"{python} -m pip wheel --wheel-dir {tmp_path / 'w'} PyYAML"]
@@ -1,8 +1,13 @@
+import shlex
 import sys
+from collections.abc import Callable
 from contextlib import contextmanager
 from pathlib import Path
 
+from ensure_import import EnsureImport, _project
+
 TEST_DIR = Path(__file__).parent
+VERSION = "{}.{}".format(*sys.version_info)
 
 
 @contextmanager
@@ -12,3 +17,46 @@ def lock_sys_path():
         yield
     finally:
         sys.path = origin
+
+
+def site_packages(venv: Path) -> Path:
+    return venv / "lib" / f"python{VERSION}" / "site-packages"
+
+
+@contextmanager
+def fake_venv(
+    monkeypatch, run: Callable[[str], int] | None = None, project: bool = False
+):
+    """Run EnsureImport outside of a venv with fake shell commands
+
+    Yield the list of the commands run. The venv command creates the venv named
+    by its last argument, the others are handed to `run` (rc 0 if None).
+
+    :param project: detect the project of the workdir, otherwise it is not one
+        wherever tmp_path is
+    """
+    commands: list[str] = []
+
+    def run_and_echo(cmd: str) -> int:
+        commands.append(cmd)
+        if " venv " in cmd:
+            venv = Path(shlex.split(cmd)[-1])
+            site_packages(venv).mkdir(parents=True, exist_ok=True)
+            venv.joinpath("pyvenv.cfg").write_text(f"home = {venv}\n")
+            return 0
+        return 0 if run is None else run(cmd)
+
+    monkeypatch.setattr(EnsureImport, "is_venv", staticmethod(lambda: False))
+    monkeypatch.setattr(EnsureImport, "run_and_echo", staticmethod(run_and_echo))
+    monkeypatch.setattr(EnsureImport, "check_shell", staticmethod(lambda cmd: True))
+    if not project:
+        monkeypatch.setattr(
+            _project, "detect", lambda d: _project.Project(None, d, None)
+        )
+    monkeypatch.setenv("ENSURE_IMPORT_NO_CACHE", "1")
+    EnsureImport.reset()
+    try:
+        with lock_sys_path():
+            yield commands
+    finally:
+        EnsureImport.reset()